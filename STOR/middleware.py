@@ -1,3 +1,23 @@
+import contextvars
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+
+from car_stor import metrics
+from car_stor.query_budgets import QUERY_BUDGETS
+from car_stor.querycount import QueryBudgetExceeded, QueryRecorder
+from car_stor.slowlog import current_request
+
+query_logger = logging.getLogger('car_stor.querycount')
+
 
 class ForceCSSMimeTypeMiddleware:
     def __init__(self, get_response):
@@ -8,3 +28,181 @@ class ForceCSSMimeTypeMiddleware:
         if request.path.endswith('.css'):
             response['Content-Type'] = 'text/css'
         return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL statements of every request against the budget declared for
+    its URL name in car_stor/query_budgets.py, and log query shapes repeated
+    QUERY_REPEAT_THRESHOLD times or more (the N+1 pattern).
+
+    QUERY_BUDGET_MODE is 'off' (the middleware is removed), 'warn' (log a
+    warning, for staging) or 'raise' (raise QueryBudgetExceeded, for tests).
+    """
+
+    def __init__(self, get_response):
+        self.mode = settings.QUERY_BUDGET_MODE
+        if self.mode not in ('warn', 'raise'):
+            raise MiddlewareNotUsed
+        self.repeat_threshold = settings.QUERY_REPEAT_THRESHOLD
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+
+        for shape, count in recorder.repeated(self.repeat_threshold):
+            query_logger.warning("Repeated query in %s (%s times): %s", view_name, count, shape)
+
+        budget = QUERY_BUDGETS.get(view_name)
+        if budget is not None and recorder.query_count > budget:
+            message = f"{view_name} ran {recorder.query_count} queries, over its budget of {budget}"
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            query_logger.warning(message)
+
+
+_template_timer = contextvars.ContextVar('template_timer', default=None)
+
+
+class _TemplateTimer:
+    def __init__(self):
+        self.seconds = 0.0
+        self.depth = 0
+
+
+def _timed_template_render(render):
+    # Includes and extends render nested templates; only the outermost render is timed
+    @functools.wraps(render)
+    def wrapper(self, context):
+        timer = _template_timer.get()
+        if timer is None:
+            return render(self, context)
+        timer.depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timer.depth -= 1
+            if not timer.depth:
+                timer.seconds += time.perf_counter() - start
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfilingMiddleware:
+    """
+    Time every request and report total, database and template time plus the
+    query count in a Server-Timing header. A PROFILING_SAMPLE_RATE fraction of
+    requests also runs under cProfile, and the PROFILING_TOP slowest call
+    paths (by cumulative time) are written to a text file in PROFILING_DIR.
+
+    Unless PROFILING_ENABLED is set the middleware is removed at startup and
+    costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.profile_dir = settings.PROFILING_DIR
+        self.top = settings.PROFILING_TOP
+        if not getattr(Template._render, 'profiled', False):
+            Template._render = _timed_template_render(Template._render)
+
+    def __call__(self, request):
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another request already holds the interpreter-wide profiler
+                profiler = None
+
+        timer = _TemplateTimer()
+        token = _template_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            with QueryRecorder() as recorder:
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - start
+            _template_timer.reset(token)
+            if profiler is not None:
+                profiler.disable()
+
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={recorder.total_time * 1000:.1f};desc="{len(recorder)} queries"',
+            f'template;dur={timer.seconds * 1000:.1f}',
+        ])
+        if profiler is not None:
+            self.write_profile(request, profiler, total)
+        return response
+
+    def write_profile(self, request, profiler, total):
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{view_name}-{total * 1000:.0f}ms.txt"
+        with open(os.path.join(self.profile_dir, name), 'w') as handle:
+            handle.write(f'{request.method} {request.get_full_path()} ({total * 1000:.1f}ms)\n\n')
+            stats = pstats.Stats(profiler, stream=handle)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            stats.print_callers(self.top)
+
+
+class MetricsMiddleware:
+    """
+    Count requests, latency and SQL statements per URL name into
+    car_stor.metrics, exposed by the metrics view. Removed at startup unless
+    METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        # Label by URL name, never by path, so the number of series stays bounded
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        metrics.inc('car_stor_http_requests_total', view=view, method=request.method, status=response.status_code)
+        metrics.observe('car_stor_http_request_duration_seconds', elapsed, view=view)
+        metrics.inc('car_stor_db_queries_total', len(recorder), view=view)
+        metrics.registry.maybe_flush()
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Make the current request known to the slow query log (car_stor/slowlog.py)
+    so each slow statement is attributed to its view. Removed at startup
+    unless SLOW_QUERY_THRESHOLD_MS is set.
+    """
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
@@ -73,6 +73,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'STOR.middleware.MetricsMiddleware',
+    'STOR.middleware.ProfilingMiddleware',
+    'STOR.middleware.SlowQueryMiddleware',
+    'STOR.middleware.QueryBudgetMiddleware',
     'STOR.middleware.ForceCSSMimeTypeMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -97,6 +101,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'car_stor.context_processors.car_cart',
+                'car_stor.context_processors.wishlist_ids',
             ],
         },
     },
@@ -115,6 +120,25 @@ DATABASES = {
     )
 }
 
+# Cache for pages and fragments, invalidated through model versions (car_stor/cache.py).
+# The local-memory default is per process; set a backend shared by every worker, e.g.
+# CACHE_URL=rediscache://127.0.0.1:6379/1 or filecache:///var/tmp/car_stor
+SHARED_CACHE = bool(env.str('CACHE_URL', default=''))
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://car-stor'),
+}
+
+# Anonymous full-page cache (car_stor/pagecache.py): seconds a page is kept, 0 disables it.
+# Off unless CACHE_URL is set: a version bump in a per-process cache reaches only the
+# worker that made the write, and the others would keep serving stale pages.
+# PAGE_CACHE_LOCK_TIMEOUT bounds how long concurrent requests wait for the one rendering a miss.
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', default=300 if SHARED_CACHE else 0)
+PAGE_CACHE_LOCK_TIMEOUT = env.int('PAGE_CACHE_LOCK_TIMEOUT', default=10)
+
+# Seconds a rendered product card is kept by {% cachedfor %} (car_stor/templatetags/card_cache.py);
+# cards are keyed by updated_at, so this only bounds memory. 0 disables it.
+CARD_CACHE_TIMEOUT = env.int('CARD_CACHE_TIMEOUT', default=86400)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -165,6 +189,64 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored under the hash of their content (car_stor/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'car_stor.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# How car_stor.media.serve_media hands files over: '' streams them from Django (sendfile()
+# under gunicorn), 'x-accel-redirect' to nginx at MEDIA_ACCEL_PREFIX (an internal location
+# aliased to MEDIA_ROOT), 'x-sendfile' to Apache/lighttpd. Content-hashed files are cached
+# for a year; others for MEDIA_CACHE_MAX_AGE seconds, then revalidated by ETag.
+MEDIA_SENDFILE = env.str('MEDIA_SENDFILE', default='')
+MEDIA_ACCEL_PREFIX = env.str('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = env.int('MEDIA_CACHE_MAX_AGE', default=3600)
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 
+
+# Catalog listings are keyset-paginated on (created_at, id)
+CATALOG_PAGE_SIZE = env.int('CATALOG_PAGE_SIZE', default=24)
+CATALOG_MAX_PAGE_SIZE = env.int('CATALOG_MAX_PAGE_SIZE', default=96)
+
+# Per-view query budgets (car_stor/query_budgets.py): 'off', 'warn' in staging, 'raise' in tests
+QUERY_BUDGET_MODE = env.str('QUERY_BUDGET_MODE', default='off')
+# A query shape repeated this many times in one request is reported as an N+1
+QUERY_REPEAT_THRESHOLD = env.int('QUERY_REPEAT_THRESHOLD', default=5)
+
+# Server-Timing headers and sampled cProfile reports (STOR.middleware.ProfilingMiddleware)
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_DIR = env.str('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_TOP = env.int('PROFILING_TOP', default=30)
+
+# Prometheus metrics (car_stor/metrics.py), served to staff or METRICS_TOKEN holders at /metrics/.
+# Set METRICS_DIR to a directory shared by all workers of the host to aggregate them.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+METRICS_DIR = env.str('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=5.0)
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')
+
+# Statements slower than this many milliseconds are appended to SLOW_QUERY_LOG as JSON lines
+# (car_stor/slowlog.py); 0 disables the log. SLOW_QUERY_EXPLAIN adds the plan of slow SELECTs.
+SLOW_QUERY_THRESHOLD_MS = env.float('SLOW_QUERY_THRESHOLD_MS', default=0)
+SLOW_QUERY_LOG = env.str('SLOW_QUERY_LOG', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+SLOW_QUERY_EXPLAIN = env.bool('SLOW_QUERY_EXPLAIN', default=False)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'car_stor': {
+            'handlers': ['console'],
+            'level': env.str('CAR_STOR_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
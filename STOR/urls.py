@@ -3,13 +3,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import re_path
-from django.views.static import serve
 from django.contrib.staticfiles import views as static_views
+from car_stor.media import serve_media
 
 urlpatterns = [
     path('django-admin/', admin.site.urls),
     path('', include('car_stor.urls')),
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^media/(?P<path>.*)$', serve_media),
     re_path(r'^static/(?P<path>.*)$', static_views.serve, {'insecure': True}),
 ]
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CarStorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'car_stor'
+
+    def ready(self):
+        from . import slowlog
+        slowlog.connect()
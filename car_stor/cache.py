@@ -0,0 +1,73 @@
+"""
+Versioned cache keys.
+
+Each versioned model (see VERSIONED_MODELS in models.py) has a version
+counter in the cache, bumped by its post_save and post_delete signals.
+Cache keys for pages and fragments embed the versions of the models they
+render, so any write makes every dependent key unreachable at once and stale
+entries simply expire. Nothing is ever deleted by key.
+
+Writes that skip signals (queryset.update, bulk_create) must call bump()
+themselves. Bumps inside a transaction wait for it to commit: bumping
+earlier would let a concurrent request cache the old rows under the new
+version, where they would stay until they expire.
+
+Product cards are keyed by their object's updated_at instead (see
+car_stor/templatetags/card_cache.py), so a write retires only its own card.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_PREFIX = 'car_stor:version:'
+
+
+def _version_key(model):
+    return VERSION_PREFIX + model._meta.label_lower
+
+
+def _initial_version():
+    # Versions start from the clock rather than 1, so a counter that was
+    # evicted can never come back to a value an old entry was stored under
+    return time.time_ns()
+
+
+def bump(*models):
+    """Invalidate every cache entry keyed on one of models once the current transaction commits"""
+    transaction.on_commit(lambda: _incr_versions(models))
+
+
+def _incr_versions(models):
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def versions(*models):
+    """Current version of each model, fetched in one round-trip, as {label: version}"""
+    keys = {_version_key(model): model._meta.label_lower for model in models}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _initial_version(), None)
+        found[key] = cache.get(key)
+    return {label: found[key] for key, label in keys.items()}
+
+
+def versioned_key(name, *parts, models=()):
+    """
+    A cache key for name and parts (e.g. a URL or an object id) that changes
+    whenever any of models is written.
+    """
+    current = versions(*models)
+    return hashed_key(name, *parts, *(f'{label}={version}' for label, version in sorted(current.items())))
+
+
+def hashed_key(name, *parts):
+    """A short key for name and parts that is safe for every cache backend"""
+    raw = '|'.join(map(str, parts))
+    return f'car_stor:{name}:{hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()}'
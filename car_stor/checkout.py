@@ -0,0 +1,114 @@
+"""
+Accessory checkout pipeline.
+
+place_order turns a cart into an Order in a single transaction with a fixed
+number of queries regardless of cart size, and records how long each stage
+took so slow checkouts can be attributed.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from .models import CartItem, Notification, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+class EmptyCartError(Exception):
+    pass
+
+
+def new_idempotency_key():
+    """Token rendered into an order form so that resubmitting it places the order once"""
+    return uuid.uuid4().hex
+
+
+def clean_idempotency_key(value):
+    value = (value or '').strip()
+    if not value or len(value) > 64:
+        return None
+    return value
+
+
+class CheckoutResult:
+    def __init__(self, order, timings):
+        self.order = order
+        # Stage name -> seconds, in execution order
+        self.timings = timings
+
+    @property
+    def total_time(self):
+        return sum(self.timings.values())
+
+
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def place_order(user, cart, shipping, idempotency_key=None):
+    """
+    Create an Order from every line in cart, notify the sellers and empty the cart.
+
+    shipping holds the full_name, email, phone, address and city of the order.
+    Raises EmptyCartError if the cart has no lines once they are locked, and
+    IntegrityError if the user already has an order with idempotency_key.
+    """
+    timings = {}
+    with transaction.atomic():
+        with _stage(timings, 'load_cart'):
+            lines = list(
+                CartItem.objects.select_for_update()
+                .filter(cart=cart)
+                .select_related('accessory__seller')
+                .order_by('pk')
+            )
+        if not lines:
+            raise EmptyCartError(cart.pk)
+
+        with _stage(timings, 'create_order'):
+            order = Order.objects.create(
+                user=user,
+                total_price=sum(line.total_price() for line in lines),
+                status='Pending',
+                idempotency_key=idempotency_key,
+                **shipping
+            )
+
+        with _stage(timings, 'create_items'):
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, accessory=line.accessory, quantity=line.quantity, price=line.accessory.price)
+                for line in lines
+            ])
+
+        with _stage(timings, 'notify_sellers'):
+            titles_by_seller = {}
+            for line in lines:
+                if line.accessory.seller_id:
+                    titles_by_seller.setdefault(line.accessory.seller, []).append(line.accessory.title)
+            Notification.objects.bulk_create([
+                Notification(
+                    user=seller,
+                    message=f"You have received a new order for accessories {', '.join(titles)}!"
+                )
+                for seller, titles in titles_by_seller.items()
+            ])
+
+        with _stage(timings, 'clear_cart'):
+            CartItem.objects.filter(pk__in=[line.pk for line in lines]).delete()
+            cart.reset_totals()
+
+    result = CheckoutResult(order, timings)
+    logger.info(
+        "Checkout order=%s lines=%s total=%.1fms %s",
+        order.pk, len(lines), result.total_time * 1000,
+        ' '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in timings.items()),
+    )
+    return result
@@ -1,21 +1,55 @@
-from .models import Cart, Notification
+from django.utils.functional import SimpleLazyObject, new_method_proxy
+
+from .models import Cart, CartItem, Notification, Wishlist
+
+
+class LazyNumber(SimpleLazyObject):
+    """SimpleLazyObject that also supports int(), float() and format(), as used by
+    pluralize and by localized number rendering"""
+    __int__ = new_method_proxy(int)
+    __float__ = new_method_proxy(float)
+    __format__ = new_method_proxy(format)
+
 
 def car_cart(request):
+    # Everything here is lazy: pages that never render the header pay no queries,
+    # and nothing is written on a read (the cart is created by add_to_cart).
+    # Item count and subtotal are maintained on the cart row, so one query serves all three.
     if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
-        latest_notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:5]
+        user = request.user
+        cart = SimpleLazyObject(lambda: Cart.objects.filter(user=user).first())
         return {
-            'cart_item_count': sum(item.quantity for item in cart.items.all()),
-            'cart_subtotal': cart.total_price(),
+            'cart_item_count': LazyNumber(lambda: cart.item_count if cart else 0),
+            'cart_subtotal': LazyNumber(lambda: cart.subtotal if cart else 0),
             'current_cart': cart,
-            'unread_notification_count': unread_notifications_count,
-            'latest_notifications': latest_notifications
+            'cart_preview_items': SimpleLazyObject(lambda: list(
+                CartItem.objects.filter(cart_id=cart.pk).select_related('accessory').order_by('pk')[:3]
+            ) if cart else []),
+            'unread_notification_count': LazyNumber(
+                lambda: Notification.objects.filter(user=user, is_read=False).count()
+            ),
+            'latest_notifications': Notification.objects.filter(user=user).order_by('-created_at')[:5],
         }
     return {
         'cart_item_count': 0,
         'cart_subtotal': 0,
         'current_cart': None,
+        'cart_preview_items': [],
         'unread_notification_count': 0,
         'latest_notifications': []
     }
+
+
+def wishlist_ids(request):
+    # Sets of wishlisted ids so listing pages can mark hearts with `x.id in ...`
+    # instead of a wishlist query per card; each set is loaded once, on first use.
+    if request.user.is_authenticated:
+        user = request.user
+        return {
+            'wishlisted_car_ids': SimpleLazyObject(lambda: Wishlist.car_ids_for(user)),
+            'wishlisted_accessory_ids': SimpleLazyObject(lambda: Wishlist.accessory_ids_for(user)),
+        }
+    return {
+        'wishlisted_car_ids': set(),
+        'wishlisted_accessory_ids': set(),
+    }
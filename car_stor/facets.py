@@ -0,0 +1,212 @@
+"""
+Sidebar filters and facet counts for the car listings.
+
+Counts come from rows of (facet values..., total): the CarFacetCount table,
+which holds every combination of facet values with its number of cars, or
+for a text search one GROUP BY over the matching cars. Either way the table
+of cars is not scanned per facet, and rows are rolled up per facet in Python.
+
+Each facet is counted under every selected filter except its own, so the
+alternatives to a selected value stay visible with the number of cars that
+choosing them instead would show.
+"""
+from collections import Counter
+
+from django.db.models import Case, CharField, Count, Q, Sum, Value, When
+
+from .models import Car, CarFacetCount, Category
+
+PRICE_BUCKETS = CarFacetCount.PRICE_BUCKETS
+MILEAGE_BUCKETS = CarFacetCount.MILEAGE_BUCKETS
+
+CHOICE_FACETS = (
+    ('status', 'Condition'),
+    ('fuel_type', 'Fuel Type'),
+    ('transmission', 'Transmission'),
+)
+
+BUCKET_FACETS = (
+    ('price', 'Price', PRICE_BUCKETS),
+    ('mileage', 'Mileage', MILEAGE_BUCKETS),
+)
+
+FACETS = ('category', 'status', 'fuel_type', 'transmission', 'model_year', 'price', 'mileage')
+
+# Where each facet is stored in CarFacetCount and annotated on a Car queryset
+COLUMNS = {
+    'category': 'category_id',
+    'status': 'status',
+    'fuel_type': 'fuel_type',
+    'transmission': 'transmission',
+    'model_year': 'model_year',
+    'price': 'price_bucket',
+    'mileage': 'mileage_bucket',
+}
+
+# GET parameters that select a different result set, and so reset pagination
+CURSOR_PARAMS = ('after', 'before')
+
+
+def _bucket_q(field, low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lt': high})
+    return q
+
+
+def _bucket_case(field, buckets):
+    return Case(
+        *[When(_bucket_q(field, low, high), then=Value(key)) for key, _, low, high in buckets],
+        default=Value(''),
+        output_field=CharField(),
+    )
+
+
+def _choice_value(field, value):
+    """Map a case-insensitive GET value onto the canonical choice, or None"""
+    choices = {key.lower(): key for key, _ in Car._meta.get_field(field).choices}
+    return choices.get(value.strip().lower())
+
+
+def filter_cars(queryset, params):
+    """
+    Apply the filters in params (usually request.GET) to a Car queryset.
+
+    Returns the filtered queryset and a dict of the filters that were applied,
+    keyed by GET parameter. Unknown or malformed values are ignored.
+    """
+    selected = {}
+
+    category_id = (params.get('category') or '').strip()
+    if category_id.isdigit():
+        queryset = queryset.filter(category_id=int(category_id))
+        selected['category'] = int(category_id)
+
+    for field, _ in CHOICE_FACETS:
+        value = _choice_value(field, params.get(field) or '')
+        if value:
+            queryset = queryset.filter(**{field: value})
+            selected[field] = value
+
+    model_year = (params.get('model_year') or '').strip()
+    if model_year.isdigit():
+        queryset = queryset.filter(model_year=int(model_year))
+        selected['model_year'] = int(model_year)
+
+    for field, _, buckets in BUCKET_FACETS:
+        key = (params.get(field) or '').strip()
+        for bucket_key, _, low, high in buckets:
+            if key == bucket_key:
+                queryset = queryset.filter(_bucket_q(field, low, high))
+                selected[field] = key
+
+    return queryset, selected
+
+
+def _toggle_url(params, name, value, is_selected):
+    params = params.copy()
+    for key in CURSOR_PARAMS:
+        params.pop(key, None)
+    if is_selected:
+        params.pop(name, None)
+    else:
+        params[name] = str(value)
+    return '?' + params.urlencode()
+
+
+def _options(params, selected, name, counts, labelled_values):
+    options = []
+    for value, label in labelled_values:
+        if not counts.get(value):
+            continue
+        is_selected = selected.get(name) == value
+        options.append({
+            'value': value,
+            'label': label,
+            'count': counts[value],
+            'selected': is_selected,
+            'url': _toggle_url(params, name, value, is_selected),
+        })
+    return options
+
+
+def facet_rows(queryset=None, names=FACETS):
+    """
+    Numbers of cars per combination of the values of the named facets, as
+    dicts keyed by facet name plus 'total'. Counted over queryset if given
+    (the cars matching a text search), otherwise read from CarFacetCount.
+    """
+    columns = [COLUMNS[name] for name in names]
+    if queryset is None:
+        counts = CarFacetCount.objects.filter(count__gt=0)
+        if len(columns) < len(FACETS):
+            rows = counts.values_list(*columns).annotate(total=Sum('count'))
+        else:
+            # One row per combination already
+            rows = counts.values_list(*columns, 'count')
+    else:
+        rows = (
+            queryset.order_by()
+            .annotate(price_bucket=_bucket_case('price', PRICE_BUCKETS),
+                      mileage_bucket=_bucket_case('mileage', MILEAGE_BUCKETS))
+            .values_list(*columns)
+            .annotate(total=Count('id'))
+        )
+    return [{**dict(zip(names, row)), 'total': row[-1]} for row in rows]
+
+
+def facet_counts(rows, params, selected=None, names=FACETS):
+    """
+    Roll rows from facet_rows up into the named facets.
+
+    Returns a list of facets, each a dict with name, title and options; every
+    option carries its value, label, count, whether it is selected and the
+    query string that toggles it.
+    """
+    selected = selected or {}
+    counts = {name: Counter() for name in names}
+    for row in rows:
+        # A row outside one selected filter only counts toward that filter's
+        # facet; outside two, toward none
+        misses = [name for name, value in selected.items() if name in row and row[name] != value]
+        if len(misses) > 1:
+            continue
+        for name in misses or names:
+            if name in counts:
+                counts[name][row[name]] += row['total']
+
+    facets = []
+    if 'category' in names:
+        categories = Category.objects.in_bulk([pk for pk in counts['category'] if pk])
+        category_values = sorted(
+            ((pk, category.name) for pk, category in categories.items()), key=lambda item: item[1]
+        )
+        facets.append({
+            'name': 'category',
+            'title': 'Category',
+            'options': _options(params, selected, 'category', counts['category'], category_values),
+        })
+    for field, title in CHOICE_FACETS:
+        if field in names:
+            facets.append({
+                'name': field,
+                'title': title,
+                'options': _options(params, selected, field, counts[field], Car._meta.get_field(field).choices),
+            })
+    if 'model_year' in names:
+        years = sorted(counts['model_year'], reverse=True)
+        facets.append({
+            'name': 'model_year',
+            'title': 'Model Year',
+            'options': _options(params, selected, 'model_year', counts['model_year'], [(y, str(y)) for y in years]),
+        })
+    for field, title, buckets in BUCKET_FACETS:
+        if field in names:
+            facets.append({
+                'name': field,
+                'title': title,
+                'options': _options(params, selected, field, counts[field], [(key, label) for key, label, _, _ in buckets]),
+            })
+    return facets
@@ -0,0 +1,166 @@
+"""
+Resized image variants for uploads.
+
+Every car, accessory, blog and category image gets one variant per size in
+SIZES, in WebP and JPEG, stored beside the original in the same storage:
+cars/p1.jpg gives cars/p1.card.webp, cars/p1.card.jpg, and so on. Variants
+are scaled to the size's width (never up), turned upright according to the
+EXIF orientation and saved without EXIF data, so camera and location
+metadata is never published.
+
+Templates read the URLs through ImageVariantsModel.image_variants, e.g.
+
+    <picture>
+      <source type="image/webp" srcset="{{ car.image_variants.webp_srcset }}" sizes="...">
+      <img src="{{ car.image_variants.card }}" srcset="{{ car.image_variants.jpeg_srcset }}" sizes="...">
+    </picture>
+
+Uploads are saved immediately and queued as ImageJob rows (see models.py);
+the process_image_jobs worker generates their variants off-request, and the
+backfill_image_variants command does the same for existing media.
+"""
+import io
+import os
+import re
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Raised for missing, unreadable or oversized originals
+IMAGE_ERRORS = (OSError, Image.DecompressionBombError)
+
+# name -> maximum width in pixels. Variants of content-addressed originals are
+# cached as immutable, so rename a size rather than change its width.
+SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 1200,
+}
+
+# format -> (extension, Pillow save options)
+FORMATS = {
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(name, size, fmt):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{size}.{FORMATS[fmt][0]}'
+
+
+def variant_names(name):
+    return [variant_name(name, size, fmt) for size in SIZES for fmt in FORMATS]
+
+
+_VARIANT_SUFFIX = re.compile(
+    r'\.(?:%s)\.(?:%s)$' % ('|'.join(SIZES), '|'.join(extension for extension, _ in FORMATS.values()))
+)
+
+
+def variant_root(name):
+    """The name of a variant without its size and format suffix (cars/p1.card.webp gives
+    cars/p1), or None if name is not a variant"""
+    match = _VARIANT_SUFFIX.search(name)
+    return name[:match.start()] if match else None
+
+
+def has_variants(field_file):
+    # The largest JPEG is written last, so it is there only if all the others are
+    return field_file.storage.exists(variant_name(field_file.name, 'detail', 'jpeg'))
+
+
+def _flatten(image):
+    """image without transparency, on white, for formats that have none"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, fmt, icc_profile):
+    buffer = io.BytesIO()
+    _, options = FORMATS[fmt]
+    if fmt == 'jpeg':
+        image = _flatten(image)
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.mode in ('LA', 'P', 'PA') else 'RGB')
+    # Only the colour profile is carried over; EXIF and XMP are dropped
+    if icc_profile:
+        options = {**options, 'icc_profile': icc_profile}
+    image.save(buffer, format=fmt.upper(), **options)
+    return buffer.getvalue()
+
+
+def generate_variants(field_file):
+    """Write every variant of field_file, replacing existing ones, and return their names"""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as handle:
+        with Image.open(handle) as original:
+            icc_profile = original.info.get('icc_profile')
+            image = ImageOps.exif_transpose(original)
+            image.load()
+
+    names = []
+    for size, width in SIZES.items():
+        if image.width > width:
+            resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.Resampling.LANCZOS)
+        else:
+            resized = image
+        for fmt in FORMATS:
+            name = variant_name(field_file.name, size, fmt)
+            content = ContentFile(_encode(resized, fmt, icc_profile))
+            if hasattr(storage, 'save_derived'):
+                # Content-addressed storage would rename the variant after its own bytes
+                names.append(storage.save_derived(name, content))
+                continue
+            if storage.exists(name):
+                storage.delete(name)
+            names.append(storage.save(name, content))
+    return names
+
+
+class ImageVariants:
+    """
+    URLs of the variants of one image. Until they are ready every URL is the
+    original's and the srcsets are empty, which browsers skip in favour of src.
+    """
+
+    def __init__(self, field_file, ready=True):
+        self.field_file = field_file
+        self.ready = ready
+
+    def __bool__(self):
+        return bool(self.field_file)
+
+    def url(self, size, fmt='jpeg'):
+        if not self.ready:
+            return self.field_file.storage.url(self.field_file.name)
+        return self.field_file.storage.url(variant_name(self.field_file.name, size, fmt))
+
+    def srcset(self, fmt):
+        if not self.ready:
+            return ''
+        return ', '.join(f'{self.url(size, fmt)} {width}w' for size, width in SIZES.items())
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('jpeg')
+
+    @property
+    def thumb(self):
+        return self.url('thumb')
+
+    @property
+    def card(self):
+        return self.url('card')
+
+    @property
+    def detail(self):
+        return self.url('detail')
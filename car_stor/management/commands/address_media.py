@@ -0,0 +1,56 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from car_stor import cache, images
+from car_stor.models import IMAGE_MODELS
+from car_stor.storage import is_addressed
+
+
+class Command(BaseCommand):
+    help = 'Move images stored before content-addressed storage under their content hash, with their variants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would move without moving it')
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'address'):
+            raise CommandError('The default storage is not content-addressed (see STORAGES).')
+        moved = rows = missing = 0
+
+        for model in IMAGE_MODELS:
+            field = model._meta.get_field('image')
+            self.stdout.write(f'Processing {model._meta.verbose_name_plural}...')
+            names = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .order_by('image').values_list('image', flat=True).distinct()
+            )
+            # Rows are rewritten below, so the names are read up front
+            for name in [name for name in names.iterator(chunk_size=2000) if not is_addressed(name)]:
+                if not default_storage.exists(name):
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f'  [!] {name}: file not found'))
+                    continue
+                if options['dry_run']:
+                    moved += 1
+                    self.stdout.write(f'  - {name}')
+                    continue
+
+                with default_storage.open(name, 'rb') as handle:
+                    addressed = default_storage.save(name, handle)
+                field_file = field.attr_class(None, field, addressed)
+                if not images.has_variants(field_file):
+                    images.generate_variants(field_file)
+                changes = {'image': addressed, 'image_status': model.READY}
+                if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+                    changes['updated_at'] = timezone.now()
+                rows += model.objects.filter(image=name).update(**changes)
+                moved += 1
+                self.stdout.write(f'  - {name} -> {addressed}')
+            cache.bump(model)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f'[SUCCESS] {verb} {moved} file(s) ({rows} row(s) updated); {missing} missing. '
+            'The old files stay in place until nothing refers to them.'
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from car_stor import images
+from car_stor.models import IMAGE_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG variants of existing car, accessory, blog and category images and mark them ready'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', action='append', choices=[model.__name__.lower() for model in IMAGE_MODELS],
+            help='Only this model (repeatable); all image models by default',
+        )
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        models = [model for model in IMAGE_MODELS if not options['model'] or model.__name__.lower() in options['model']]
+        generated = skipped = failed = 0
+
+        for model in models:
+            field = model._meta.get_field('image')
+            self.stdout.write(f'Processing {model._meta.verbose_name_plural}...')
+            # Seeded rows share images, so each file is processed once
+            names = model.objects.exclude(image='').exclude(image__isnull=True).order_by('image').values_list('image', flat=True).distinct()
+            for name in names.iterator(chunk_size=2000):
+                field_file = field.attr_class(None, field, name)
+                if not options['force'] and images.has_variants(field_file):
+                    skipped += 1
+                else:
+                    try:
+                        images.generate_variants(field_file)
+                    except images.IMAGE_ERRORS as exc:
+                        failed += 1
+                        model.set_image_status(name, model.FAILED)
+                        self.stdout.write(self.style.WARNING(f'  [!] {name}: {exc}'))
+                        continue
+                    generated += 1
+                    self.stdout.write(f'  - {name}')
+                model.set_image_status(name, model.READY)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[SUCCESS] Generated variants for {generated} image(s); {skipped} already done, {failed} failed.'
+        ))
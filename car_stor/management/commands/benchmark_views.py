@@ -0,0 +1,218 @@
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+
+from car_stor.models import Accessory, Car, Cart, CartItem
+from car_stor.query_budgets import QUERY_BUDGETS
+from car_stor.querycount import QueryRecorder
+
+VIEWS = ('index', 'search', 'car_detail', 'grid', 'accessory_detail', 'shopping_cart',
+         'process_checkout', 'dashboard', 'admin_dashboard')
+
+
+class Scenario:
+    """One view to benchmark: the request to send, as whom, and what to reset before each request"""
+
+    def __init__(self, name, path, client, method='get', data=None, setup=None, expected_status=200):
+        self.name = name
+        self.path = path
+        self.client = client
+        self.method = method
+        self.data = data
+        self.setup = setup
+        self.expected_status = expected_status
+
+    def request(self):
+        return getattr(self.client, self.method)(self.path, data=self.data, secure=True)
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1] * 1000, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Seed a test database and report p50/p95/p99 latency, query counts and peak memory of the main views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--cars', type=int, default=5000)
+        parser.add_argument('--accessories', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per view before timing')
+        parser.add_argument('--views', nargs='+', choices=VIEWS, default=VIEWS, help='Only benchmark these views')
+        parser.add_argument('--output', help='Write the results as JSON to this file ("-" for stdout)')
+        parser.add_argument('--keepdb', action='store_true', help='Keep and reuse the seeded test database')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError('--iterations must be at least 2 to compute percentiles.')
+
+        # Benchmarks run against a throwaway test database, never the configured one
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        # Keep the per-order checkout log lines out of the report
+        logging.disable(logging.INFO)
+        try:
+            if not (options['keepdb'] and Car.objects.exists()):
+                self.stdout.write('Seeding benchmark data...')
+                call_command(
+                    'generate_data', users=options['users'], cars=options['cars'],
+                    accessories=options['accessories'], seed=options['seed'], prefix='bench', stdout=self.stdout,
+                )
+            results = {}
+            # After warmup the anonymous page cache would answer index and grid without
+            # running the view; switch it off so the numbers measure the views and the ORM
+            with override_settings(PAGE_CACHE_TIMEOUT=0):
+                for scenario in self.scenarios(options['views']):
+                    self.stdout.write(f'Benchmarking {scenario.name}...')
+                    results[scenario.name] = self.run(scenario, options['iterations'], options['warmup'])
+        finally:
+            logging.disable(logging.NOTSET)
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.report(results)
+        if options['output']:
+            document = json.dumps({
+                'meta': {
+                    'commit': git_commit(),
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'dataset': {key: options[key] for key in ('users', 'cars', 'accessories', 'seed')},
+                    'iterations': options['iterations'],
+                    'warmup': options['warmup'],
+                },
+                'views': results,
+            }, indent=2, sort_keys=True)
+            if options['output'] == '-':
+                self.stdout.write(document)
+            else:
+                with open(options['output'], 'w') as handle:
+                    handle.write(document + '\n')
+                self.stdout.write(self.style.SUCCESS(f"[SUCCESS] Results written to {options['output']}"))
+
+    def client_for(self, user):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def scenarios(self, names):
+        """Pick representative rows: the busiest seller, a reviewed car, a buyer with a full cart"""
+        seller = User.objects.annotate(listings=Count('cars')).order_by('-listings', 'pk').first()
+        buyer = User.objects.exclude(pk=seller.pk).filter(username__startswith='bench_').order_by('pk').first()
+        staff, _ = User.objects.get_or_create(username='bench_staff', defaults={'is_staff': True, 'is_superuser': True})
+        car = Car.objects.annotate(review_count=Count('reviews')).order_by('-review_count', 'pk').first()
+        accessory = Accessory.objects.order_by('pk').first()
+        cart_accessories = list(Accessory.objects.order_by('pk')[:5])
+
+        anonymous = self.client_for(None)
+        buyer_client = self.client_for(buyer)
+        cart, _ = Cart.objects.get_or_create(user=buyer)
+
+        def fill_cart():
+            # Checkout empties the cart, and messages would pile up in the session cookie
+            CartItem.objects.filter(cart=cart).delete()
+            CartItem.objects.bulk_create([CartItem(cart=cart, accessory=a, quantity=2) for a in cart_accessories])
+            Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+            buyer_client.cookies.pop('messages', None)
+
+        checkout_form = {'full_name': 'Bench Buyer', 'email': 'bench@example.com', 'phone': '0700000000',
+                         'address': '1 Bench Street', 'city': 'Kabul'}
+        fill_cart()
+
+        scenarios = {
+            'index': Scenario('index', reverse('index'), anonymous),
+            'search': Scenario('search', reverse('search') + '?q=toyota', anonymous),
+            'car_detail': Scenario('car_detail', reverse('car_detail', args=[car.pk]), anonymous),
+            'grid': Scenario('grid', reverse('grid'), anonymous),
+            'accessory_detail': Scenario('accessory_detail', reverse('accessory_detail', args=[accessory.pk]), anonymous),
+            'shopping_cart': Scenario('shopping_cart', reverse('shopping_cart'), buyer_client),
+            'process_checkout': Scenario(
+                'process_checkout', reverse('process_checkout'), buyer_client, method='post',
+                data=checkout_form, setup=fill_cart, expected_status=302,
+            ),
+            'dashboard': Scenario('dashboard', reverse('dashboard'), self.client_for(seller)),
+            'admin_dashboard': Scenario('admin_dashboard', reverse('admin_dashboard'), self.client_for(staff)),
+        }
+        return [scenarios[name] for name in VIEWS if name in names]
+
+    def send(self, scenario):
+        if scenario.setup:
+            scenario.setup()
+        start = time.perf_counter()
+        response = scenario.request()
+        elapsed = time.perf_counter() - start
+        if response.status_code != scenario.expected_status:
+            raise CommandError(f'{scenario.name} ({scenario.path}) returned {response.status_code}, '
+                               f'expected {scenario.expected_status}.')
+        return elapsed
+
+    def run(self, scenario, iterations, warmup):
+        for _ in range(warmup):
+            self.send(scenario)
+
+        timings = [self.send(scenario) for _ in range(iterations)]
+
+        # Queries and memory are measured on separate requests so that neither
+        # the query log nor tracemalloc skews the timings
+        # Counted like QueryBudgetMiddleware does, so they compare with query_budget
+        with QueryRecorder() as queries:
+            self.send(scenario)
+        query_count = queries.query_count
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            self.send(scenario)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+        return {
+            'path': scenario.path,
+            'p50_ms': percentile(quantiles, 50),
+            'p95_ms': percentile(quantiles, 95),
+            'p99_ms': percentile(quantiles, 99),
+            'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+            'queries': query_count,
+            'query_budget': QUERY_BUDGETS.get(scenario.name),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def report(self, results):
+        self.stdout.write(self.style.SUCCESS('\n[SUCCESS] Benchmark completed!'))
+        self.stdout.write(f"   {'view':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KB':>10}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"   {name:<18} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['queries']:>8} {result['peak_memory_kb']:>10.1f}"
+            )
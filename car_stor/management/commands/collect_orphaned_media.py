@@ -0,0 +1,141 @@
+import os
+import re
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from car_stor import images, storage
+from car_stor.models import IMAGE_MODELS, ImageJob
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+# The first level of the content-addressed layout, e.g. 3f/ in 3f/a9/3fa9...e1.jpg
+SHARD = re.compile(r'^[0-9a-f]{2}$')
+
+
+def shard_directories(media_root):
+    with os.scandir(media_root) as entries:
+        return sorted(
+            entry.path for entry in entries if entry.is_dir(follow_symlinks=False) and SHARD.match(entry.name)
+        )
+
+
+def scan(directory, skip):
+    """Every regular file under directory as a DirEntry, one directory listing in memory at a time"""
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != skip:
+                        pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete or quarantine content-addressed media files that no car, accessory, blog post or category '
+        'refers to'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed and the bytes reclaimed')
+        parser.add_argument('--quarantine', metavar='DIR', help='Move orphans here, keeping their paths, instead of deleting them')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Files removed per batch')
+        parser.add_argument(
+            '--include-legacy', action='store_true',
+            help='Also collect files outside the content-addressed shards, such as the old upload_to directories '
+                 'and the template images generate_data copies from',
+        )
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Keep files modified in the last N hours; their rows may not be committed yet',
+        )
+
+    def handle(self, *args, **options):
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        quarantine = os.path.abspath(options['quarantine']) if options['quarantine'] else None
+        if quarantine == media_root:
+            raise CommandError('--quarantine must not be MEDIA_ROOT itself.')
+        if not os.path.isdir(media_root):
+            raise CommandError(f'MEDIA_ROOT {media_root} does not exist.')
+
+        # Only hashes are kept, so a million references take tens of MB; a
+        # collision can only keep an orphan, never remove a referenced file
+        referenced, roots = set(), set()
+        self.stdout.write('Reading image references...')
+        # Queued jobs count too: their row may already point at a newer upload
+        for model in (*IMAGE_MODELS, ImageJob):
+            names = model.objects.exclude(image='').exclude(image__isnull=True).values_list('image', flat=True)
+            for name in names.iterator(chunk_size=5000):
+                referenced.add(hash(name))
+                roots.add(hash(os.path.splitext(name)[0]))
+        self.stdout.write(f'  {len(referenced)} referenced image(s)')
+
+        verb = 'Would remove' if options['dry_run'] else ('Quarantined' if quarantine else 'Deleted')
+        cutoff = time.time() - options['min_age'] * 3600
+        scanned = scanned_bytes = orphans = orphan_bytes = recent = 0
+        batch = []
+
+        if options['include_legacy']:
+            directories = [media_root]
+            self.stdout.write(f'Scanning {media_root}...')
+        else:
+            # Other files may be read by path (generate_data's template images)
+            directories = [path for path in shard_directories(media_root) if path != quarantine]
+            self.stdout.write(f'Scanning {len(directories)} content-addressed shard(s) of {media_root}...')
+        entries = (entry for directory in directories for entry in scan(directory, quarantine))
+        for entry in entries:
+            name = os.path.relpath(entry.path, media_root).replace(os.sep, '/')
+            if not (options['include_legacy'] or storage.is_addressed(name)):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            scanned += 1
+            scanned_bytes += stat.st_size
+            root = images.variant_root(name)
+            if hash(name) in referenced or (root is not None and hash(root) in roots):
+                continue
+            if stat.st_mtime > cutoff:
+                recent += 1
+                continue
+            orphans += 1
+            orphan_bytes += stat.st_size
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                self.remove(batch, media_root, quarantine, options['dry_run'])
+                self.stdout.write(f'  {verb} {orphans} file(s) so far ({format_bytes(orphan_bytes)})')
+                batch = []
+        self.remove(batch, media_root, quarantine, options['dry_run'])
+
+        self.stdout.write(f'  Scanned {scanned} file(s) ({format_bytes(scanned_bytes)}); '
+                          f'kept {recent} unreferenced file(s) younger than {options["min_age"]:g}h')
+        self.stdout.write(self.style.SUCCESS(
+            f'[SUCCESS] {verb} {orphans} orphaned file(s), reclaiming {format_bytes(orphan_bytes)}.'
+        ))
+
+    def remove(self, names, media_root, quarantine, dry_run):
+        for name in names:
+            path = os.path.join(media_root, *name.split('/'))
+            if dry_run:
+                self.stdout.write(f'  - {name}')
+                continue
+            try:
+                if quarantine:
+                    target = os.path.join(quarantine, *name.split('/'))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(path, target)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Removed by someone else since the scan
+                continue
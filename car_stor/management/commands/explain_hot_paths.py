@@ -0,0 +1,134 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from car_stor.facets import filter_cars
+from car_stor.models import Accessory, Car, CarInquiry, CarOrder, Category, Notification, Order, Wishlist
+from car_stor.pagination import DEFAULT_ORDERING, seek_after
+from car_stor.search import SEARCH_ORDERING, search_cars
+
+# Only a SQLite "SEARCH" seeks into an index; every "SCAN <table>" walks the
+# whole table or index, even "USING INDEX". FTS5 lookups can only show up as
+# "SCAN <table> VIRTUAL TABLE INDEX n:M...", where M is the MATCH constraint.
+SQLITE_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)(.*)')
+SQLITE_FTS_MATCH = re.compile(r'VIRTUAL TABLE INDEX \d+:M')
+SQLITE_INDEX_ORDER = re.compile(r'USING (?:COVERING )?INDEX ')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+# First pages that may walk an index of this table in order, because their
+# LIMIT stops the walk after one page
+BOUNDED_SCANS = {
+    'car listing': 'car_stor_car',
+    'accessory listing': 'car_stor_accessory',
+}
+
+
+def full_scans(name, queryset, plan):
+    """The tables the plan scans instead of searching, allowing BOUNDED_SCANS"""
+    if connection.vendor == 'postgresql':
+        return sorted(set(POSTGRES_FULL_SCAN.findall(plan)))
+    bounded = (
+        BOUNDED_SCANS.get(name) if queryset.query.high_mark is not None and 'TEMP B-TREE FOR ORDER BY' not in plan
+        else None
+    )
+    scanned = set()
+    for table, detail in SQLITE_SCAN.findall(plan):
+        if SQLITE_FTS_MATCH.search(detail):
+            continue
+        if table == bounded and SQLITE_INDEX_ORDER.search(detail):
+            continue
+        scanned.add(table)
+    return sorted(scanned)
+
+
+def hot_paths():
+    """
+    The queries behind the catalog, search, dashboard and header, as
+    (name, queryset) pairs, built with sample values from the database.
+
+    Queries that read a whole table by design (the admin panel listings,
+    rebuilding the facet counts) are not included.
+    """
+    car = Car.objects.order_by(*DEFAULT_ORDERING).first()
+    seller_id = Car.objects.exclude(seller=None).values_list('seller_id', flat=True).first()
+    user_id = User.objects.values_list('id', flat=True).first()
+    category_id = Category.objects.values_list('id', flat=True).first()
+    after = seek_after(DEFAULT_ORDERING, [car.created_at, car.id]) if car else None
+    wishlist = Wishlist.objects.first()
+    params = {'category': str(category_id or 0), 'status': 'used', 'model_year': str(car.model_year if car else 2020)}
+
+    paths = [
+        ('car listing', Car.objects.order_by(*DEFAULT_ORDERING)[:25]),
+        ('accessory listing', Accessory.objects.order_by(*DEFAULT_ORDERING)[:25]),
+        ('home page deals', Car.objects.filter(status='Used').order_by('-created_at')[:5]),
+        ('inventory by category', Car.objects.filter(category_id=category_id).order_by(*DEFAULT_ORDERING)[:25]),
+        ('search by status', Car.objects.filter(status='Used').order_by(*DEFAULT_ORDERING)[:25]),
+        ('search by model year', Car.objects.filter(model_year=params['model_year']).order_by(*DEFAULT_ORDERING)[:25]),
+        ('search with filters', filter_cars(Car.objects.all(), params)[0].order_by(*DEFAULT_ORDERING)[:25]),
+        ('accessories by category', Accessory.objects.filter(category_id=category_id).order_by(*DEFAULT_ORDERING)[:25]),
+        ('car reviews', Car.objects.get(pk=car.pk).reviews.order_by('-created_at') if car else None),
+        ('dashboard cars', Car.objects.filter(seller_id=seller_id).order_by('-created_at')),
+        ('dashboard accessories', Accessory.objects.filter(seller_id=seller_id).order_by('-created_at')),
+        ('dashboard received car orders', CarOrder.objects.filter(car__seller_id=seller_id).order_by('-created_at')),
+        ('dashboard received accessory orders',
+         Order.objects.filter(items__accessory__seller_id=seller_id).distinct().order_by('-created_at')),
+        ('dashboard received inquiries', CarInquiry.objects.filter(car__seller_id=seller_id).order_by('-created_at')),
+        ('dashboard my orders', Order.objects.filter(user_id=user_id).order_by('-created_at')),
+        ('dashboard my car orders', CarOrder.objects.filter(user_id=user_id).order_by('-created_at')),
+        ('notifications', Notification.objects.filter(user_id=user_id).order_by('-created_at')),
+        ('header unread count', Notification.objects.filter(user_id=user_id, is_read=False)),
+        ('header latest notifications', Notification.objects.filter(user_id=user_id).order_by('-created_at')[:5]),
+        ('idempotency replay', Order.objects.filter(user_id=user_id, idempotency_key='0' * 32)),
+    ]
+    if after is not None:
+        paths.append(('car listing, next page', Car.objects.filter(after).order_by(*DEFAULT_ORDERING)[:25]))
+    if wishlist is not None:
+        paths.append(('wishlist car ids', wishlist.cars.through.objects.filter(wishlist__user_id=wishlist.user_id)))
+    if connection.vendor in ('sqlite', 'postgresql'):
+        paths.append(('full-text search', search_cars(Car.objects.all(), 'sedan').order_by(*SEARCH_ORDERING)[:25]))
+    return [(name, queryset) for name, queryset in paths if queryset is not None]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot-path queries of the main views and fail if any of them needs a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'EXPLAIN checks are not supported on {connection.vendor}.')
+
+        if not Car.objects.exists():
+            self.stdout.write(self.style.WARNING(
+                'No cars in the database; seed it first so the plans reflect real data.'
+            ))
+
+        self.stdout.write('Explaining hot-path queries...')
+        failures = []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Small tables are cheaper to scan, so the planner would pick a
+                # sequential scan regardless; only report scans it cannot avoid.
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                for name, queryset in hot_paths():
+                    plan = queryset.explain()
+                    scanned = full_scans(name, queryset, plan)
+                    if scanned:
+                        failures.append(name)
+                        self.stdout.write(self.style.ERROR(f'  [X] {name}: full scan of {", ".join(scanned)}'))
+                    else:
+                        self.stdout.write(f'  [OK] {name}')
+                    if options['verbose_plans'] or scanned:
+                        for line in plan.splitlines():
+                            self.stdout.write(f'        {line}')
+            finally:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('RESET enable_seqscan')
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot-path query(ies) fall back to a full table scan.')
+        self.stdout.write(self.style.SUCCESS('[SUCCESS] Every hot-path query uses an index.'))
@@ -0,0 +1,429 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from car_stor import cache
+from car_stor.models import (
+    VERSIONED_MODELS, Accessory, Car, CarFacetCount, CarOrder, CarReview, CarSearchDocument, Cart, CartItem,
+    Category, Notification, Order, OrderItem, Profile,
+)
+
+from .populate_data import ACCESSORY_IMAGES, CAR_IMAGES, CATEGORY_NAMES, store_images
+
+MAKES = {
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Land Cruiser', 'Hilux', 'Prius'],
+    'Honda': ['Accord', 'Civic', 'CR-V', 'Pilot'],
+    'BMW': ['3 Series', '5 Series', 'X3', 'X5'],
+    'Mercedes-Benz': ['C-Class', 'E-Class', 'GLC', 'S-Class'],
+    'Audi': ['A4', 'A6', 'Q5', 'Q7'],
+    'Ford': ['Focus', 'Mustang', 'F-150', 'Explorer'],
+    'Hyundai': ['Elantra', 'Sonata', 'Tucson', 'Santa Fe'],
+    'Kia': ['Rio', 'Sportage', 'Sorento'],
+    'Nissan': ['Altima', 'Patrol', 'X-Trail', 'Leaf'],
+    'Tesla': ['Model 3', 'Model Y', 'Model S'],
+    'Lexus': ['ES 350', 'RX 350', 'LX 600'],
+}
+TRIMS = ['', 'Sport', 'Luxury', 'Premium', 'LE', 'SE', 'Limited', 'Quattro', 'Hybrid LE']
+ENGINES = ['1.6L 4-Cylinder', '2.0L 4-Cylinder Turbo', '2.5L 4-Cylinder', '3.0L 6-Cylinder', '3.5L V6', '5.0L V8']
+
+# Relative frequencies, roughly those of a used-car marketplace
+FUEL_WEIGHTS = {'Petrol': 60, 'Diesel': 22, 'Hybrid': 12, 'Electric': 6}
+TRANSMISSION_WEIGHTS = {'Automatic': 70, 'Manual': 25, 'Semi-Automatic': 5}
+STATUS_WEIGHTS = {'Used': 80, 'New': 20}
+RATING_WEIGHTS = {1: 4, 2: 5, 3: 12, 4: 30, 5: 49}
+ORDER_STATUS_WEIGHTS = {'Completed': 55, 'Approved': 15, 'Pending': 20, 'Declined': 5, 'Cancelled': 5}
+
+ACCESSORY_NOUNS = {
+    'Audio': ['Speaker Set', 'Subwoofer', 'Head Unit', 'Amplifier'],
+    'Body Parts': ['Bumper', 'Side Mirror', 'Fender', 'Spoiler'],
+    'Exterior': ['Roof Rack', 'Mud Flaps', 'Car Cover', 'Wheel Set'],
+    'Interior': ['Seat Covers', 'Floor Mats', 'Steering Cover', 'Dash Camera'],
+    'Lighting': ['LED Headlights', 'Fog Lamps', 'Tail Lights', 'Light Bar'],
+    'Performance': ['Air Intake', 'Exhaust System', 'Brake Kit', 'Coilovers'],
+}
+SENTENCES = [
+    'Well maintained with full service history.',
+    'Excellent condition inside and out.',
+    'One owner, never involved in an accident.',
+    'Recently serviced with new tyres and brakes.',
+    'Loaded with technology and comfort features.',
+    'Perfect for daily commuting and long trips.',
+    'Fits most models; installation guide included.',
+    'Genuine part with a one-year warranty.',
+]
+CITIES = ['Kabul', 'Herat', 'Mazar-i-Sharif', 'Kandahar', 'Jalalabad', 'Kunduz', 'Ghazni']
+
+# Share of users that list cars and accessories; their activity follows a
+# Pareto distribution so a few dealers own most of the inventory
+SELLER_SHARE = 0.1
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep the created_at/updated_at values set on the objects"""
+    models = list(apps.get_app_config('car_stor').get_models())
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, reproducible synthetic dataset for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--cars', type=int, default=10000)
+        parser.add_argument('--accessories', type=int, default=5000)
+        parser.add_argument('--carts', type=int, default=None, help='Default: half of the users')
+        parser.add_argument('--orders', type=int, default=None, help='Default: two per user')
+        parser.add_argument('--car-orders', type=int, default=None, help='Default: one per ten cars')
+        parser.add_argument('--reviews', type=int, default=None, help='Default: one per two cars')
+        parser.add_argument('--notifications', type=int, default=None, help='Default: ten per user')
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='loadtest123', help='Password of every generated user')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if users < 1:
+            raise CommandError('--users must be at least 1.')
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users prefixed '{options['prefix']}_' already exist; pass another --prefix.")
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        self.stats = []
+
+        counts = {
+            'carts': users // 2 if options['carts'] is None else options['carts'],
+            'orders': users * 2 if options['orders'] is None else options['orders'],
+            'car_orders': options['cars'] // 10 if options['car_orders'] is None else options['car_orders'],
+            'reviews': options['cars'] // 2 if options['reviews'] is None else options['reviews'],
+            'notifications': users * 10 if options['notifications'] is None else options['notifications'],
+        }
+
+        self.stdout.write(self.style.SUCCESS(f"Generating synthetic data (seed {options['seed']})..."))
+        started = time.perf_counter()
+        # Rows share the template images, stored once with their variants
+        stored = store_images(CAR_IMAGES + ACCESSORY_IMAGES)
+        self.car_images = [stored[name] for name in CAR_IMAGES if name in stored]
+        self.accessory_images = [stored[name] for name in ACCESSORY_IMAGES if name in stored]
+        if not (self.car_images and self.accessory_images):
+            raise CommandError('The template images were not found in MEDIA_ROOT.')
+
+        with explicit_timestamps():
+            self.categories = {name: Category.objects.get_or_create(name=name)[0] for name in CATEGORY_NAMES}
+            user_ids = self.create_users(users, options['prefix'], options['password'])
+            seller_weights = self.seller_weights(user_ids)
+            cars = self.create_cars(options['cars'], seller_weights)
+            accessories = self.create_accessories(options['accessories'], seller_weights)
+            self.create_carts(counts['carts'], user_ids, accessories)
+            self.create_orders(counts['orders'], user_ids, accessories)
+            self.create_car_orders(counts['car_orders'], user_ids, cars)
+            self.create_reviews(counts['reviews'], user_ids, cars)
+            self.create_notifications(counts['notifications'], user_ids)
+        # bulk_create sends no post_save, so recount facets and invalidate cached pages explicitly
+        CarFacetCount.rebuild()
+        cache.bump(*VERSIONED_MODELS)
+        elapsed = time.perf_counter() - started
+
+        total = sum(rows for _, rows, _ in self.stats)
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Generated {total} rows in {elapsed:.1f}s '
+                                             f'({total / elapsed if elapsed else 0:,.0f} rows/s)'))
+        for label, rows, seconds in self.stats:
+            self.stdout.write(self.style.SUCCESS(
+                f'   - {label}: {rows} ({rows / seconds if seconds else 0:,.0f} rows/s)'
+            ))
+
+    # Helpers
+
+    def weighted(self, weights, k):
+        return self.rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+    def timestamp(self):
+        # Activity grows over time: recent days are denser than old ones
+        age = self.days * (1 - self.rng.random() ** 0.5)
+        return self.now - timedelta(days=age)
+
+    def money(self, low, high):
+        # Log-uniform, so cheap items are more common than expensive ones
+        return Decimal(round(low * (high / low) ** self.rng.random(), 2)).quantize(Decimal('0.01'))
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    def insert(self, objects):
+        if objects:
+            type(objects[0]).objects.bulk_create(objects, batch_size=self.batch_size)
+        return len(objects)
+
+    def bulk(self, label, total, build):
+        """
+        Generate total objects batch_size at a time. build(count) inserts one
+        batch, with any dependent rows, and returns the number of rows written.
+        """
+        self.stdout.write(f'Creating {label}...')
+        started = time.perf_counter()
+        rows = sum(build(count) for count in self.batches(total))
+        self.stats.append((label, rows, time.perf_counter() - started))
+
+    def seller_weights(self, user_ids):
+        sellers = self.rng.sample(user_ids, max(1, int(len(user_ids) * SELLER_SHARE)))
+        return sellers, list(accumulate(self.rng.paretovariate(1.2) for _ in sellers))
+
+    def sellers(self, seller_weights, k):
+        sellers, cum_weights = seller_weights
+        return self.rng.choices(sellers, cum_weights=cum_weights, k=k)
+
+    # Tables
+
+    def create_users(self, total, prefix, password):
+        # Hashing is deliberately slow, so every generated user shares one hash
+        password = make_password(password)
+        user_ids = []
+        index = iter(range(total))
+
+        def build(count):
+            users = []
+            for _ in range(count):
+                i = next(index)
+                joined = self.timestamp()
+                users.append(User(
+                    username=f'{prefix}_{i:07d}', email=f'{prefix}_{i:07d}@example.com',
+                    password=password, date_joined=joined,
+                ))
+            rows = self.insert(users)
+            user_ids.extend(user.pk for user in users)
+            # bulk_create skips the post_save receiver that creates profiles
+            return rows + self.insert([
+                Profile(user=user, city=self.rng.choice(CITIES), created_at=user.date_joined,
+                        updated_at=user.date_joined)
+                for user in users
+            ])
+
+        self.bulk('users', total, build)
+        return user_ids
+
+    def create_cars(self, total, seller_weights):
+        cars = []
+        category = self.categories['Cars']
+        this_year = self.now.year
+
+        def build(count):
+            batch = []
+            for seller_id in self.sellers(seller_weights, count):
+                make = self.rng.choice(list(MAKES))
+                model_year = this_year - min(int(self.rng.expovariate(1 / 5)), 25)
+                age = this_year - model_year
+                status = 'New' if age == 0 else self.weighted(STATUS_WEIGHTS, 1)[0]
+                fuel_type = self.weighted(FUEL_WEIGHTS, 1)[0]
+                price = self.money(60000, 150000) if make in ('Tesla', 'Lexus', 'Mercedes-Benz') else self.money(4000, 90000)
+                price = (price * Decimal(0.88 ** age)).quantize(Decimal('0.01'))
+                created_at = self.timestamp()
+                batch.append(Car(
+                    seller_id=seller_id,
+                    category=category,
+                    title=' '.join(filter(None, [make, self.rng.choice(MAKES[make]), self.rng.choice(TRIMS)])),
+                    image=self.rng.choice(self.car_images),
+                    image_status=Car.READY,
+                    price=price,
+                    old_price=(price * Decimal('1.1')).quantize(Decimal('0.01')) if self.rng.random() < 0.2 else None,
+                    description=' '.join(self.rng.sample(SENTENCES, 3)),
+                    model_year=model_year,
+                    mileage=0 if status == 'New' else max(0, int(age * self.rng.gauss(15000, 5000))) + self.rng.randint(0, 9999),
+                    fuel_type=fuel_type,
+                    transmission=self.weighted(TRANSMISSION_WEIGHTS, 1)[0],
+                    engine='Electric Motor' if fuel_type == 'Electric' else self.rng.choice(ENGINES),
+                    status=status,
+                    air_conditioner=self.rng.random() < 0.9,
+                    power_windows=self.rng.random() < 0.85,
+                    power_steering=self.rng.random() < 0.95,
+                    central_locking=self.rng.random() < 0.8,
+                    abs=self.rng.random() < 0.8,
+                    airbags=self.rng.random() < 0.85,
+                    leather_seats=self.rng.random() < 0.35,
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+            rows = self.insert(batch)
+            cars.extend((car.pk, car.price) for car in batch)
+            # bulk_create skips the post_save receiver that indexes cars for search
+            return rows + self.insert([
+                CarSearchDocument(car=car, updated_at=car.created_at, **CarSearchDocument.fields_for(car))
+                for car in batch
+            ])
+
+        self.bulk('cars', total, build)
+        return cars
+
+    def create_accessories(self, total, seller_weights):
+        accessories = []
+        categories = [self.categories[name] for name in ACCESSORY_NOUNS]
+
+        def build(count):
+            batch = []
+            for seller_id in self.sellers(seller_weights, count):
+                category = self.rng.choice(categories)
+                price = self.money(5, 2500)
+                created_at = self.timestamp()
+                batch.append(Accessory(
+                    seller_id=seller_id,
+                    category=category,
+                    title=f'{self.rng.choice(list(MAKES))} {self.rng.choice(ACCESSORY_NOUNS[category.name])}',
+                    image=self.rng.choice(self.accessory_images),
+                    image_status=Accessory.READY,
+                    price=price,
+                    old_price=(price * Decimal('1.15')).quantize(Decimal('0.01')) if self.rng.random() < 0.2 else None,
+                    description=' '.join(self.rng.sample(SENTENCES, 2)),
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+            rows = self.insert(batch)
+            accessories.extend((accessory.pk, accessory.price) for accessory in batch)
+            return rows
+
+        self.bulk('accessories', total, build)
+        return accessories
+
+    def lines(self, accessories):
+        """Distinct (accessory_id, price, quantity) lines for one cart or order"""
+        picked = self.rng.sample(accessories, min(len(accessories), 1 + int(self.rng.expovariate(0.7))))
+        return [(pk, price, 1 + int(self.rng.expovariate(1.5))) for pk, price in picked]
+
+    def create_carts(self, total, user_ids, accessories):
+        if not accessories:
+            return
+        owners = iter(self.rng.sample(user_ids, min(total, len(user_ids))))
+
+        def build(count):
+            carts, lines = [], []
+            for user_id in (next(owners) for _ in range(count)):
+                cart_lines = self.lines(accessories)
+                carts.append(Cart(
+                    user_id=user_id,
+                    created_at=self.timestamp(),
+                    item_count=sum(quantity for _, _, quantity in cart_lines),
+                    subtotal=sum(price * quantity for _, price, quantity in cart_lines),
+                ))
+                lines.append(cart_lines)
+            return self.insert(carts) + self.insert([
+                CartItem(cart=cart, accessory_id=pk, quantity=quantity)
+                for cart, cart_lines in zip(carts, lines) for pk, _, quantity in cart_lines
+            ])
+
+        self.bulk('carts', min(total, len(user_ids)), build)
+
+    def shipping(self, user_id):
+        return {
+            'full_name': f'Customer {user_id}',
+            'email': f'customer{user_id}@example.com',
+            'phone': f'07{self.rng.randint(0, 99999999):08d}',
+            'address': f'{self.rng.randint(1, 999)} Street {self.rng.randint(1, 99)}',
+            'city': self.rng.choice(CITIES),
+        }
+
+    def create_orders(self, total, user_ids, accessories):
+        if not accessories:
+            return
+
+        def build(count):
+            orders, lines = [], []
+            for _ in range(count):
+                user_id = self.rng.choice(user_ids)
+                order_lines = self.lines(accessories)
+                orders.append(Order(
+                    user_id=user_id,
+                    total_price=sum(price * quantity for _, price, quantity in order_lines),
+                    status=self.weighted(ORDER_STATUS_WEIGHTS, 1)[0],
+                    created_at=self.timestamp(),
+                    **self.shipping(user_id)
+                ))
+                lines.append(order_lines)
+            return self.insert(orders) + self.insert([
+                OrderItem(order=order, accessory_id=pk, quantity=quantity, price=price)
+                for order, order_lines in zip(orders, lines) for pk, price, quantity in order_lines
+            ])
+
+        self.bulk('orders', total, build)
+
+    def create_car_orders(self, total, user_ids, cars):
+        if not cars:
+            return
+
+        def build(count):
+            orders = []
+            for _ in range(count):
+                user_id = self.rng.choice(user_ids)
+                car_id, price = self.rng.choice(cars)
+                orders.append(CarOrder(
+                    user_id=user_id,
+                    car_id=car_id,
+                    total_price=price or 0,
+                    status=self.weighted(ORDER_STATUS_WEIGHTS, 1)[0],
+                    created_at=self.timestamp(),
+                    **self.shipping(user_id)
+                ))
+            return self.insert(orders)
+
+        self.bulk('car orders', total, build)
+
+    def create_reviews(self, total, user_ids, cars):
+        if not cars:
+            return
+        comments = ['Great car, very reliable.', 'Good value for the price.', 'Smooth ride and economical.',
+                    'Had a few issues with the dealer.', 'Not as described.', 'Would buy again.']
+
+        def build(count):
+            ratings = self.weighted(RATING_WEIGHTS, count)
+            return self.insert([
+                CarReview(
+                    car_id=self.rng.choice(cars)[0],
+                    user_id=self.rng.choice(user_ids),
+                    rating=rating,
+                    comment=self.rng.choice(comments),
+                    created_at=self.timestamp(),
+                )
+                for rating in ratings
+            ])
+
+        self.bulk('reviews', total, build)
+
+    def create_notifications(self, total, user_ids):
+        messages = ['Your order has been approved.', 'You have received a new order!',
+                    'A buyer sent an inquiry about your car.', 'Your order has been shipped.']
+
+        def build(count):
+            return self.insert([
+                Notification(
+                    user_id=self.rng.choice(user_ids),
+                    message=self.rng.choice(messages),
+                    is_read=self.rng.random() < 0.7,
+                    created_at=self.timestamp(),
+                )
+                for _ in range(count)
+            ])
+
+        self.bulk('notifications', total, build)
@@ -1,12 +1,52 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from car_stor import images
 from car_stor.models import Category, Car, Accessory, BlogPost
 from django.core.files import File
 import os
-import shutil
 import random
 from decimal import Decimal
 
+CATEGORY_NAMES = [
+    'Cars',
+    'Audio',
+    'Body Parts',
+    'Exterior',
+    'Interior',
+    'Lighting',
+    'Performance',
+]
+
+# Media paths of the template product images, relative to MEDIA_ROOT
+CAR_IMAGES = [f'cars/p{i}.jpg' for i in range(1, 19)]
+ACCESSORY_IMAGES = [f'accessories/p{i}.jpg' for i in range(31, 50)]
+
+TEMPLATE_IMAGES_DIR = r'd:\CAR_TRADE\STOR\harrier-car-dealer-html-responsive-template\harrier-car-dealer-html-responsive-template\products-images'
+
+
+def store_images(names):
+    """
+    Store the template images at the given media paths in the default storage,
+    with their variants, and return {media path: stored name} for those found.
+    Storage is content-addressed, so running this again stores nothing new.
+    """
+    field = Car._meta.get_field('image')
+    stored = {}
+    for name in names:
+        sources = [os.path.join(TEMPLATE_IMAGES_DIR, os.path.basename(name)), os.path.join(settings.MEDIA_ROOT, *name.split('/'))]
+        source = next((path for path in sources if os.path.exists(path)), None)
+        if source is None:
+            continue
+        with open(source, 'rb') as handle:
+            stored_name = default_storage.save(name, File(handle, name))
+        field_file = field.attr_class(None, field, stored_name)
+        if not images.has_variants(field_file):
+            images.generate_variants(field_file)
+        stored[name] = stored_name
+    return stored
+
 class Command(BaseCommand):
     help = 'Populate database with sample data from HTML template'
 
@@ -19,8 +59,9 @@ class Command(BaseCommand):
         # Create categories
         categories = self.create_categories()
         
-        # Copy images
-        self.copy_images()
+        # Store images
+        self.images = store_images(CAR_IMAGES + ACCESSORY_IMAGES)
+        self.stdout.write(self.style.SUCCESS(f'  [+] Images stored: {len(self.images)}'))
         
         # Create cars
         cars_count = self.create_cars(admin_user, root_user, categories['Cars'])
@@ -80,18 +121,8 @@ class Command(BaseCommand):
         """Create product categories"""
         self.stdout.write('Creating categories...')
         
-        category_names = [
-            'Cars',
-            'Audio',
-            'Body Parts',
-            'Exterior',
-            'Interior',
-            'Lighting',
-            'Performance',
-        ]
-        
         categories = {}
-        for name in category_names:
+        for name in CATEGORY_NAMES:
             category, created = Category.objects.get_or_create(name=name)
             categories[name] = category
             if created:
@@ -99,33 +130,13 @@ class Command(BaseCommand):
         
         return categories
 
-    def copy_images(self):
-        """Copy images from template to media directory"""
-        self.stdout.write('Copying images...')
-        
-        template_images_path = r'd:\CAR_TRADE\STOR\harrier-car-dealer-html-responsive-template\harrier-car-dealer-html-responsive-template\products-images'
-        media_path = r'd:\CAR_TRADE\STOR\media'
-        
-        # Create media directories if they don't exist
-        os.makedirs(os.path.join(media_path, 'cars'), exist_ok=True)
-        os.makedirs(os.path.join(media_path, 'accessories'), exist_ok=True)
-        os.makedirs(os.path.join(media_path, 'blog'), exist_ok=True)
-        
-        # Copy car images (p1.jpg to p18.jpg)
-        for i in range(1, 19):
-            src = os.path.join(template_images_path, f'p{i}.jpg')
-            dst = os.path.join(media_path, 'cars', f'p{i}.jpg')
-            if os.path.exists(src) and not os.path.exists(dst):
-                shutil.copy2(src, dst)
-        
-        # Copy accessory images (p31.jpg to p49.jpg)
-        for i in range(31, 50):
-            src = os.path.join(template_images_path, f'p{i}.jpg')
-            dst = os.path.join(media_path, 'accessories', f'p{i}.jpg')
-            if os.path.exists(src) and not os.path.exists(dst):
-                shutil.copy2(src, dst)
-        
-        self.stdout.write(self.style.SUCCESS('  [+] Images copied'))
+    def image_fields(self, name):
+        """The stored image for a template media path, ready if it was found"""
+        if name not in self.images:
+            self.images.update(store_images([name]))
+        if name not in self.images:
+            return {'image': name}
+        return {'image': self.images[name], 'image_status': Car.READY}
 
     def create_cars(self, admin_user, root_user, cars_category):
         """Create sample cars"""
@@ -302,6 +313,7 @@ class Command(BaseCommand):
                 'airbags': random.choice([True, True]),  # Most modern cars have airbags
                 'leather_seats': random.choice([True, False]),
             })
+            data.update(self.image_fields(data['image']))
             
             car, created = Car.objects.get_or_create(
                 title=data['title'],
@@ -469,6 +481,7 @@ class Command(BaseCommand):
             # Alternate between admin and root users
             seller = users[i % 2]
             data['seller'] = seller
+            data.update(self.image_fields(data['image']))
             
             accessory, created = Accessory.objects.get_or_create(
                 title=data['title'],
@@ -588,6 +601,7 @@ class Command(BaseCommand):
             # Alternate between admin and root users
             author = users[i % 2]
             data['author'] = author
+            data.update(self.image_fields(data['image']))
             
             blog_post, created = BlogPost.objects.get_or_create(
                 title=data['title'],
@@ -0,0 +1,60 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from car_stor import images
+from car_stor.models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Generate image variants for queued uploads; run one or more alongside the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs leased per round')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds before a job of a dead worker is retried')
+        parser.add_argument('--max-attempts', type=int, default=5)
+
+    def handle(self, *args, **options):
+        lease = timedelta(seconds=options['lease'])
+        done = failed = 0
+        self.stdout.write('Processing image jobs...')
+        try:
+            while True:
+                close_old_connections()
+                jobs = ImageJob.claim(options['batch_size'], lease)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                for job in jobs:
+                    started = time.perf_counter()
+                    try:
+                        job.run()
+                    except Exception as exc:
+                        # A bad upload is expected; anything else is a bug, so keep its
+                        # traceback, but one job must not take the whole worker down
+                        if isinstance(exc, images.IMAGE_ERRORS):
+                            error = str(exc)
+                        else:
+                            logger.exception('Image job %s failed', job)
+                            error = traceback.format_exc()
+                        retrying = job.fail(error, options['max_attempts'])
+                        failed += not retrying
+                        self.stdout.write(self.style.WARNING(
+                            f'  [!] {job}: {exc} ({"will retry" if retrying else "giving up"})'
+                        ))
+                        continue
+                    done += 1
+                    self.stdout.write(f'  - {job} ({(time.perf_counter() - started) * 1000:.0f} ms)')
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'[SUCCESS] Processed {done} image(s); {failed} failed.'))
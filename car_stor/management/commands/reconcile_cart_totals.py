@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from car_stor.models import Cart
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored cart item counts and subtotals and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Checking cart totals...')
+
+        drifted = (
+            Cart.objects.annotate(**{f'expected_{name}': expr for name, expr in Cart.expected_totals().items()})
+            .exclude(item_count=F('expected_item_count'), subtotal=F('expected_subtotal'))
+            .order_by('pk')
+        )
+
+        drifted_ids = []
+        for cart in drifted.iterator(chunk_size=2000):
+            drifted_ids.append(cart.pk)
+            self.stdout.write(self.style.WARNING(
+                f'  [!] Cart #{cart.pk} (user {cart.user_id}): '
+                f'stored {cart.item_count} items / ${cart.subtotal}, '
+                f'actual {cart.expected_item_count} items / ${cart.expected_subtotal}'
+            ))
+
+        if not drifted_ids:
+            self.stdout.write(self.style.SUCCESS('[SUCCESS] All cart totals are consistent.'))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted_ids)} cart(s) drifted; not fixed (--dry-run).'))
+            return
+
+        for start in range(0, len(drifted_ids), 2000):
+            Cart.recalculate_totals(Cart.objects.filter(pk__in=drifted_ids[start:start + 2000]))
+        self.stdout.write(self.style.SUCCESS(f'[SUCCESS] Fixed {len(drifted_ids)} drifted cart(s).'))
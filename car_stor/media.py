@@ -0,0 +1,163 @@
+"""
+Serving uploaded media.
+
+serve_media answers conditional requests (If-None-Match, If-Modified-Since)
+with 304 before touching the file, and single byte ranges with 206 so video
+players and download managers can resume. Files under a content-hashed name
+(see HASHED_NAME) never change, so they are cached for a year as immutable;
+other files are cached for MEDIA_CACHE_MAX_AGE and revalidated by ETag.
+
+The bytes themselves are sent by the fastest route available:
+
+- MEDIA_SENDFILE = 'x-accel-redirect': nginx serves MEDIA_ACCEL_PREFIX + path
+  from an internal location aliased to MEDIA_ROOT.
+- MEDIA_SENDFILE = 'x-sendfile': Apache (mod_xsendfile) or lighttpd serves the
+  absolute path.
+- otherwise a FileResponse, which gunicorn turns into a zero-copy sendfile();
+  ranges are sent the same way, as only the range's length is announced.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# A hex digest of at least 128 bits as the file name, with any extensions
+# (the original and its image variants)
+HASHED_NAME = re.compile(r'(?:^|/)[0-9a-f]{32,}(?:\.\w+)*$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    The slice [start, start + length) of an open file, for FileResponse.
+    fileno() is kept so gunicorn can still sendfile() from the file's current
+    offset, limited to the Content-Length of the response.
+    """
+
+    def __init__(self, handle, start, length):
+        self.handle = handle
+        self.remaining = length
+        handle.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.handle.fileno()
+
+    def close(self):
+        self.handle.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, None to send the
+    whole file (no, malformed or multi-part ranges), or ValueError if the
+    range lies beyond the end of the file.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # The last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    # If-Range: only resume from the same version of the file
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    modified = parse_http_date_safe(if_range)
+    return modified is not None and int(mtime) <= modified
+
+
+def _cache_headers(response, path, etag, mtime):
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404('No such media file')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404('No such media file')
+
+    match = HASHED_NAME.search(path)
+    # The digest is the content; otherwise inode, mtime and size change with every write
+    etag = f'"{match.group(0).lstrip("/")}"' if match else f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if conditional is not None:
+        return _cache_headers(conditional, path, etag, st.st_mtime)
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    mode = settings.MEDIA_SENDFILE
+    if mode == 'x-accel-redirect':
+        # nginx handles Range and sends the bytes; it keeps Content-Type and Cache-Control
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        return _cache_headers(response, path, etag, st.st_mtime)
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+        return _cache_headers(response, path, etag, st.st_mtime)
+
+    size = st.st_size
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and _range_applies(request, etag, st.st_mtime):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _cache_headers(response, path, etag, st.st_mtime)
+
+    handle = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(handle, start, end - start + 1), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    return _cache_headers(response, path, etag, st.st_mtime)
@@ -0,0 +1,180 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Each worker process counts into its own Registry. With METRICS_DIR set, the
+registry is flushed every METRICS_FLUSH_INTERVAL seconds to a JSON file of
+its own in that directory, and the metrics view sums the files of every
+worker, alive or exited, so gunicorn workers report as one service. Empty
+the directory when the service is restarted, as counters restart from zero.
+Without METRICS_DIR only the serving process is reported.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    'car_stor_http_requests_total': ('counter', 'Requests served, by URL name, method and status'),
+    'car_stor_http_request_duration_seconds': ('histogram', 'Request latency by URL name'),
+    'car_stor_db_queries_total': ('counter', 'SQL statements executed, by URL name'),
+    'car_stor_cache_requests_total': ('counter', 'Cache lookups, by cache and result (hit or miss)'),
+    'car_stor_checkouts_total': ('counter', 'Checkout submissions, by order kind and result'),
+    'car_stor_order_decisions_total': ('counter', 'Orders approved or declined by sellers, by order kind'),
+}
+
+
+def _key(labels):
+    return json.dumps(sorted(labels.items()), separators=(',', ':'))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_flush = 0.0
+        self.path = None
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _key(labels))
+        with self.lock:
+            # One count per bucket, then sum and count
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, labels, list(series)] for (name, labels), series in self.histograms.items()],
+            }
+
+    def flush(self, directory):
+        """Write this process's snapshot to its own file in directory, atomically"""
+        if self.path is None:
+            os.makedirs(directory, exist_ok=True)
+            # The start time keeps a recycled pid from overwriting an exited worker's totals
+            self.path = os.path.join(directory, f'metrics-{os.getpid()}-{int(time.time() * 1000)}.json')
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(handle, 'w') as temp:
+            json.dump(self.snapshot(), temp)
+        os.replace(temp_path, self.path)
+        self.last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        if directory and time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush(directory)
+
+
+registry = Registry()
+
+
+@atexit.register
+def _flush_at_exit():
+    if settings.configured and getattr(settings, 'METRICS_DIR', None) and registry.counters:
+        registry.flush(settings.METRICS_DIR)
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def record_cache(cache, hit, amount=1):
+    if amount:
+        registry.inc('car_stor_cache_requests_total', amount, cache=cache, result='hit' if hit else 'miss')
+
+
+def _merge(total, snapshot):
+    for name, labels, value in snapshot['counters']:
+        key = (name, labels)
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, series in snapshot['histograms']:
+        key = (name, labels)
+        current = total['histograms'].get(key)
+        total['histograms'][key] = series if current is None else [a + b for a, b in zip(current, series)]
+
+
+def collect():
+    """Sum the snapshots of every worker (or just this process without METRICS_DIR)"""
+    total = {'counters': {}, 'histograms': {}}
+    directory = settings.METRICS_DIR
+    if not directory:
+        _merge(total, registry.snapshot())
+        return total
+
+    registry.flush(directory)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not (entry.name.startswith('metrics-') and entry.name.endswith('.json')):
+                continue
+            try:
+                with open(entry.path) as handle:
+                    _merge(total, json.load(handle))
+            except (OSError, ValueError):
+                # Removed or being replaced; the next scrape will see it
+                continue
+    return total
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(labels, **extra):
+    pairs = json.loads(labels) + sorted(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def render():
+    """The collected metrics in the Prometheus text format (version 0.0.4)"""
+    total = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(total['counters'].items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+        for (metric, labels), series in sorted(total['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, series):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, le=_number(float(bound)))} {cumulative}')
+            lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {series[-1]}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(float(series[-2]))}')
+            lines.append(f'{name}_count{_labels(labels)} {series[-1]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Keep in sync with car_stor.search, which queries these objects by name.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE car_stor_carsearchdocument_fts USING fts5(
+        title, engine, category, description,
+        content='car_stor_carsearchdocument', content_rowid='car_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER car_stor_carsearchdocument_ai AFTER INSERT ON car_stor_carsearchdocument BEGIN
+        INSERT INTO car_stor_carsearchdocument_fts(rowid, title, engine, category, description)
+        VALUES (new.car_id, new.title, new.engine, new.category, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER car_stor_carsearchdocument_ad AFTER DELETE ON car_stor_carsearchdocument BEGIN
+        INSERT INTO car_stor_carsearchdocument_fts(car_stor_carsearchdocument_fts, rowid, title, engine, category, description)
+        VALUES ('delete', old.car_id, old.title, old.engine, old.category, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER car_stor_carsearchdocument_au AFTER UPDATE ON car_stor_carsearchdocument BEGIN
+        INSERT INTO car_stor_carsearchdocument_fts(car_stor_carsearchdocument_fts, rowid, title, engine, category, description)
+        VALUES ('delete', old.car_id, old.title, old.engine, old.category, old.description);
+        INSERT INTO car_stor_carsearchdocument_fts(rowid, title, engine, category, description)
+        VALUES (new.car_id, new.title, new.engine, new.category, new.description);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS car_stor_carsearchdocument_au',
+    'DROP TRIGGER IF EXISTS car_stor_carsearchdocument_ad',
+    'DROP TRIGGER IF EXISTS car_stor_carsearchdocument_ai',
+    'DROP TABLE IF EXISTS car_stor_carsearchdocument_fts',
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX car_stor_carsearchdocument_tsv ON car_stor_carsearchdocument USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(engine, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ))
+    """,
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS car_stor_carsearchdocument_tsv',
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def build_search_documents(apps, schema_editor):
+    Car = apps.get_model('car_stor', 'Car')
+    CarSearchDocument = apps.get_model('car_stor', 'CarSearchDocument')
+    cars = Car.objects.select_related('category').iterator(chunk_size=2000)
+    batch = []
+    for car in cars:
+        batch.append(CarSearchDocument(
+            car_id=car.id,
+            title=car.title,
+            engine=car.engine or '',
+            category=car.category.name if car.category_id else '',
+            description=car.description or '',
+        ))
+        if len(batch) >= 2000:
+            CarSearchDocument.objects.bulk_create(batch)
+            batch = []
+    CarSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_stor', '0013_alter_carorder_status_alter_order_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarSearchDocument',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='car_stor.car')),
+                ('title', models.CharField(max_length=200)),
+                ('engine', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
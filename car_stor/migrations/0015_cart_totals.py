@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:22
+
+import decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def backfill_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('car_stor', 'Cart')
+    CartItem = apps.get_model('car_stor', 'CartItem')
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+        subtotal=Coalesce(
+            # Rounded because SQLite multiplies decimals as floats
+            Subquery(items.annotate(
+                total=Round(Sum(F('quantity') * F('accessory__price'), output_field=money), 2)
+            ).values('total')),
+            Value(decimal.Decimal('0.00')),
+            output_field=money,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_stor', '0014_carsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_stor', '0016_order_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accessory',
+            index=models.Index(fields=['created_at', 'id'], name='accessory_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessory',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='accessory_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessory',
+            index=models.Index(fields=['seller', 'created_at'], name='accessory_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['created_at'], name='blogpost_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['created_at', 'id'], name='car_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='car_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='car_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['model_year', 'created_at', 'id'], name='car_year_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['seller', 'created_at'], name='car_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carinquiry',
+            index=models.Index(fields=['car', 'created_at'], name='inquiry_car_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carorder',
+            index=models.Index(fields=['car', 'created_at'], name='carorder_car_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carorder',
+            index=models.Index(fields=['user', 'created_at'], name='carorder_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carreview',
+            index=models.Index(fields=['car', 'created_at'], name='review_car_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='order_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_stor', '0019_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarSearchIndex',
+            fields=[
+                ('car', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='car_stor.car')),
+                ('document', models.TextField(db_column='car_stor_carsearchdocument_fts')),
+            ],
+            options={
+                'db_table': 'car_stor_carsearchdocument_fts',
+                'managed': False,
+            },
+        ),
+    ]
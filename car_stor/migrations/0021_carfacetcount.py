@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:15
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# The bucket bounds of CarFacetCount when this migration was written
+PRICE_BUCKETS = (('0-10000', None, 10000), ('10000-25000', 10000, 25000), ('25000-50000', 25000, 50000),
+                 ('50000-100000', 50000, 100000), ('100000-', 100000, None))
+MILEAGE_BUCKETS = (('0-10000', None, 10000), ('10000-50000', 10000, 50000), ('50000-100000', 50000, 100000),
+                   ('100000-', 100000, None))
+
+
+def bucket(value, buckets):
+    if value is None:
+        return ''
+    for key, low, high in buckets:
+        if (low is None or value >= low) and (high is None or value < high):
+            return key
+    return ''
+
+
+def count_cars(apps, schema_editor):
+    Car = apps.get_model('car_stor', 'Car')
+    CarFacetCount = apps.get_model('car_stor', 'CarFacetCount')
+    fields = ('category_id', 'status', 'fuel_type', 'transmission', 'model_year', 'price', 'mileage')
+    counts = Counter(
+        (category_id or 0, status, fuel_type, transmission, model_year,
+         bucket(Decimal(price) if price is not None else None, PRICE_BUCKETS), bucket(mileage, MILEAGE_BUCKETS))
+        for category_id, status, fuel_type, transmission, model_year, price, mileage
+        in Car.objects.order_by().values_list(*fields).iterator(chunk_size=5000)
+    )
+    CarFacetCount.objects.bulk_create([
+        CarFacetCount(category_id=key[0], status=key[1], fuel_type=key[2], transmission=key[3], model_year=key[4],
+                      price_bucket=key[5], mileage_bucket=key[6], count=count)
+        for key, count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('car_stor', '0020_carsearchindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.BigIntegerField(default=0)),
+                ('status', models.CharField(max_length=10)),
+                ('fuel_type', models.CharField(max_length=20)),
+                ('transmission', models.CharField(max_length=20)),
+                ('model_year', models.IntegerField()),
+                ('price_bucket', models.CharField(blank=True, max_length=20)),
+                ('mileage_bucket', models.CharField(blank=True, max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category_id', 'status', 'fuel_type', 'transmission', 'model_year', 'price_bucket', 'mileage_bucket'), name='carfacetcount_unique_key')],
+            },
+        ),
+        migrations.RunPython(count_cars, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,59 @@
-from django.db import models
+import logging
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import IntegrityError, models, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
 from django.contrib.auth.models import User
 
-class Category(models.Model):
+from . import cache, images
+
+logger = logging.getLogger(__name__)
+
+class ImageVariantsModel(models.Model):
+    """
+    A model with an `image` upload whose resized variants (see images.py)
+    are generated off-request by the process_image_jobs worker. Until they
+    exist, image_variants serves the original.
+    """
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, default=PROCESSING, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def image_variants(self):
+        return images.ImageVariants(self.image, ready=self.image_status == self.READY)
+
+    @classmethod
+    def set_image_status(cls, name, status, pk=None):
+        """Set the status of the rows showing image name; touches updated_at and the
+        cache version itself, since queryset.update sends no signals"""
+        rows = cls.objects.filter(image=name).exclude(image_status=status)
+        if pk is not None:
+            rows = rows.filter(pk=pk)
+        changes = {'image_status': status}
+        if any(field.name == 'updated_at' for field in cls._meta.concrete_fields):
+            changes['updated_at'] = timezone.now()
+        updated = rows.update(**changes)
+        if updated:
+            cache.bump(cls)
+        return updated
+
+class Category(ImageVariantsModel):
     name = models.CharField(max_length=100)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
 
@@ -11,7 +63,7 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
 
-class Car(models.Model):
+class Car(ImageVariantsModel):
     STATUS_CHOICES = (
         ('New', 'New'),
         ('Used', 'Used'),
@@ -61,7 +113,164 @@ class Car(models.Model):
     def __str__(self):
         return self.title
 
-class BlogPost(models.Model):
+    class Meta:
+        # Listings are keyset-paginated on (created_at, id), optionally under one filter
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='car_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='car_category_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='car_status_created_idx'),
+            models.Index(fields=['model_year', 'created_at', 'id'], name='car_year_created_idx'),
+            models.Index(fields=['seller', 'created_at'], name='car_seller_created_idx'),
+        ]
+
+class CarSearchDocument(models.Model):
+    """Denormalized text of a car, indexed for full-text search by car_stor.search"""
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.CharField(max_length=200)
+    engine = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for {self.car_id}"
+
+    @staticmethod
+    def fields_for(car):
+        return {
+            'title': car.title,
+            'engine': car.engine or '',
+            'category': car.category.name if car.category_id else '',
+            'description': car.description or '',
+        }
+
+    @classmethod
+    def refresh(cls, car):
+        cls.objects.update_or_create(car=car, defaults=cls.fields_for(car))
+
+class CarSearchIndex(models.Model):
+    """
+    The SQLite FTS5 table over CarSearchDocument, created by migration 0014.
+    Read-only: car_stor.search joins it to cars so one MATCH yields both the
+    matching rows and their rank.
+    """
+    car = models.OneToOneField(
+        Car, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', db_constraint=False,
+        related_name='search_index',
+    )
+    # FTS5's hidden column named after the table: the left side of MATCH and
+    # the first argument of bm25()
+    document = models.TextField(db_column='car_stor_carsearchdocument_fts')
+
+    class Meta:
+        managed = False
+        db_table = 'car_stor_carsearchdocument_fts'
+
+class CarFacetCount(models.Model):
+    """
+    Number of cars per combination of sidebar facet values (see facets.py),
+    kept in step by the Car receivers below so facet counts never scan the
+    car table. bulk_create, queryset.update() and raw loads send no signals;
+    call rebuild() after them, or run the rebuild_facet_counts command.
+    """
+    # (key, label, low, high): low <= value < high, None for no bound
+    PRICE_BUCKETS = (
+        ('0-10000', 'Under $10,000', None, 10000),
+        ('10000-25000', '$10,000 - $25,000', 10000, 25000),
+        ('25000-50000', '$25,000 - $50,000', 25000, 50000),
+        ('50000-100000', '$50,000 - $100,000', 50000, 100000),
+        ('100000-', 'Over $100,000', 100000, None),
+    )
+    MILEAGE_BUCKETS = (
+        ('0-10000', 'Under 10,000 km', None, 10000),
+        ('10000-50000', '10,000 - 50,000 km', 10000, 50000),
+        ('50000-100000', '50,000 - 100,000 km', 50000, 100000),
+        ('100000-', 'Over 100,000 km', 100000, None),
+    )
+    # The Car fields a combination is made of, and the columns it is stored in
+    CAR_FIELDS = ('category_id', 'status', 'fuel_type', 'transmission', 'model_year', 'price', 'mileage')
+    KEY_FIELDS = ('category_id', 'status', 'fuel_type', 'transmission', 'model_year', 'price_bucket', 'mileage_bucket')
+
+    # A unique constraint treats NULLs as distinct, so "none" is stored as 0 and ''
+    category_id = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10)
+    fuel_type = models.CharField(max_length=20)
+    transmission = models.CharField(max_length=20)
+    model_year = models.IntegerField()
+    price_bucket = models.CharField(max_length=20, blank=True)
+    mileage_bucket = models.CharField(max_length=20, blank=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.count} car(s) in {self.key()}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category_id', 'status', 'fuel_type', 'transmission', 'model_year', 'price_bucket',
+                        'mileage_bucket'],
+                name='carfacetcount_unique_key',
+            ),
+        ]
+
+    def key(self):
+        return {field: getattr(self, field) for field in self.KEY_FIELDS}
+
+    @staticmethod
+    def bucket(value, buckets):
+        if value is None or value == '':
+            return ''
+        value = Decimal(str(value))
+        for key, _, low, high in buckets:
+            if (low is None or value >= low) and (high is None or value < high):
+                return key
+        return ''
+
+    @classmethod
+    def key_for(cls, values):
+        """The combination of a car, from a mapping of CAR_FIELDS"""
+        return {
+            'category_id': values['category_id'] or 0,
+            'status': values['status'],
+            'fuel_type': values['fuel_type'],
+            'transmission': values['transmission'],
+            'model_year': int(values['model_year']),
+            'price_bucket': cls.bucket(values['price'], cls.PRICE_BUCKETS),
+            'mileage_bucket': cls.bucket(values['mileage'], cls.MILEAGE_BUCKETS),
+        }
+
+    @classmethod
+    def add(cls, key, delta):
+        updated = cls.objects.filter(**key).update(count=models.F('count') + delta)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=delta, **key)
+            except IntegrityError:
+                # Another request created the row first
+                cls.objects.filter(**key).update(count=models.F('count') + delta)
+
+    @classmethod
+    def expected_counts(cls):
+        """Number of cars per combination, counted from the car table, keyed by tuple(key.items())"""
+        return Counter(
+            tuple(cls.key_for(dict(zip(cls.CAR_FIELDS, values))).items())
+            for values in Car.objects.order_by().values_list(*cls.CAR_FIELDS).iterator(chunk_size=5000)
+        )
+
+    @classmethod
+    def rebuild(cls, counts=None):
+        """Recount every combination from the car table"""
+        if counts is None:
+            counts = cls.expected_counts()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [cls(count=count, **dict(key)) for key, count in counts.items()], batch_size=1000
+            )
+        return len(counts)
+
+class BlogPost(ImageVariantsModel):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='blog/')
     content = models.TextField()
@@ -71,7 +280,12 @@ class BlogPost(models.Model):
     def __str__(self):
         return self.title 
 
-class Accessory(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='blogpost_created_idx'),
+        ]
+
+class Accessory(ImageVariantsModel):
     seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='accessories', null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='accessories')
     title = models.CharField(max_length=200)
@@ -80,12 +294,18 @@ class Accessory(models.Model):
     old_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.title
 
     class Meta:
         verbose_name_plural = "Accessories"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='accessory_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='accessory_category_created_idx'),
+            models.Index(fields=['seller', 'created_at'], name='accessory_seller_created_idx'),
+        ]
 
 class ContactMessage(models.Model):
     name = models.CharField(max_length=100)
@@ -109,6 +329,11 @@ class CarInquiry(models.Model):
     def __str__(self):
         return f"Inquiry for {self.car.title} from {self.name}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['car', 'created_at'], name='inquiry_car_created_idx'),
+        ]
+
 class Wishlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist')
     cars = models.ManyToManyField(Car, related_name='wishlisted_by', blank=True)
@@ -118,15 +343,87 @@ class Wishlist(models.Model):
     def __str__(self):
         return f"Wishlist for {self.user.username}"
 
+    @classmethod
+    def for_user(cls, user):
+        return cls.objects.filter(user=user).order_by('pk').first() or cls.objects.create(user=user)
+
+    def _toggle(self, through, field, pk):
+        # Delete the row if present, otherwise insert it; no need to load the wishlist
+        deleted, _ = through.objects.filter(wishlist_id=self.pk, **{field: pk}).delete()
+        if deleted:
+            return False
+        through.objects.bulk_create([through(wishlist_id=self.pk, **{field: pk})], ignore_conflicts=True)
+        return True
+
+    def toggle_car(self, car_id):
+        """Add or remove a car; returns True if it is now wishlisted"""
+        return self._toggle(Wishlist.cars.through, 'car_id', car_id)
+
+    def toggle_accessory(self, accessory_id):
+        """Add or remove an accessory; returns True if it is now wishlisted"""
+        return self._toggle(Wishlist.accessories.through, 'accessory_id', accessory_id)
+
+    @staticmethod
+    def car_ids_for(user):
+        return set(Wishlist.cars.through.objects.filter(wishlist__user=user).values_list('car_id', flat=True))
+
+    @staticmethod
+    def accessory_ids_for(user):
+        return set(
+            Wishlist.accessories.through.objects.filter(wishlist__user=user).values_list('accessory_id', flat=True)
+        )
+
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Maintained on every cart write; see adjust_totals and recalculate_totals
+    item_count = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
     def __str__(self):
         return f"Cart for {self.user.username}"
         
     def total_price(self):
-        return sum(item.total_price() for item in self.items.all())
+        return self.subtotal
+
+    def adjust_totals(self, quantity, amount):
+        """Atomically add quantity items worth amount (both may be negative) to the totals"""
+        Cart.objects.filter(pk=self.pk).update(
+            item_count=models.F('item_count') + quantity,
+            # Rounded like expected_totals, or SQLite's float sums drift from it
+            subtotal=Round(models.F('subtotal') + amount, 2),
+        )
+        self.refresh_from_db(fields=['item_count', 'subtotal'])
+
+    def reset_totals(self):
+        Cart.objects.filter(pk=self.pk).update(item_count=0, subtotal=0)
+        self.item_count = 0
+        self.subtotal = 0
+
+    @staticmethod
+    def expected_totals():
+        """Correlated subqueries computing a cart's item count and subtotal from its items"""
+        items = CartItem.objects.filter(cart=models.OuterRef('pk')).order_by().values('cart')
+        item_count = items.annotate(total=models.Sum('quantity')).values('total')
+        # Rounded because SQLite multiplies decimals as floats
+        subtotal = items.annotate(
+            total=Round(models.Sum(
+                models.F('quantity') * models.F('accessory__price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ), 2)
+        ).values('total')
+        return {
+            'item_count': Coalesce(models.Subquery(item_count), 0),
+            'subtotal': Coalesce(
+                models.Subquery(subtotal), Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        }
+
+    @classmethod
+    def recalculate_totals(cls, carts):
+        """Recompute the stored totals of every cart in a queryset in one UPDATE"""
+        return carts.update(**cls.expected_totals())
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -148,6 +445,12 @@ class CarReview(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.car.title} ({self.rating}/5)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['car', 'created_at'], name='review_car_created_idx'),
+        ]
+
 class CarOrder(models.Model):
     ORDER_STATUS = (
         ('Pending', 'Pending'),
@@ -166,10 +469,21 @@ class CarOrder(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=ORDER_STATUS, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Token from the checkout form; a resubmitted form maps back to this order
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
 
     def __str__(self):
         return f"Order #{self.id} - {self.car.title} by {self.user.username}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_car_order_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['car', 'created_at'], name='carorder_car_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='carorder_user_created_idx'),
+        ]
+
 class Order(models.Model):
     ORDER_STATUS = (
         ('Pending', 'Pending'),
@@ -187,10 +501,21 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=ORDER_STATUS, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Token from the checkout form; a resubmitted form maps back to this order
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
 
     def __str__(self):
         return f"Accessory Order #{self.id} by {self.user.username}"
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_order_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     accessory = models.ForeignKey(Accessory, on_delete=models.CASCADE)
@@ -211,7 +536,7 @@ class Profile(models.Model):
     def __str__(self):
         return f"Profile for {self.user.username}"
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
 @receiver(post_save, sender=User)
@@ -223,6 +548,74 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
 
+# Deleting a car cascades to its search document, and the database keeps the
+# full-text index in step with the document table (see migration 0014).
+@receiver(post_save, sender=Car)
+def update_car_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        CarSearchDocument.refresh(instance)
+
+@receiver(post_save, sender=Category)
+def update_category_search_documents(sender, instance, raw=False, **kwargs):
+    if not raw:
+        CarSearchDocument.objects.filter(car__category=instance).update(category=instance.name)
+
+@receiver(pre_delete, sender=Category)
+def clear_category_search_documents(sender, instance, **kwargs):
+    # Cars keep existing with category=NULL, so drop the name from their documents
+    CarSearchDocument.objects.filter(car__category=instance).update(category='')
+
+# Facet counts follow every car that is saved, moved between facet values or
+# deleted (see CarFacetCount).
+@receiver(pre_save, sender=Car)
+def remember_car_facets(sender, instance, raw=False, **kwargs):
+    instance._facet_key = None
+    if not raw and not instance._state.adding:
+        values = Car.objects.filter(pk=instance.pk).values(*CarFacetCount.CAR_FIELDS).first()
+        if values:
+            instance._facet_key = CarFacetCount.key_for(values)
+
+@receiver(post_save, sender=Car)
+def count_car_facets(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_key = getattr(instance, '_facet_key', None)
+    new_key = CarFacetCount.key_for({field: getattr(instance, field) for field in CarFacetCount.CAR_FIELDS})
+    if old_key != new_key:
+        if old_key:
+            CarFacetCount.add(old_key, -1)
+        CarFacetCount.add(new_key, 1)
+
+@receiver(post_delete, sender=Car)
+def uncount_car_facets(sender, instance, **kwargs):
+    CarFacetCount.add(
+        CarFacetCount.key_for({field: getattr(instance, field) for field in CarFacetCount.CAR_FIELDS}), -1
+    )
+
+@receiver(post_delete, sender=Category)
+def uncategorize_car_facets(sender, instance, **kwargs):
+    # The category's cars were set to category=NULL without a post_save each
+    for row in CarFacetCount.objects.filter(category_id=instance.pk):
+        CarFacetCount.add({**row.key(), 'category_id': 0}, row.count)
+    CarFacetCount.objects.filter(category_id=instance.pk).delete()
+
+# Cart subtotals are priced at the current accessory price, so re-price the
+# carts holding an accessory whenever it changes or disappears.
+@receiver(post_save, sender=Accessory)
+def reprice_carts_for_accessory(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        Cart.recalculate_totals(Cart.objects.filter(items__accessory=instance))
+
+@receiver(pre_delete, sender=Accessory)
+def remember_carts_for_accessory(sender, instance, **kwargs):
+    instance._cart_ids = list(CartItem.objects.filter(accessory=instance).values_list('cart_id', flat=True))
+
+@receiver(post_delete, sender=Accessory)
+def reprice_carts_after_accessory_delete(sender, instance, **kwargs):
+    cart_ids = getattr(instance, '_cart_ids', None)
+    if cart_ids:
+        Cart.recalculate_totals(Cart.objects.filter(pk__in=cart_ids))
+
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     message = models.TextField()
@@ -231,3 +624,113 @@ class Notification(models.Model):
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:50]}..."
+
+    class Meta:
+        # Serves the unread count and the latest-first lists, with or without is_read
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at'], name='notif_user_read_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='notif_user_created_idx'),
+        ]
+
+# Models whose rows are rendered into cached pages (see pagecache.py). Any
+# write bumps the model's cache version, which invalidates every key built on
+# it (see cache.py); other models are not versioned, as bumping them would
+# cost a cache round trip per write and invalidate nothing.
+VERSIONED_MODELS = (Car, Accessory, Category, BlogPost)
+
+def bump_cache_version(sender, **kwargs):
+    cache.bump(sender)
+
+for _model in VERSIONED_MODELS:
+    post_save.connect(bump_cache_version, sender=_model, dispatch_uid=f'bump_cache_version_{_model.__name__}')
+    post_delete.connect(bump_cache_version, sender=_model, dispatch_uid=f'bump_cache_version_{_model.__name__}')
+
+class ImageJob(models.Model):
+    """A queued request to generate the variants of one object's image"""
+    model = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    image = models.CharField(max_length=255)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Not before this time: retry backoff, or the lease of the worker running it
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}: {self.image}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='imagejob_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['run_after', 'id'], name='imagejob_run_after_idx'),
+        ]
+
+    @classmethod
+    def enqueue(cls, instance):
+        # One job per object: a newer upload replaces a job that has not run yet
+        cls.objects.update_or_create(
+            model=instance._meta.label_lower,
+            object_id=instance.pk,
+            defaults={'image': instance.image.name, 'attempts': 0, 'last_error': '', 'run_after': timezone.now()},
+        )
+
+    @classmethod
+    def claim(cls, limit, lease):
+        """Lease up to limit due jobs to this worker for lease (a timedelta); jobs
+        of a worker that dies are picked up again once the lease runs out"""
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(run_after__lte=now).order_by('run_after', 'id')[:limit]
+            )
+            cls.objects.filter(pk__in=[job.pk for job in jobs]).update(run_after=now + lease)
+        return jobs
+
+    @property
+    def target_model(self):
+        return apps.get_model(self.model)
+
+    def field_file(self):
+        field = self.target_model._meta.get_field('image')
+        return field.attr_class(None, field, self.image)
+
+    def run(self):
+        images.generate_variants(self.field_file())
+        # The object may have a newer image by now, with a job of its own
+        self.target_model.set_image_status(self.image, ImageVariantsModel.READY, pk=self.object_id)
+        type(self).objects.filter(pk=self.pk, image=self.image).delete()
+
+    def fail(self, error, max_attempts):
+        """Retry with exponential backoff, or give up and leave the original in place"""
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts >= max_attempts:
+            self.target_model.set_image_status(self.image, ImageVariantsModel.FAILED, pk=self.object_id)
+            type(self).objects.filter(pk=self.pk, image=self.image).delete()
+            return False
+        self.run_after = timezone.now() + timedelta(seconds=30 * 2 ** (self.attempts - 1))
+        type(self).objects.filter(pk=self.pk, image=self.image).update(
+            attempts=self.attempts, last_error=error, run_after=self.run_after,
+        )
+        return True
+
+# Models with an `image` upload that gets resized variants (see images.py)
+IMAGE_MODELS = (Category, Car, BlogPost, Accessory)
+
+def mark_new_image(sender, instance, raw=False, **kwargs):
+    # An image that is not committed yet is a new upload, saved to storage by this save
+    if not raw and instance.image and not instance.image._committed:
+        instance.image_status = ImageVariantsModel.PROCESSING
+        instance._queue_image_job = True
+
+def queue_image_job(sender, instance, **kwargs):
+    if getattr(instance, '_queue_image_job', False):
+        instance._queue_image_job = False
+        ImageJob.enqueue(instance)
+
+for _model in IMAGE_MODELS:
+    pre_save.connect(mark_new_image, sender=_model, dispatch_uid=f'mark_new_image_{_model.__name__}')
+    post_save.connect(queue_image_job, sender=_model, dispatch_uid=f'queue_image_job_{_model.__name__}')
@@ -0,0 +1,99 @@
+"""
+Full-page cache for anonymous catalog and blog pages.
+
+Views decorated with cache_anonymous_page serve anonymous GET and HEAD
+requests from the cache, keyed by the absolute URL (query string included)
+and the versions of the models the page renders, so any write to one of
+those models (see car_stor/cache.py) retires every cached copy at once.
+Logged-in users and requests with pending messages always get a fresh render.
+
+On a miss only one request renders: it takes a lock with cache.add, and
+concurrent requests for the same page wait for its result instead of
+rendering it again.
+
+The CSRF token in the shared footer form is masked per request, so it is
+stored as a placeholder and filled in with the visitor's own token on every
+response.
+"""
+import functools
+import re
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from . import metrics
+from .cache import versioned_key
+
+_CSRF_VALUE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_PLACEHOLDER = b'__car_stor_csrf_token__'
+_POLL_INTERVAL = 0.05
+
+
+def _cacheable(request):
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    # len() looks at the stored messages without marking them as shown
+    return not len(get_messages(request))
+
+
+def _store(key, response, timeout):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    content = _CSRF_VALUE.sub(rb'\1' + _CSRF_PLACEHOLDER + rb'\2', response.content)
+    cache.set(key, {'content': content, 'content_type': response['Content-Type']}, timeout)
+
+
+def _respond(request, entry):
+    content = entry['content']
+    if _CSRF_PLACEHOLDER in content:
+        content = content.replace(_CSRF_PLACEHOLDER, get_token(request).encode())
+    return HttpResponse(content, content_type=entry['content_type'])
+
+
+def _wait_for(key, lock_key, timeout):
+    """The entry another request is rendering, or None if it gives up or takes too long"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_INTERVAL)
+        found = cache.get_many([key, lock_key])
+        if key in found:
+            return found[key]
+        if lock_key not in found:
+            return None
+    return None
+
+
+def cache_anonymous_page(*models):
+    """Cache the view's anonymous responses until one of models is written or PAGE_CACHE_TIMEOUT passes"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            if not timeout or not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = versioned_key('page', request.build_absolute_uri(), models=models)
+            entry = cache.get(key)
+            if entry is None:
+                lock_key = key + ':lock'
+                lock_timeout = settings.PAGE_CACHE_LOCK_TIMEOUT
+                locked = cache.add(lock_key, 1, lock_timeout)
+                if not locked:
+                    entry = _wait_for(key, lock_key, lock_timeout)
+                if entry is None:
+                    metrics.record_cache('page', hit=False)
+                    try:
+                        response = view(request, *args, **kwargs)
+                        _store(key, response, timeout)
+                    finally:
+                        if locked:
+                            cache.delete(lock_key)
+                    return response
+            metrics.record_cache('page', hit=True)
+            return _respond(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,156 @@
+import base64
+import json
+import operator
+from datetime import datetime
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    # DjangoJSONEncoder truncates microseconds, which would break equality seeks
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {value!r} in a cursor")
+
+
+def encode_cursor(values):
+    """Encode the ordering key values of a row as an opaque URL-safe token"""
+    raw = json.dumps(list(values), default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Return the list of ordering key values stored in a cursor token"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(cursor)
+    return values
+
+
+def get_page_size(request):
+    default = settings.CATALOG_PAGE_SIZE
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, settings.CATALOG_MAX_PAGE_SIZE))
+
+
+def _reverse(ordering):
+    return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+
+def seek_after(ordering, values):
+    """Build the filter selecting rows strictly after values in the given ordering"""
+    terms = []
+    for i, name in enumerate(ordering):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        term = Q(**{f'{field}__{lookup}': values[i]})
+        for prev_name, prev_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{prev_name.lstrip('-'): prev_value})
+        terms.append(term)
+    # The OR chain alone is not sargable; the redundant bound on the first key
+    # lets the index range start at the cursor instead of scanning up to it
+    first = ordering[0].lstrip('-')
+    bound = Q(**{f"{first}__{'lte' if ordering[0].startswith('-') else 'gte'}": values[0]})
+    return bound & reduce(operator.or_, terms)
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing"""
+
+    def __init__(self, request, object_list, has_next, has_previous, page_size, ordering):
+        self.request = request
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.page_size = page_size
+        self.ordering = ordering
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, name.lstrip('-')) for name in self.ordering)
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self._cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self._cursor(self.object_list[0])
+        return None
+
+    def _url(self, key, cursor):
+        params = self.request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[key] = cursor
+        return '?' + params.urlencode()
+
+    @property
+    def next_url(self):
+        cursor = self.next_cursor
+        return self._url('after', cursor) if cursor else None
+
+    @property
+    def previous_url(self):
+        cursor = self.previous_cursor
+        return self._url('before', cursor) if cursor else None
+
+
+def keyset_paginate(request, queryset, page_size=None, ordering=DEFAULT_ORDERING):
+    """
+    Slice queryset on its ordering key using the ?after= / ?before= cursors.
+
+    ordering must end in a unique field (id) so that every row has a distinct
+    position. Only page_size + 1 rows are fetched, so the cost of a page does
+    not grow with the size of the table. An unreadable cursor falls back to
+    the first page.
+    """
+    page_size = page_size or get_page_size(request)
+    ordering = tuple(ordering)
+
+    try:
+        after = decode_cursor(request.GET['after'], len(ordering)) if request.GET.get('after') else None
+        before = decode_cursor(request.GET['before'], len(ordering)) if request.GET.get('before') else None
+    except InvalidCursor:
+        after = before = None
+
+    if before:
+        reverse = _reverse(ordering)
+        rows = list(queryset.filter(seek_after(reverse, before)).order_by(*reverse)[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(request, rows, True, has_previous, page_size, ordering)
+
+    queryset = queryset.order_by(*ordering)
+    if after:
+        queryset = queryset.filter(seek_after(ordering, after))
+
+    rows = list(queryset[:page_size + 1])
+    return KeysetPage(request, rows[:page_size], len(rows) > page_size, after is not None, page_size, ordering)
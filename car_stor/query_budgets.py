@@ -0,0 +1,45 @@
+"""
+Maximum number of SQL statements per request, by URL name (see urls.py).
+
+Budgets cover the worst case: a logged-in user with a cart, wishlist and
+notifications, so the session, user and header queries are included. They
+must not grow with the number of rows a page shows; raise one only when a
+view gains a genuinely new query, never to absorb a loop. BEGIN and
+savepoint statements are not counted.
+
+Enforced by STOR.middleware.QueryBudgetMiddleware when QUERY_BUDGET_MODE is
+'warn' or 'raise'.
+"""
+
+QUERY_BUDGETS = {
+    # Catalog
+    'index': 10,
+    'search': 13,
+    'car_inventory': 10,
+    'car_inventory_category': 11,
+    'car_detail': 13,
+    'list': 8,
+    'grid': 9,
+    'grid_category': 10,
+    'list1': 10,
+    'list1_category': 11,
+    'accessory_detail': 13,
+    'blog': 9,
+    'blog_detail': 8,
+
+    # Cart and checkout
+    'shopping_cart': 9,
+    'add_to_cart': 10,
+    'remove_from_cart': 10,
+    'checkout': 10,
+    'process_checkout': 13,
+    'car_checkout': 8,
+    'order_success': 10,
+    'wishlist': 10,
+    'wishlist_add_all_to_cart': 11,
+
+    # Accounts
+    'dashboard': 13,
+    'admin_dashboard': 21,
+    'notifications': 11,
+}
@@ -0,0 +1,80 @@
+"""
+Per-request SQL recording, N+1 detection and query budgets.
+
+QueryRecorder hooks every database connection with an execute wrapper, so it
+sees each statement even with DEBUG off. Statements are grouped by shape (the
+SQL with its placeholder lists collapsed); a shape that runs many times in one
+request is almost always a lazy relation read inside a loop.
+
+Budgets are declared per URL name in car_stor/query_budgets.py and enforced
+by STOR.middleware.QueryBudgetMiddleware.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.db import connections
+
+# Placeholder lists differ in length with the number of ids looked up, and
+# literals can be inlined by raw SQL; neither changes the shape of a query
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+# Whether an atomic block opens a transaction or a savepoint depends on the
+# caller (TestCase wraps every test in a transaction), not on the view
+_TRANSACTION_CONTROL = re.compile(r'^\s*(?:BEGIN|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    return _IN_LIST.sub('(...)', shape)
+
+
+class QueryRecorder:
+    """
+    Context manager recording (sql, seconds) for every statement run on any
+    database connection while it is active.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append((sql, time.perf_counter() - start))
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def query_count(self):
+        """Statements other than transaction control, as counted against query budgets"""
+        return sum(1 for sql, _ in self.statements if not _TRANSACTION_CONTROL.match(sql))
+
+    @property
+    def total_time(self):
+        return sum(seconds for _, seconds in self.statements)
+
+    def repeated(self, threshold):
+        """Shapes run at least threshold times, as (shape, count), most frequent first"""
+        counts = Counter(query_shape(sql) for sql, _ in self.statements)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
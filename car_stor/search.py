@@ -0,0 +1,127 @@
+"""
+Full-text search over CarSearchDocument.
+
+SQLite uses the FTS5 table car_stor_carsearchdocument_fts and PostgreSQL the
+GIN expression index car_stor_carsearchdocument_tsv, both created by migration
+0014. Either is joined to the cars, so a search runs the match once and ranks
+only the rows it returns. Any other database falls back to icontains on the
+document table.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import CarSearchDocument, CarSearchIndex
+
+# Must stay identical to the indexed expression in migration 0014, or the GIN
+# index is not used; the columns are filled in by DocumentVector
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({title}, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({engine}, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce({category}, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce({description}, '')), 'C')"
+)
+
+# bm25 column weights for title, engine, category, description
+SQLITE_WEIGHTS = (10.0, 4.0, 4.0, 1.0)
+
+SEARCH_ORDERING = ('search_rank', '-created_at', '-id')
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query or '')
+
+
+class Match(Lookup):
+    """document__match='fts5 query' on CarSearchIndex"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', (*lhs_params, *rhs_params)
+
+
+CarSearchIndex._meta.get_field('document').register_lookup(Match)
+
+
+class Matches(Func):
+    """vector @@ tsquery, as a filter condition"""
+    template = '%(expressions)s'
+    arg_joiner = ' @@ '
+    output_field = BooleanField()
+
+
+class DocumentVector(Func):
+    """The weighted tsvector of the joined CarSearchDocument, as indexed by migration 0014"""
+    fields = ('title', 'engine', 'category', 'description')
+
+    def __init__(self):
+        super().__init__(*[F(f'search_document__{field}') for field in self.fields])
+
+    def as_sql(self, compiler, connection, **extra_context):
+        columns, params = {}, []
+        for field, expression in zip(self.fields, self.get_source_expressions()):
+            sql, column_params = compiler.compile(expression)
+            columns[field] = sql
+            params.extend(column_params)
+        return f'({POSTGRES_VECTOR.format(**columns)})', params
+
+
+def _sqlite_search(queryset, terms):
+    # Every term is quoted and prefix-matched, so user input cannot inject FTS syntax
+    match = ' '.join(f'"{term}"*' for term in terms)
+    # Joined rather than correlated: the MATCH runs once and bm25 is read off
+    # each matching row, instead of re-running the MATCH for every car
+    return queryset.filter(search_index__document__match=match).annotate(
+        search_rank=Func(
+            F('search_index__document'), *map(Value, SQLITE_WEIGHTS), function='bm25', output_field=FloatField()
+        )
+    )
+
+
+def _postgres_search(queryset, terms):
+    tsquery = RawSQL("to_tsquery('english', %s)", (' & '.join(f'{term}:*' for term in terms),))
+    vector = DocumentVector()
+    # Filtered and ranked on the joined document in the same query, so the
+    # GIN index finds the rows and ts_rank only runs on those. The isnull
+    # filter makes the join INNER: behind a LEFT JOIN the non-strict vector
+    # (coalesce) could not be pushed down to the index.
+    queryset = queryset.filter(search_document__isnull=False)
+    return queryset.filter(Matches(vector, tsquery)).annotate(
+        # ts_rank grows with relevance; negate it so both backends sort ascending
+        search_rank=Func(vector, tsquery, template='-ts_rank(%(expressions)s)', output_field=FloatField())
+    )
+
+
+def _fallback_search(queryset, terms):
+    matching = CarSearchDocument.objects.all()
+    for term in terms:
+        matching = matching.filter(
+            Q(title__icontains=term) | Q(engine__icontains=term)
+            | Q(category__icontains=term) | Q(description__icontains=term)
+        )
+    return queryset.filter(id__in=matching.values('car_id')).annotate(
+        search_rank=Value(0.0, output_field=FloatField())
+    )
+
+
+def search_cars(queryset, query):
+    """
+    Restrict a Car queryset to rows matching query, annotated with search_rank.
+
+    Each word of query is matched as a prefix and all words must match. Lower
+    search_rank is more relevant, so order by SEARCH_ORDERING to rank results.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return _sqlite_search(queryset, terms)
+    if vendor == 'postgresql':
+        return _postgres_search(queryset, terms)
+    return _fallback_search(queryset, terms)
@@ -0,0 +1,119 @@
+"""
+Slow query log.
+
+Every database connection gets an execute wrapper (installed from
+CarStorConfig.ready) that appends a JSON line to SLOW_QUERY_LOG for each
+statement slower than SLOW_QUERY_THRESHOLD_MS. A line holds the SQL and its
+parameters, the duration, the view handling the request (set by
+STOR.middleware.SlowQueryMiddleware), the first project frame on the stack
+that issued the query and, with SLOW_QUERY_EXPLAIN, the query plan.
+"""
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+
+# The request being served, for attributing queries to a view
+current_request = contextvars.ContextVar('slow_query_request', default=None)
+_explaining = contextvars.ContextVar('slow_query_explaining', default=False)
+_write_lock = threading.Lock()
+_LOCKING_READ = re.compile(r'\bFOR\s+(?:NO\s+KEY\s+)?(?:KEY\s+)?(?:UPDATE|SHARE)\b', re.IGNORECASE)
+
+
+def _call_site():
+    """The innermost frame in project code, skipping Django and this module"""
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and filename != __file__ and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, base_dir)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _explain(connection, sql, params):
+    # EXPLAIN ANALYZE runs the statement again, so only plain reads are explained;
+    # SELECT ... FOR UPDATE / FOR SHARE would take its row locks a second time
+    if not sql.lstrip().upper().startswith('SELECT') or _LOCKING_READ.search(sql):
+        return None
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN ANALYZE '
+    else:
+        return None
+    token = _explaining.set(True)
+    try:
+        # Inside the request's transaction a failed EXPLAIN rolls back only this
+        # savepoint instead of aborting the transaction on PostgreSQL
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f'EXPLAIN failed: {exc}']
+    finally:
+        _explaining.reset(token)
+
+
+def _write(record):
+    path = settings.SLOW_QUERY_LOG
+    line = json.dumps(record, default=str) + '\n'
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as handle:
+            handle.write(line)
+
+
+class SlowQueryLogger:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        if _explaining.get():
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+            self.log(sql, params, many, duration_ms)
+        return result
+
+    def log(self, sql, params, many, duration_ms):
+        request = current_request.get()
+        match = request.resolver_match if request is not None else None
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(duration_ms, 3),
+            'database': self.connection.alias,
+            'vendor': self.connection.vendor,
+            'sql': sql,
+            'params': None if many else params,
+            'many': many,
+            'view': match.view_name if match else None,
+            'method': request.method if request is not None else None,
+            'path': request.path if request is not None else None,
+            'call_site': _call_site(),
+        }
+        if settings.SLOW_QUERY_EXPLAIN and not many:
+            record['plan'] = _explain(self.connection, sql, params)
+        _write(record)
+
+
+def install(sender, connection, **kwargs):
+    if not any(isinstance(wrapper, SlowQueryLogger) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryLogger(connection))
+
+
+def connect():
+    """Hook every new database connection when the slow query log is enabled"""
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        connection_created.connect(install, dispatch_uid='car_stor_slow_query_log')
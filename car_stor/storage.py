@@ -0,0 +1,62 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their bytes, sharded by the first two
+pairs of hex digits so no directory grows past a few thousand entries:
+
+    cars/IMG_1234.JPG  ->  3f/a9/3fa9...e1.jpg
+
+The upload_to directory and the client's file name are dropped, so identical
+uploads (the same photo on a car and an accessory, a form submitted twice)
+share one file, and a name never changes content, which lets serve_media
+cache every stored URL forever.
+
+Files made from another file and named after it, like the image variants
+3f/a9/3fa9...e1.card.webp, are written with save_derived under exactly the
+name given. As files are shared, nothing is deleted when a row is; the
+collect_orphaned_media command removes files no row refers to.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+ADDRESSED_NAME = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:\.|$)')
+
+
+def is_addressed(name):
+    return bool(ADDRESSED_NAME.match(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def address(self, name, content):
+        """The name content is stored under, keeping only the extension of name"""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return f'{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        addressed = self.address(name, content)
+        if self.exists(addressed):
+            return addressed
+        stored = super().save(addressed, content, max_length)
+        if stored != addressed:
+            # The same bytes were uploaded concurrently and got there first
+            self.delete(stored)
+        return addressed
+
+    def save_derived(self, name, content):
+        """Store a file made from another one (e.g. an image variant) under exactly name"""
+        if self.exists(name):
+            self.delete(name)
+        return super().save(name, content)
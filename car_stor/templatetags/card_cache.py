@@ -0,0 +1,112 @@
+"""
+{% cachedfor %}: a for loop whose body is cached per item.
+
+    {% load card_cache %}
+    {% cachedfor car in cars vary_on forloop.first %}
+        ...card markup...
+    {% empty %}
+        ...
+    {% endcachedfor %}
+
+Each item's markup is cached under its model, pk and updated_at, so saving
+the object retires its card, and under a fingerprint of the loop body, so
+editing the template retires every card it renders. A page fetches all of
+its cards with one get_many and stores the ones it had to render with one
+set_many. Values the body depends on beyond the item (forloop.first, the
+user's wishlist) must be listed after vary_on; they are resolved per item.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from car_stor import metrics
+from car_stor.cache import hashed_key
+
+register = template.Library()
+
+
+class CachedForNode(template.Node):
+    child_nodelists = ('nodelist_loop', 'nodelist_empty')
+
+    def __init__(self, loopvar, sequence, vary_on, nodelist_loop, nodelist_empty):
+        self.loopvar = loopvar
+        self.sequence = sequence
+        self.vary_on = vary_on
+        self.nodelist_loop = nodelist_loop
+        self.nodelist_empty = nodelist_empty
+        source = '\0'.join(node.token.contents for node in nodelist_loop.get_nodes_by_type(template.Node))
+        self.fingerprint = hashlib.md5(f'{loopvar}\0{source}'.encode(), usedforsecurity=False).hexdigest()
+
+    def key(self, item, context):
+        vary = [value.resolve(context) for value in self.vary_on]
+        return hashed_key('card', self.fingerprint, item._meta.label_lower, item.pk, item.updated_at.isoformat(), *vary)
+
+    def render(self, context):
+        items = list(self.sequence.resolve(context, ignore_failures=True) or [])
+        if not items:
+            return self.nodelist_empty.render(context)
+
+        timeout = settings.CARD_CACHE_TIMEOUT
+        parentloop = context.get('forloop', {})
+        rendered, missing = [], {}
+        with context.push():
+            loops = []
+            for i, item in enumerate(items):
+                loops.append({
+                    'counter0': i,
+                    'counter': i + 1,
+                    'revcounter': len(items) - i,
+                    'revcounter0': len(items) - i - 1,
+                    'first': i == 0,
+                    'last': i == len(items) - 1,
+                    'parentloop': parentloop,
+                })
+            keys = []
+            for item, forloop in zip(items, loops):
+                context[self.loopvar], context['forloop'] = item, forloop
+                keys.append(self.key(item, context))
+            found = cache.get_many(keys) if timeout else {}
+
+            for item, forloop, key in zip(items, loops, keys):
+                html = found.get(key)
+                if html is None:
+                    context[self.loopvar], context['forloop'] = item, forloop
+                    html = missing[key] = self.nodelist_loop.render(context)
+                rendered.append(html)
+
+        if timeout:
+            if missing:
+                cache.set_many(missing, timeout)
+            metrics.record_cache('card', hit=True, amount=len(items) - len(missing))
+            metrics.record_cache('card', hit=False, amount=len(missing))
+        return mark_safe(''.join(rendered))
+
+
+@register.tag
+def cachedfor(parser, token):
+    """{% cachedfor item in items [vary_on value ...] %} ... [{% empty %} ...] {% endcachedfor %}"""
+    bits = token.split_contents()
+    if len(bits) < 4 or bits[2] != 'in':
+        raise template.TemplateSyntaxError(f"'{bits[0]}' statements should look like '{bits[0]} x in y'")
+    vary_on = []
+    if len(bits) > 4:
+        if bits[4] != 'vary_on' or len(bits) == 5:
+            raise template.TemplateSyntaxError(f"'{bits[0]}' takes further values only after 'vary_on'")
+        vary_on = [parser.compile_filter(bit) for bit in bits[5:]]
+
+    nodelist_loop = parser.parse(('empty', 'endcachedfor'))
+    if parser.next_token().contents == 'empty':
+        nodelist_empty = parser.parse(('endcachedfor',))
+        parser.delete_first_token()
+    else:
+        nodelist_empty = template.NodeList()
+    return CachedForNode(bits[1], parser.compile_filter(bits[3]), vary_on, nodelist_loop, nodelist_empty)
+
+
+@register.filter
+def member_of(value, collection):
+    """value in collection, for use after vary_on"""
+    return value in collection
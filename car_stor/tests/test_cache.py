@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from car_stor import cache
+from car_stor.models import VERSIONED_MODELS, Accessory, Car, Notification
+
+from .utils import make_accessory, make_car, make_user
+
+
+class VersionedKeyTests(TestCase):
+    def setUp(self):
+        default_cache.clear()
+        self.addCleanup(default_cache.clear)
+        self.seller = make_user('seller')
+
+    def test_writes_bump_the_version_once_committed(self):
+        before = cache.versions(Car)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_car(self.seller)
+            # Still inside the transaction: other requests must not see a new version yet
+            self.assertEqual(cache.versions(Car), before)
+        self.assertNotEqual(cache.versions(Car), before)
+
+    def test_rolled_back_writes_keep_the_version(self):
+        before = cache.versions(Car)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    make_car(self.seller)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.versions(Car), before)
+
+    def test_keys_change_only_with_their_models(self):
+        key = cache.versioned_key('page', '/inventory/', models=(Car,))
+        with self.captureOnCommitCallbacks(execute=True):
+            make_accessory()
+        self.assertEqual(cache.versioned_key('page', '/inventory/', models=(Car,)), key)
+        with self.captureOnCommitCallbacks(execute=True):
+            Car.objects.filter(pk=make_car(self.seller).pk).delete()
+        self.assertNotEqual(cache.versioned_key('page', '/inventory/', models=(Car,)), key)
+
+    def test_bump_without_signals(self):
+        before = cache.versions(Accessory, Car)
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.bump(Car)
+        after = cache.versions(Accessory, Car)
+        self.assertEqual(after['car_stor.accessory'], before['car_stor.accessory'])
+        self.assertNotEqual(after['car_stor.car'], before['car_stor.car'])
+
+    def test_only_models_of_cached_pages_are_versioned(self):
+        self.assertNotIn(Notification, VERSIONED_MODELS)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Notification.objects.create(user=self.seller, message='Hello')
+        self.assertEqual(callbacks, [])
+
+    def test_evicted_version_restarts_above_every_old_value(self):
+        before = cache.versions(Car)['car_stor.car']
+        default_cache.clear()
+        self.assertGreater(cache.versions(Car)['car_stor.car'], before)
+
+
+class SharedCacheTests(SimpleTestCase):
+    def test_a_bump_in_one_worker_is_seen_by_another(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        # Two processes pointed at the same CACHE_URL
+        worker, other_worker = FileBasedCache(location, {}), FileBasedCache(location, {})
+        with mock.patch.object(cache, 'cache', other_worker):
+            key = cache.versioned_key('page', '/inventory/', models=(Car,))
+        with mock.patch.object(cache, 'cache', worker):
+            cache.bump(Car)
+        with mock.patch.object(cache, 'cache', other_worker):
+            self.assertNotEqual(cache.versioned_key('page', '/inventory/', models=(Car,)), key)
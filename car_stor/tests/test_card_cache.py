@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, override_settings
+
+from .utils import make_car, make_user
+
+CARDS = ('{% load card_cache %}'
+         '{% cachedfor car in cars %}[{{ forloop.counter }} {{ car.title }}]{% empty %}none{% endcachedfor %}')
+
+
+def render(source, **context):
+    return Template(source).render(Context(context))
+
+
+class CachedForTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        seller = make_user('seller')
+        self.cars = [make_car(seller, title='Toyota Camry'), make_car(seller, title='Honda Civic')]
+
+    def test_renders_like_a_for_loop(self):
+        self.assertEqual(render(CARDS, cars=self.cars), '[1 Toyota Camry][2 Honda Civic]')
+        self.assertEqual(render(CARDS, cars=[]), 'none')
+
+    def test_cards_are_cached_until_the_object_is_saved(self):
+        render(CARDS, cars=self.cars)
+        # Same updated_at: the cached card is served
+        self.cars[0].title = 'Unsaved'
+        self.assertEqual(render(CARDS, cars=self.cars), '[1 Toyota Camry][2 Honda Civic]')
+        self.cars[0].save()
+        self.assertEqual(render(CARDS, cars=self.cars), '[1 Unsaved][2 Honda Civic]')
+
+    def test_one_get_many_and_one_set_many_per_loop(self):
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            render(CARDS, cars=self.cars)
+            render(CARDS, cars=self.cars)
+        self.assertEqual(get_many.call_count, 2)
+        self.assertEqual(set_many.call_count, 1)
+
+    def test_editing_the_body_retires_the_cards(self):
+        render(CARDS, cars=self.cars)
+        edited = CARDS.replace('[{{', '({{')
+        self.cars[0].title = 'Unsaved'
+        self.assertTrue(render(edited, cars=self.cars).startswith('(1 Unsaved]'))
+
+    def test_vary_on_values_get_their_own_cards(self):
+        source = ('{% load card_cache %}{% cachedfor car in cars vary_on car.pk|member_of:wishlisted %}'
+                  '{{ car.title }}{% if car.pk in wishlisted %}*{% endif %} {% endcachedfor %}')
+        self.assertEqual(render(source, cars=self.cars, wishlisted={self.cars[0].pk}), 'Toyota Camry* Honda Civic ')
+        self.assertEqual(render(source, cars=self.cars, wishlisted=set()), 'Toyota Camry Honda Civic ')
+
+    @override_settings(CARD_CACHE_TIMEOUT=0)
+    def test_disabled_with_a_zero_timeout(self):
+        render(CARDS, cars=self.cars)
+        self.cars[0].title = 'Unsaved'
+        self.assertEqual(render(CARDS, cars=self.cars), '[1 Unsaved][2 Honda Civic]')
+
+    def test_syntax_errors(self):
+        for source in ('{% cachedfor car %}{% endcachedfor %}', '{% cachedfor car in cars by x %}{% endcachedfor %}',
+                       '{% cachedfor car in cars vary_on %}{% endcachedfor %}'):
+            with self.subTest(source=source), self.assertRaises(TemplateSyntaxError):
+                Template('{% load card_cache %}' + source)
@@ -0,0 +1,120 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.models import Cart, CartItem
+from car_stor.views import parse_cart_quantities
+
+from .utils import ViewTestCase, make_accessory, make_user
+
+
+class CartTotalsTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        # Prices a float sum cannot represent exactly
+        self.mats = make_accessory(title='Floor Mats', price=Decimal('0.10'))
+        self.wipers = make_accessory(title='Wipers', price=Decimal('0.20'))
+
+    def cart(self):
+        return Cart.objects.get(user=self.user)
+
+    def assertConsistent(self, item_count, subtotal):
+        cart = self.cart()
+        self.assertEqual((cart.item_count, cart.subtotal), (item_count, Decimal(subtotal)))
+        out = StringIO()
+        call_command('reconcile_cart_totals', '--dry-run', stdout=out)
+        self.assertIn('All cart totals are consistent', out.getvalue())
+
+    def test_adding_and_removing_items(self):
+        self.client.get(reverse('add_to_cart', args=[self.mats.pk]), {'qty': 3})
+        self.client.get(reverse('add_to_cart', args=[self.wipers.pk]))
+        self.client.get(reverse('add_to_cart', args=[self.mats.pk]))
+        self.assertConsistent(5, '0.60')
+
+        item = CartItem.objects.get(cart__user=self.user, accessory=self.mats)
+        self.client.get(reverse('remove_from_cart', args=[item.pk]))
+        self.assertConsistent(1, '0.20')
+
+    def test_updating_quantities_and_emptying(self):
+        self.client.get(reverse('add_to_cart', args=[self.mats.pk]))
+        self.client.get(reverse('add_to_cart', args=[self.wipers.pk]))
+        mats, wipers = CartItem.objects.filter(cart__user=self.user).order_by('pk')
+        self.client.post(reverse('shopping_cart'), {
+            'update_cart_action': 'update_qty',
+            f'cart[{mats.pk}][qty]': '7',
+            f'cart[{wipers.pk}][qty]': '0',
+        })
+        self.assertConsistent(7, '0.70')
+
+        self.client.post(reverse('shopping_cart'), {'update_cart_action': 'empty_cart'})
+        self.assertConsistent(0, '0.00')
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_price_changes_and_deletes_reprice_carts(self):
+        self.client.get(reverse('add_to_cart', args=[self.mats.pk]), {'qty': 2})
+        self.client.get(reverse('add_to_cart', args=[self.wipers.pk]))
+
+        self.mats.price = Decimal('1.15')
+        self.mats.save()
+        self.assertConsistent(3, '2.50')
+
+        self.wipers.delete()
+        self.assertConsistent(2, '2.30')
+
+    def test_reconcile_fixes_drift(self):
+        self.client.get(reverse('add_to_cart', args=[self.mats.pk]), {'qty': 3})
+        Cart.objects.filter(user=self.user).update(item_count=9, subtotal=Decimal('9.99'))
+
+        out = StringIO()
+        call_command('reconcile_cart_totals', stdout=out)
+        self.assertIn('Fixed 1 drifted cart(s)', out.getvalue())
+        self.assertConsistent(3, '0.30')
+
+
+class CartQuantityFormTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        self.items = [
+            CartItem.objects.create(cart=self.cart, accessory=make_accessory(title=f'Part {i}'), quantity=1)
+            for i in range(6)
+        ]
+        Cart.recalculate_totals(Cart.objects.filter(pk=self.cart.pk))
+
+    def update(self, quantities):
+        data = {'update_cart_action': 'update_qty'}
+        data.update({f'cart[{pk}][qty]': str(qty) for pk, qty in quantities.items()})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('shopping_cart'), data)
+        return len(queries)
+
+    def test_parse_skips_malformed_inputs(self):
+        post = QueryDict('cart[1][qty]=3&cart[2][qty]=x&cart[a][qty]=1&cart[3]=2&other=1&cart[4][qty]=-1')
+        self.assertEqual(parse_cart_quantities(post), {1: 3, 4: -1})
+
+    def test_updates_and_removes_lines(self):
+        first, second, third = self.items[:3]
+        self.update({first.pk: 4, second.pk: 0, third.pk: -2})
+        self.assertEqual(dict(CartItem.objects.values_list('pk', 'quantity'))[first.pk], 4)
+        self.assertFalse(CartItem.objects.filter(pk__in=[second.pk, third.pk]).exists())
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).item_count, 7)
+
+    def test_ignores_other_users_lines(self):
+        other_cart = Cart.objects.create(user=make_user('other'))
+        other = CartItem.objects.create(cart=other_cart, accessory=self.items[0].accessory, quantity=1)
+        self.update({other.pk: 9})
+        self.assertEqual(CartItem.objects.get(pk=other.pk).quantity, 1)
+
+    def test_query_count_does_not_grow_with_the_form(self):
+        one = self.update({self.items[0].pk: 2})
+        many = self.update({item.pk: 3 for item in self.items})
+        self.assertEqual(one, many)
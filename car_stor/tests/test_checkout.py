@@ -0,0 +1,125 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.checkout import EmptyCartError, place_order
+from car_stor.models import Cart, CarOrder, CartItem, Notification, Order
+
+from .utils import ViewTestCase, make_accessory, make_car, make_user
+
+SHIPPING = {
+    'full_name': 'Jane Buyer', 'email': 'jane@example.com', 'phone': '555', 'address': '1 Main St', 'city': 'Town',
+}
+
+
+class ProcessCheckoutTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.accessory = make_accessory()
+        self.client.get(reverse('add_to_cart', args=[self.accessory.pk]), {'qty': 2})
+
+    def checkout(self, key='a' * 32):
+        return self.client.post(reverse('process_checkout'), {**SHIPPING, 'idempotency_key': key})
+
+    def test_places_the_order_and_empties_the_cart(self):
+        response = self.checkout()
+        order = Order.objects.get()
+        self.assertRedirects(response, f'/car/order/success/?order_id={order.id}', fetch_redirect_response=False)
+        self.assertEqual(order.items.get().quantity, 2)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(Cart.objects.get(user=self.user).item_count, 0)
+
+    def test_resubmitting_returns_the_same_order(self):
+        first = self.checkout()
+        self.client.get(reverse('add_to_cart', args=[self.accessory.pk]))
+        second = self.checkout()
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(Order.objects.count(), 1)
+        # The item added since is still in the cart
+        self.assertEqual(CartItem.objects.get().quantity, 1)
+
+    def test_new_key_places_a_new_order(self):
+        self.checkout('a' * 32)
+        self.client.get(reverse('add_to_cart', args=[self.accessory.pk]))
+        self.checkout('b' * 32)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_losing_the_race_for_the_key_returns_the_winning_order(self):
+        def concurrent_winner(user, cart, shipping, idempotency_key=None):
+            Order.objects.create(user=user, total_price=0, idempotency_key=idempotency_key, **shipping)
+            raise IntegrityError('unique_order_idempotency_key')
+
+        with mock.patch('car_stor.views.place_order', side_effect=concurrent_winner):
+            response = self.checkout()
+        order = Order.objects.get()
+        self.assertRedirects(response, f'/car/order/success/?order_id={order.id}', fetch_redirect_response=False)
+
+    def test_other_integrity_errors_are_not_reported_as_an_empty_cart(self):
+        with mock.patch('car_stor.views.place_order', side_effect=IntegrityError('broken')):
+            with self.assertRaises(IntegrityError):
+                self.checkout()
+
+
+class CarCheckoutTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.car = make_car(make_user('seller'))
+
+    def test_resubmitting_places_one_order(self):
+        for _ in range(2):
+            response = self.client.post(
+                reverse('car_checkout', args=[self.car.pk]), {**SHIPPING, 'idempotency_key': 'a' * 32}
+            )
+            self.assertRedirects(response, reverse('order_success'), fetch_redirect_response=False)
+        self.assertEqual(CarOrder.objects.count(), 1)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.cart = Cart.objects.create(user=self.user)
+
+    def fill(self, count, sellers):
+        for i in range(count):
+            accessory = make_accessory(sellers[i % len(sellers)], title=f'Part {i}', price=Decimal('10.00') + i)
+            CartItem.objects.create(cart=self.cart, accessory=accessory, quantity=2)
+        Cart.recalculate_totals(Cart.objects.filter(pk=self.cart.pk))
+
+    def test_creates_the_order_and_notifies_each_seller_once(self):
+        sellers = [make_user('seller1'), make_user('seller2')]
+        self.fill(4, sellers)
+        result = place_order(self.user, self.cart, SHIPPING)
+
+        self.assertEqual(result.order.total_price, Decimal('92.00'))
+        self.assertEqual(
+            sorted(result.order.items.values_list('quantity', 'price')),
+            [(2, Decimal('10.00')), (2, Decimal('11.00')), (2, Decimal('12.00')), (2, Decimal('13.00'))],
+        )
+        self.assertEqual(Notification.objects.filter(user__in=sellers).count(), 2)
+        self.assertIn('Part 0, Part 2', Notification.objects.get(user=sellers[0]).message)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(list(result.timings), ['load_cart', 'create_order', 'create_items', 'notify_sellers',
+                                                'clear_cart'])
+
+    def test_empty_cart_raises(self):
+        with self.assertRaises(EmptyCartError):
+            place_order(self.user, self.cart, SHIPPING)
+        self.assertFalse(Order.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        sellers = [make_user('seller1'), make_user('seller2')]
+        self.fill(1, sellers)
+        with CaptureQueriesContext(connection) as small:
+            place_order(self.user, self.cart, SHIPPING)
+        self.fill(12, sellers)
+        with CaptureQueriesContext(connection) as large:
+            place_order(self.user, self.cart, SHIPPING)
+        self.assertEqual(len(small), len(large))
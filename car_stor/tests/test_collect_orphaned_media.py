@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .utils import make_car, make_user
+
+REFERENCED = 'aa/bb/aabb' + '0' * 60 + '.jpg'
+REFERENCED_VARIANT = 'aa/bb/aabb' + '0' * 60 + '.card.webp'
+ORPHAN = 'cc/dd/ccdd' + '1' * 60 + '.jpg'
+ORPHAN_VARIANT = 'cc/dd/ccdd' + '1' * 60 + '.card.webp'
+
+
+class CollectOrphanedMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        make_car(make_user('seller'), image=REFERENCED)
+        make_car(make_user('other'), image='cars/p2.jpg')
+        self.files = [
+            REFERENCED, REFERENCED_VARIANT, ORPHAN, ORPHAN_VARIANT,
+            # Not content-addressed: fixtures read by path, legacy uploads, strays in a shard
+            'cars/p1.jpg', 'cars/p2.jpg', 'blog/b1.jpg', 'cc/dd/upload_tmp.jpg',
+        ]
+        day_ago = time.time() - 2 * 24 * 3600
+        for name in self.files:
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as handle:
+                handle.write(b'x' * 10)
+            os.utime(path, (day_ago, day_ago))
+
+    def path(self, name):
+        return os.path.join(self.media_root, *name.split('/'))
+
+    def remaining(self):
+        return {name for name in self.files if os.path.exists(self.path(name))}
+
+    def collect(self, *args):
+        out = StringIO()
+        call_command('collect_orphaned_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_only_collects_inside_the_shards(self):
+        output = self.collect()
+        self.assertIn('Deleted 2 orphaned file(s)', output)
+        self.assertEqual(set(self.files) - self.remaining(), {ORPHAN, ORPHAN_VARIANT})
+
+    def test_dry_run_removes_nothing(self):
+        output = self.collect('--dry-run')
+        self.assertIn('Would remove 2 orphaned file(s)', output)
+        self.assertEqual(self.remaining(), set(self.files))
+
+    def test_quarantine_keeps_paths(self):
+        quarantine = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, quarantine)
+        self.collect('--quarantine', quarantine)
+        self.assertTrue(os.path.exists(os.path.join(quarantine, *ORPHAN.split('/'))))
+        self.assertNotIn(ORPHAN, self.remaining())
+
+    def test_recent_files_are_kept(self):
+        os.utime(self.path(ORPHAN))
+        self.collect()
+        self.assertIn(ORPHAN, self.remaining())
+
+    def test_include_legacy_collects_everywhere(self):
+        self.collect('--include-legacy')
+        self.assertEqual(self.remaining(), {REFERENCED, REFERENCED_VARIANT, 'cars/p2.jpg'})
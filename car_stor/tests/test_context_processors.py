@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+
+from car_stor.context_processors import car_cart, wishlist_ids
+from car_stor.models import Cart, CartItem, Notification, Wishlist
+
+from .utils import make_accessory, make_car, make_user
+
+
+class CarCartTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_no_queries_until_used(self):
+        with self.assertNumQueries(0):
+            car_cart(self.request)
+            wishlist_ids(self.request)
+
+    def test_totals_come_from_the_cart_row(self):
+        accessory = make_accessory(price=Decimal('12.50'))
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, accessory=accessory, quantity=2)
+        Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+
+        context = car_cart(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(int(context['cart_item_count']), 2)
+            self.assertEqual(context['cart_subtotal'], Decimal('25.00'))
+        rendered = Template('{{ cart_item_count }} item{{ cart_item_count|pluralize }}').render(Context(context))
+        self.assertEqual(rendered, '2 items')
+        self.assertEqual([item.accessory for item in context['cart_preview_items']], [accessory])
+
+    def test_reading_does_not_create_a_cart(self):
+        context = car_cart(self.request)
+        self.assertEqual(int(context['cart_item_count']), 0)
+        self.assertEqual(context['cart_preview_items'], [])
+        self.assertFalse(Cart.objects.exists())
+
+    def test_notifications(self):
+        Notification.objects.create(user=self.user, message='Read', is_read=True)
+        Notification.objects.create(user=self.user, message='Unread')
+        context = car_cart(self.request)
+        self.assertEqual(int(context['unread_notification_count']), 1)
+        self.assertEqual(len(context['latest_notifications']), 2)
+
+    def test_anonymous(self):
+        self.request.user = AnonymousUser()
+        with self.assertNumQueries(0):
+            self.assertEqual(car_cart(self.request)['cart_item_count'], 0)
+            self.assertEqual(wishlist_ids(self.request)['wishlisted_car_ids'], set())
+
+
+class WishlistIdsTests(TestCase):
+    def test_sets_of_wishlisted_ids(self):
+        user = make_user()
+        car = make_car(make_user('seller'))
+        Wishlist.for_user(user).toggle_car(car.pk)
+        request = RequestFactory().get('/')
+        request.user = user
+        ids = wishlist_ids(request)
+        with self.assertNumQueries(1):
+            self.assertIn(car.pk, ids['wishlisted_car_ids'])
+            self.assertNotIn(car.pk + 1, ids['wishlisted_car_ids'])
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import TestCase
+
+from car_stor.management.commands.explain_hot_paths import full_scans
+from car_stor.models import Car
+from car_stor.pagination import DEFAULT_ORDERING
+
+from .utils import make_car, make_category, make_user
+
+
+class FullScansTests(TestCase):
+    def setUp(self):
+        self.page = Car.objects.order_by(*DEFAULT_ORDERING)[:25]
+
+    def test_index_scans_are_flagged_unless_allow_listed(self):
+        plan = 'SCAN car_stor_car USING INDEX car_created_idx'
+        self.assertEqual(full_scans('car listing, next page', self.page, plan), ['car_stor_car'])
+        self.assertEqual(full_scans('car listing', self.page, plan), [])
+
+    def test_allow_list_needs_a_limit_and_an_ordered_walk(self):
+        self.assertEqual(
+            full_scans('car listing', Car.objects.order_by(*DEFAULT_ORDERING),
+                       'SCAN car_stor_car USING INDEX car_created_idx'),
+            ['car_stor_car'],
+        )
+        self.assertEqual(full_scans('car listing', self.page, 'SCAN car_stor_car'), ['car_stor_car'])
+        self.assertEqual(
+            full_scans('car listing', self.page,
+                       'SCAN car_stor_car USING INDEX car_status_idx\nUSE TEMP B-TREE FOR ORDER BY'),
+            ['car_stor_car'],
+        )
+
+    def test_searches_and_fts_matches_pass(self):
+        plan = ('SCAN car_stor_carsearchdocument_fts VIRTUAL TABLE INDEX 0:M4\n'
+                'SEARCH car_stor_car USING INTEGER PRIMARY KEY (rowid=?)\n'
+                'SCAN CONSTANT ROW')
+        self.assertEqual(full_scans('full-text search', self.page, plan), [])
+        self.assertEqual(
+            full_scans('full-text search', self.page, 'SCAN car_stor_carsearchdocument_fts VIRTUAL TABLE INDEX 0:'),
+            ['car_stor_carsearchdocument_fts'],
+        )
+
+    def test_an_unbounded_seek_is_caught(self):
+        car = make_car(make_user('seller'))
+        # The seek without its leading bound on created_at
+        or_chain = Q(created_at__lt=car.created_at) | Q(created_at=car.created_at, id__lt=car.id)
+        queryset = Car.objects.filter(or_chain).order_by(*DEFAULT_ORDERING)[:25]
+        self.assertEqual(full_scans('car listing, next page', queryset, queryset.explain()), ['car_stor_car'])
+
+
+class ExplainHotPathsCommandTests(TestCase):
+    def test_every_hot_path_uses_an_index(self):
+        seller = make_user('seller')
+        make_car(seller, make_category())
+        make_car(seller, model_year=2018)
+        out = StringIO()
+        call_command('explain_hot_paths', stdout=out)
+        self.assertIn('[SUCCESS]', out.getvalue())
+        self.assertIn('car listing, next page', out.getvalue())
@@ -0,0 +1,144 @@
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from car_stor.facets import facet_counts, facet_rows, filter_cars
+from car_stor.models import Car, CarFacetCount
+
+from .utils import ViewTestCase, make_car, make_category, make_user
+
+
+def stored_counts():
+    return {tuple(row.key().values()): row.count for row in CarFacetCount.objects.filter(count__gt=0)}
+
+
+def options(facets, name):
+    facet = next(facet for facet in facets if facet['name'] == name)
+    return {option['value']: option['count'] for option in facet['options']}
+
+
+class CarFacetCountTests(TestCase):
+    def setUp(self):
+        self.seller = make_user('seller')
+        self.sedan = make_category('Sedan')
+
+    def assertMatchesRebuild(self):
+        maintained = stored_counts()
+        CarFacetCount.rebuild()
+        self.assertEqual(maintained, stored_counts())
+
+    def test_follows_creates_updates_and_deletes(self):
+        car = make_car(self.seller, self.sedan, price=Decimal('9000'), mileage=None)
+        make_car(self.seller, self.sedan, status='New', fuel_type='Hybrid')
+        self.assertMatchesRebuild()
+
+        car.price = Decimal('30000')
+        car.status = 'New'
+        car.save()
+        self.assertMatchesRebuild()
+
+        car.title = 'Renamed'
+        car.save()
+        self.assertMatchesRebuild()
+
+        car.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(sum(stored_counts().values()), 1)
+
+    def test_deleting_a_category_moves_its_cars_to_none(self):
+        make_car(self.seller, self.sedan)
+        make_car(self.seller)
+        self.sedan.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(set(CarFacetCount.objects.filter(count__gt=0).values_list('category_id', flat=True)), {0})
+
+    def test_buckets_follow_the_bounds(self):
+        self.assertEqual(CarFacetCount.bucket(Decimal('9999.99'), CarFacetCount.PRICE_BUCKETS), '0-10000')
+        self.assertEqual(CarFacetCount.bucket(10000, CarFacetCount.PRICE_BUCKETS), '10000-25000')
+        self.assertEqual(CarFacetCount.bucket(250000, CarFacetCount.PRICE_BUCKETS), '100000-')
+        self.assertEqual(CarFacetCount.bucket(None, CarFacetCount.MILEAGE_BUCKETS), '')
+
+
+class RebuildFacetCountsTests(TestCase):
+    def setUp(self):
+        seller = make_user('seller')
+        make_car(seller, status='New')
+        make_car(seller)
+        # An update that sends no signals
+        Car.objects.update(status='Used')
+
+    def rebuild_facet_counts(self, *args):
+        out = io.StringIO()
+        call_command('rebuild_facet_counts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_drift(self):
+        output = self.rebuild_facet_counts('--dry-run')
+        self.assertIn("'status': 'New'", output)
+        self.assertIn('2 facet count(s) drifted; not fixed (--dry-run).', output)
+        self.assertEqual(CarFacetCount.objects.get(status='New', count__gt=0).count, 1)
+
+    def test_fixes_drift(self):
+        self.assertIn('[SUCCESS] Fixed 2 drifted facet count(s)', self.rebuild_facet_counts())
+        self.assertEqual(list(stored_counts().values()), [2])
+        self.assertIn('[SUCCESS] All facet counts are consistent.', self.rebuild_facet_counts())
+
+class FacetCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = make_user('seller')
+        cls.sedan = make_category('Sedan')
+        for status, fuel_type, count in (('Used', 'Petrol', 3), ('Used', 'Diesel', 2), ('New', 'Petrol', 1)):
+            for _ in range(count):
+                make_car(seller, cls.sedan, status=status, fuel_type=fuel_type)
+
+    def counts(self, query, queryset=None):
+        params = QueryDict(query)
+        _, selected = filter_cars(Car.objects.all(), params)
+        return facet_counts(facet_rows(queryset), params, selected)
+
+    def test_unfiltered_counts(self):
+        facets = self.counts('')
+        self.assertEqual(options(facets, 'status'), {'New': 1, 'Used': 5})
+        self.assertEqual(options(facets, 'fuel_type'), {'Petrol': 4, 'Diesel': 2})
+        self.assertEqual(options(facets, 'category'), {self.sedan.pk: 6})
+
+    def test_a_selected_facet_keeps_its_alternatives(self):
+        facets = self.counts('status=used')
+        # Status is counted without its own filter, the others under it
+        self.assertEqual(options(facets, 'status'), {'New': 1, 'Used': 5})
+        self.assertEqual(options(facets, 'fuel_type'), {'Petrol': 3, 'Diesel': 2})
+
+    def test_each_facet_is_counted_under_the_other_filters(self):
+        facets = self.counts('status=used&fuel_type=diesel')
+        self.assertEqual(options(facets, 'status'), {'Used': 2})
+        self.assertEqual(options(facets, 'fuel_type'), {'Petrol': 3, 'Diesel': 2})
+
+    def test_counts_over_a_queryset_match_the_table(self):
+        query = 'status=new&price=10000-25000'
+        self.assertEqual(self.counts(query, Car.objects.all()), self.counts(query))
+
+
+class FacetViewTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        seller = make_user('seller')
+        make_car(seller, model_year=2019)
+        make_car(seller, model_year=2019, status='New')
+        make_car(seller, model_year=2021)
+
+    def test_index_lists_model_years_with_counts(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(
+            [(year['value'], year['count']) for year in response.context['model_years']], [(2021, 1), (2019, 2)],
+        )
+
+    def test_inventory_facets_ignore_their_own_filter(self):
+        response = self.client.get(reverse('car_inventory'), {'status': 'new'})
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertEqual(options(response.context['facets'], 'status'), {'New': 1, 'Used': 2})
+        self.assertEqual(options(response.context['facets'], 'model_year'), {2019: 1})
@@ -0,0 +1,128 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from car_stor import images
+from car_stor.models import Car, ImageJob
+
+from .test_images import image_bytes
+from .utils import make_car, make_user
+
+
+def run_worker(**options):
+    out = io.StringIO()
+    call_command('process_image_jobs', once=True, stdout=out, **options)
+    return out.getvalue()
+
+
+class ImageJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.seller = make_user('seller')
+
+    def upload(self, content, car=None):
+        car = car or make_car(self.seller, image=None)
+        car.image = ContentFile(content, name='photo.jpg')
+        car.save()
+        return car
+
+    def test_upload_queues_one_job_per_object(self):
+        car = self.upload(image_bytes((800, 400)))
+        self.assertEqual(car.image_status, Car.PROCESSING)
+        first = car.image.name
+        self.upload(image_bytes((400, 400)), car=car)
+        job = ImageJob.objects.get()
+        self.assertEqual((job.model, job.object_id), ('car_stor.car', car.pk))
+        self.assertEqual(job.image, car.image.name)
+        self.assertNotEqual(job.image, first)
+
+    def test_saving_without_a_new_upload_queues_nothing(self):
+        car = self.upload(image_bytes((800, 400)))
+        ImageJob.objects.all().delete()
+        car.title = 'Honda Civic'
+        car.save()
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_worker_generates_variants_and_marks_ready(self):
+        car = self.upload(image_bytes((800, 400)))
+        output = run_worker()
+        car.refresh_from_db()
+        self.assertEqual(car.image_status, Car.READY)
+        self.assertTrue(images.has_variants(car.image))
+        self.assertFalse(ImageJob.objects.exists())
+        self.assertIn('[SUCCESS] Processed 1 image(s); 0 failed.', output)
+
+    def test_broken_upload_is_retried_with_backoff(self):
+        car = self.upload(b'not an image')
+        output = run_worker()
+        self.assertIn('will retry', output)
+        job = ImageJob.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+        car.refresh_from_db()
+        self.assertEqual(car.image_status, Car.PROCESSING)
+
+    def test_gives_up_after_max_attempts(self):
+        car = self.upload(b'not an image')
+        output = run_worker(max_attempts=1)
+        self.assertIn('giving up', output)
+        self.assertFalse(ImageJob.objects.exists())
+        car.refresh_from_db()
+        self.assertEqual(car.image_status, Car.FAILED)
+        # The original stays in place
+        self.assertTrue(car.image.storage.exists(car.image.name))
+
+    def test_unexpected_errors_do_not_stop_the_worker(self):
+        broken = self.upload(image_bytes((800, 400)))
+        healthy = self.upload(image_bytes((400, 400)))
+        run = ImageJob.run
+
+        def run_or_crash(job):
+            if job.object_id == broken.pk:
+                raise RuntimeError('bug')
+            run(job)
+
+        with mock.patch.object(ImageJob, 'run', autospec=True, side_effect=run_or_crash), \
+                self.assertLogs('car_stor.management.commands.process_image_jobs', 'ERROR'):
+            output = run_worker(max_attempts=1)
+        self.assertIn('[SUCCESS] Processed 1 image(s); 1 failed.', output)
+        broken.refresh_from_db()
+        healthy.refresh_from_db()
+        self.assertEqual((broken.image_status, healthy.image_status), (Car.FAILED, Car.READY))
+        self.assertFalse(ImageJob.objects.exists())
+
+    def test_unexpected_errors_keep_their_traceback(self):
+        self.upload(image_bytes((800, 400)))
+        with mock.patch.object(ImageJob, 'run', side_effect=RuntimeError('bug')), self.assertLogs(level='ERROR'):
+            run_worker()
+        self.assertIn('RuntimeError: bug', ImageJob.objects.get().last_error)
+        self.assertIn('Traceback', ImageJob.objects.get().last_error)
+
+    def test_claimed_jobs_are_leased(self):
+        self.upload(image_bytes((800, 400)))
+        self.assertEqual(len(ImageJob.claim(10, timedelta(minutes=5))), 1)
+        self.assertEqual(ImageJob.claim(10, timedelta(minutes=5)), [])
+        # A worker that died: its lease runs out and the job is picked up again
+        ImageJob.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(len(ImageJob.claim(10, timedelta(minutes=5))), 1)
+
+    def test_job_for_a_replaced_image_does_not_mark_the_new_one(self):
+        car = self.upload(image_bytes((800, 400)))
+        [stale] = ImageJob.claim(10, timedelta(minutes=5))
+        self.upload(image_bytes((400, 400)), car=car)
+        stale.run()
+        car.refresh_from_db()
+        self.assertEqual(car.image_status, Car.PROCESSING)
+        self.assertEqual(ImageJob.objects.get().image, car.image.name)
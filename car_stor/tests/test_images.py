@@ -0,0 +1,109 @@
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+from PIL import Image
+
+from car_stor import images
+
+EXIF_ORIENTATION = 0x0112
+
+
+def image_bytes(size, fmt='JPEG', mode='RGB', orientation=None):
+    buffer = io.BytesIO()
+    image = Image.new(mode, size, 'red' if mode == 'RGB' else (255, 0, 0, 0))
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        options['exif'] = exif.tobytes()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+class FieldFile:
+    """The parts of a FieldFile that generate_variants and ImageVariants use"""
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    def __bool__(self):
+        return bool(self.name)
+
+
+class GenerateVariantsTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = FileSystemStorage(location=location, base_url='/media/')
+
+    def generate(self, content, name='cars/photo.jpg'):
+        name = self.storage.save(name, ContentFile(content))
+        field_file = FieldFile(self.storage, name)
+        return field_file, images.generate_variants(field_file)
+
+    def open(self, name):
+        with self.storage.open(name, 'rb') as handle:
+            image = Image.open(io.BytesIO(handle.read()))
+            image.load()
+            return image
+
+    def test_one_variant_per_size_and_format(self):
+        field_file, names = self.generate(image_bytes((2000, 1000)))
+        self.assertEqual(names, images.variant_names(field_file.name))
+        self.assertTrue(images.has_variants(field_file))
+        self.assertEqual(self.open('cars/photo.card.webp').format, 'WEBP')
+        self.assertEqual(self.open('cars/photo.card.jpg').size, (480, 240))
+        self.assertEqual(self.open('cars/photo.detail.jpg').size, (1200, 600))
+
+    def test_small_images_are_not_scaled_up(self):
+        self.generate(image_bytes((100, 50)))
+        self.assertEqual(self.open('cars/photo.detail.jpg').size, (100, 50))
+
+    def test_rotated_upright_without_exif(self):
+        # Orientation 6: stored sideways, shown rotated by 90 degrees
+        self.generate(image_bytes((400, 200), orientation=6))
+        variant = self.open('cars/photo.thumb.jpg')
+        self.assertEqual(variant.size, (160, 320))
+        self.assertNotIn(EXIF_ORIENTATION, variant.getexif())
+
+    def test_transparency_is_flattened_for_jpeg(self):
+        self.generate(image_bytes((50, 50), fmt='PNG', mode='RGBA'), name='accessories/logo.png')
+        self.assertEqual(self.open('accessories/logo.card.jpg').getpixel((0, 0)), (255, 255, 255))
+        self.assertEqual(self.open('accessories/logo.card.webp').mode, 'RGBA')
+
+    def test_regenerating_replaces_variants(self):
+        field_file, _ = self.generate(image_bytes((2000, 1000)))
+        self.storage.delete(field_file.name)
+        self.storage.save(field_file.name, ContentFile(image_bytes((1000, 1000))))
+        names = images.generate_variants(field_file)
+        self.assertEqual(names, images.variant_names(field_file.name))
+        self.assertEqual(self.open('cars/photo.card.jpg').size, (480, 480))
+
+
+class ImageVariantsTests(SimpleTestCase):
+    def setUp(self):
+        self.field_file = FieldFile(FileSystemStorage(location='/unused', base_url='/media/'), 'cars/p1.jpg')
+
+    def test_urls_and_srcsets(self):
+        variants = images.ImageVariants(self.field_file)
+        self.assertEqual(variants.card, '/media/cars/p1.card.jpg')
+        self.assertEqual(
+            variants.webp_srcset,
+            '/media/cars/p1.thumb.webp 160w, /media/cars/p1.card.webp 480w, /media/cars/p1.detail.webp 1200w',
+        )
+
+    def test_original_until_ready(self):
+        variants = images.ImageVariants(self.field_file, ready=False)
+        self.assertEqual(variants.card, '/media/cars/p1.jpg')
+        self.assertEqual(variants.jpeg_srcset, '')
+
+    def test_variant_root(self):
+        self.assertEqual(images.variant_root('cars/p1.card.webp'), 'cars/p1')
+        self.assertEqual(images.variant_root('cars/p1.detail.jpg'), 'cars/p1')
+        self.assertIsNone(images.variant_root('cars/p1.jpg'))
+        self.assertIsNone(images.variant_root('cars/p1.huge.webp'))
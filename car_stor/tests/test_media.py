@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from car_stor.media import IMMUTABLE_MAX_AGE, parse_range
+
+HASHED = 'ab/cd/' + 'abcd' * 16 + '.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+
+    def test_whole_file_for_unsupported_ranges(self):
+        for header in ('bytes=0-1,5-9', 'items=0-9', 'bytes=-', 'bytes=9-0'):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1000))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=1000-', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 1000)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ServeMediaTests(SimpleTestCase):
+    def setUp(self):
+        self.media_root = media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, MEDIA_SENDFILE='', MEDIA_CACHE_MAX_AGE=60)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name in (HASHED, 'cars/photo.jpg'):
+            path = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as handle:
+                handle.write(CONTENT)
+
+    def get(self, name, **headers):
+        response = self.client.get('/media/' + name, **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get('cars/photo.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+    def test_hashed_names_are_immutable(self):
+        response = self.get(HASHED)
+        self.assertEqual(response['Cache-Control'], f'public, max-age={IMMUTABLE_MAX_AGE}, immutable')
+        self.assertEqual(response['ETag'], f'"{HASHED.rsplit("/", 1)[1]}"')
+
+    def test_not_modified(self):
+        etag = self.get('cars/photo.jpg')['ETag']
+        response = self.get('cars/photo.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        last_modified = self.get(HASHED)['Last-Modified']
+        self.assertEqual(self.get(HASHED, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_range(self):
+        response = self.get('cars/photo.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.body(response), CONTENT[10:20])
+
+        response = self.get('cars/photo.jpg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(self.body(response), CONTENT[-4:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get('cars/photo.jpg', HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_if_range_only_resumes_the_same_version(self):
+        etag = self.get('cars/photo.jpg')['ETag']
+        self.assertEqual(self.get('cars/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        response = self.get('cars/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), CONTENT)
+        response = self.get('cars/photo.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_unsafe_paths(self):
+        for name in ('cars/missing.jpg', 'cars', '../settings.py'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    def test_only_get_and_head(self):
+        self.assertEqual(self.client.post('/media/cars/photo.jpg').status_code, 405)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.get('cars/photo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/cars/photo.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.get('cars/photo.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, 'cars', 'photo.jpg'))
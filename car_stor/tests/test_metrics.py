@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from car_stor import metrics
+
+from .utils import ViewTestCase, make_user
+
+
+class MetricsTestMixin:
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@override_settings(METRICS_DIR='')
+class RenderTests(MetricsTestMixin, SimpleTestCase):
+    def test_counters_and_histograms(self):
+        metrics.inc('car_stor_checkouts_total', kind='car', result='placed')
+        metrics.inc('car_stor_checkouts_total', 2, kind='car', result='placed')
+        metrics.observe('car_stor_http_request_duration_seconds', 0.02, view='index')
+        metrics.observe('car_stor_http_request_duration_seconds', 20, view='index')
+        text = metrics.render()
+
+        self.assertIn('# TYPE car_stor_checkouts_total counter', text)
+        self.assertIn('car_stor_checkouts_total{kind="car",result="placed"} 3', text)
+        self.assertIn('car_stor_http_request_duration_seconds_bucket{view="index",le="0.01"} 0', text)
+        self.assertIn('car_stor_http_request_duration_seconds_bucket{view="index",le="0.025"} 1', text)
+        self.assertIn('car_stor_http_request_duration_seconds_bucket{view="index",le="10.0"} 1', text)
+        self.assertIn('car_stor_http_request_duration_seconds_bucket{view="index",le="+Inf"} 2', text)
+        self.assertIn('car_stor_http_request_duration_seconds_sum{view="index"} 20.02', text)
+        self.assertIn('car_stor_http_request_duration_seconds_count{view="index"} 2', text)
+
+    def test_label_values_are_escaped(self):
+        metrics.inc('car_stor_cache_requests_total', cache='a"b\\c\nd', result='hit')
+        self.assertIn(r'car_stor_cache_requests_total{cache="a\"b\\c\nd",result="hit"} 1', metrics.render())
+
+    def test_workers_are_summed_from_metrics_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        # Another worker that has since exited
+        other = metrics.Registry()
+        other.path = os.path.join(directory, 'metrics-1-1.json')
+        other.inc('car_stor_checkouts_total', 5, kind='car', result='placed')
+        other.flush(directory)
+        metrics.inc('car_stor_checkouts_total', kind='car', result='placed')
+
+        with override_settings(METRICS_DIR=directory):
+            self.assertIn('car_stor_checkouts_total{kind="car",result="placed"} 6', metrics.render())
+            # A scrape flushes this process's own file, which must not count twice
+            self.assertIn('car_stor_checkouts_total{kind="car",result="placed"} 6', metrics.render())
+
+
+@override_settings(METRICS_DIR='', METRICS_TOKEN='secret')
+class MetricsEndpointTests(MetricsTestMixin, ViewTestCase):
+    def test_requires_staff_or_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 404
+        )
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        self.client.force_login(make_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_middleware_counts_requests_by_url_name(self):
+        with override_settings(METRICS_ENABLED=True):
+            self.client.get(reverse('about_us'))
+        text = metrics.render()
+        self.assertIn('car_stor_http_requests_total{method="GET",status="200",view="about_us"} 1', text)
+        self.assertIn('car_stor_http_request_duration_seconds_count{view="about_us"} 1', text)
@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.pagecache import _CSRF_PLACEHOLDER
+
+from .utils import ViewTestCase, make_car, make_user
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=300)
+class AnonymousPageCacheTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.car = make_car(make_user('seller'), title='Toyota Camry')
+
+    def get(self, path=None, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path or reverse('car_inventory'), **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_second_request_is_served_from_the_cache(self):
+        first, first_queries = self.get()
+        second, second_queries = self.get()
+        self.assertGreater(first_queries, 0)
+        self.assertEqual(second_queries, 0)
+        self.assertContains(second, 'Toyota Camry')
+
+    def test_writes_retire_the_page(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.car.title = 'Honda Civic'
+            self.car.save()
+        response, queries = self.get()
+        self.assertGreater(queries, 0)
+        self.assertContains(response, 'Honda Civic')
+
+    def test_query_string_is_part_of_the_key(self):
+        self.get()
+        _, queries = self.get(reverse('car_inventory') + '?status=new')
+        self.assertGreater(queries, 0)
+
+    def test_logged_in_users_are_not_cached(self):
+        self.client.force_login(make_user())
+        self.get()
+        _, queries = self.get()
+        self.assertGreater(queries, 0)
+
+    def test_pending_messages_bypass_the_cache(self):
+        self.get(reverse('index'))
+        # The newsletter view adds a message and redirects to the index
+        self.client.post(reverse('newsletter'))
+        _, queries = self.get(reverse('index'))
+        self.assertGreater(queries, 0)
+
+    def test_each_visitor_gets_their_own_csrf_token(self):
+        self.get()
+        response, _ = self.get()
+        self.assertNotIn(_CSRF_PLACEHOLDER, response.content)
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_disabled_with_a_zero_timeout(self):
+        self.get()
+        _, queries = self.get()
+        self.assertGreater(queries, 0)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from car_stor.models import Car
+from car_stor.pagination import DEFAULT_ORDERING, decode_cursor, encode_cursor, keyset_paginate, seek_after
+
+from .utils import make_car, make_user
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = make_user('seller')
+        now = timezone.now()
+        for i in range(7):
+            make_car(seller, title=f'Car {i}')
+        # Pairs of cars share created_at, so pages must break ties on id
+        for car in Car.objects.all():
+            Car.objects.filter(pk=car.pk).update(created_at=now - timedelta(minutes=car.pk // 2))
+        cls.expected = list(Car.objects.order_by(*DEFAULT_ORDERING).values_list('pk', flat=True))
+
+    def paginate(self, **params):
+        return keyset_paginate(RequestFactory().get('/', params), Car.objects.all(), page_size=3)
+
+    def test_cursor_round_trip(self):
+        created = timezone.now()
+        values = decode_cursor(encode_cursor([created, 42]), 2)
+        self.assertEqual(values, [created.isoformat(), 42])
+
+    def test_walks_every_row_once_forwards_and_backwards(self):
+        seen, page = [], self.paginate()
+        while True:
+            seen.extend(car.pk for car in page)
+            if not page.has_next:
+                break
+            page = self.paginate(after=page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+        back = []
+        while page.has_previous:
+            page = self.paginate(before=page.previous_cursor)
+            back[:0] = [car.pk for car in page]
+        self.assertEqual(back, self.expected[:len(back)])
+        self.assertEqual(len(back), 6)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        page = self.paginate(after='not-a-cursor')
+        self.assertEqual([car.pk for car in page], self.expected[:3])
+        self.assertFalse(page.has_previous)
+
+    def test_seek_starts_an_index_range_at_the_cursor(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite syntax')
+        car = Car.objects.order_by(*DEFAULT_ORDERING)[2]
+        queryset = Car.objects.order_by(*DEFAULT_ORDERING).filter(
+            seek_after(DEFAULT_ORDERING, [car.created_at, car.pk])
+        )[:3]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        # One index range in key order: no scan, no OR of ranges, no sort
+        self.assertTrue(plan.startswith('SEARCH car_stor_car USING INDEX car_created_idx'), plan)
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,41 @@
+import os
+import re
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .utils import ViewTestCase, make_car, make_user
+
+SERVER_TIMING = re.compile(r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", template;dur=[\d.]+$')
+
+
+class ProfilingMiddlewareTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        make_car(make_user('seller'))
+
+    def test_server_timing_header(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0.0, PROFILING_DIR=self.profile_dir):
+            response = self.client.get(reverse('car_inventory'))
+        match = SERVER_TIMING.match(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match.group(1)), 0)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_sampled_requests_write_a_profile(self):
+        with override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse('car_inventory'))
+        [name] = os.listdir(self.profile_dir)
+        self.assertIn('car_inventory', name)
+        with open(os.path.join(self.profile_dir, name)) as handle:
+            report = handle.read()
+        self.assertTrue(report.startswith('GET /inventory/'))
+        self.assertIn('cumulative', report)
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('car_inventory'))
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,138 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from car_stor.models import (
+    BlogPost, CarInquiry, CarOrder, CarReview, Cart, CartItem, Notification, Order, OrderItem, Wishlist,
+)
+from car_stor.querycount import QueryBudgetExceeded, QueryRecorder
+
+from .utils import ViewTestCase, make_accessory, make_car, make_category, make_user
+
+# More rows than a catalog page, so that a query per row cannot stay under budget
+ROWS = 30
+
+
+class QueryBudgetTests(ViewTestCase):
+    """
+    The hot views, as a logged-in user with a cart, wishlist, orders and
+    notifications, against their budgets in car_stor/query_budgets.py.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(email='buyer@example.com')
+        cls.staff = make_user('staff', is_staff=True, is_superuser=True)
+        sellers = [make_user(f'seller{i}') for i in range(3)]
+        cls.sedan = make_category('Sedan')
+        cls.parts = make_category('Parts')
+
+        cls.cars = [
+            make_car(sellers[i % 3], cls.sedan, model_year=2015 + i % 8, status=('Used', 'New')[i % 2])
+            for i in range(ROWS)
+        ]
+        cls.accessories = [
+            make_accessory(sellers[i % 3], cls.parts, title=f'Part {i}', price=Decimal('10.00') + i)
+            for i in range(ROWS)
+        ]
+        # The buyer also sells, so the dashboard has both sides to show
+        cls.cars.append(make_car(cls.user, cls.sedan))
+        cls.accessories.append(make_accessory(cls.user, cls.parts, title='Own part'))
+        for i in range(3):
+            BlogPost.objects.create(title=f'Post {i}', image='blog/b1.jpg', content='Text', author=cls.staff,
+                                    image_status=BlogPost.READY)
+
+        car = cls.cars[0]
+        for user in sellers:
+            CarReview.objects.create(car=car, user=user, rating=4, comment='Good')
+            CarInquiry.objects.create(car=cls.cars[-1], user=user, name=user.username, email='s@example.com',
+                                      message='Still for sale?')
+        shipping = {'full_name': 'Buyer', 'email': 'buyer@example.com', 'phone': '555', 'address': '1 Main St',
+                    'city': 'Town'}
+        for seller_car in cls.cars[:5]:
+            CarOrder.objects.create(user=cls.user, car=seller_car, total_price=seller_car.price, **shipping)
+        cls.order = Order.objects.create(user=cls.user, total_price=Decimal('100.00'), **shipping)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=cls.order, accessory=accessory, quantity=1, price=accessory.price)
+            for accessory in cls.accessories[:5]
+        ])
+        buyer_order = Order.objects.create(user=sellers[0], total_price=Decimal('5.00'), **shipping)
+        OrderItem.objects.create(order=buyer_order, accessory=cls.accessories[-1], quantity=1, price=Decimal('5.00'))
+
+        wishlist = Wishlist.for_user(cls.user)
+        wishlist.cars.add(*cls.cars[:10])
+        wishlist.accessories.add(*cls.accessories[:10])
+        Notification.objects.bulk_create([
+            Notification(user=cls.user, message=f'Notification {i}', is_read=i % 2 == 0) for i in range(ROWS)
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, accessory=a, quantity=2) for a in self.accessories[:10]])
+        Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+
+    def assertWithinBudget(self, method, name, args=(), data=None, status=200):
+        with self.subTest(view=name):
+            response = getattr(self.client, method)(reverse(name, args=args), data)
+            self.assertEqual(response.status_code, status)
+
+    def test_catalog(self):
+        car, accessory = self.cars[0], self.accessories[0]
+        self.assertWithinBudget('get', 'index')
+        self.assertWithinBudget('get', 'search', data={'q': 'toyota'})
+        self.assertWithinBudget('get', 'search', data={'status': 'used', 'category': self.sedan.pk})
+        self.assertWithinBudget('get', 'car_inventory')
+        self.assertWithinBudget('get', 'car_inventory', data={'model_year': 2016})
+        self.assertWithinBudget('get', 'car_inventory_category', args=[self.sedan.pk])
+        self.assertWithinBudget('get', 'car_detail', args=[car.pk])
+        self.assertWithinBudget('get', 'list')
+        self.assertWithinBudget('get', 'grid')
+        self.assertWithinBudget('get', 'grid_category', args=[self.parts.pk])
+        self.assertWithinBudget('get', 'list1')
+        self.assertWithinBudget('get', 'list1_category', args=[self.parts.pk])
+        self.assertWithinBudget('get', 'accessory_detail', args=[accessory.pk])
+        self.assertWithinBudget('get', 'blog')
+        self.assertWithinBudget('get', 'blog_detail', args=[BlogPost.objects.first().pk])
+
+    def test_later_pages(self):
+        response = self.client.get(reverse('car_inventory'))
+        self.assertWithinBudget('get', 'car_inventory', data={'after': response.context['page'].next_cursor})
+
+    def test_cart_and_checkout(self):
+        self.assertWithinBudget('get', 'shopping_cart')
+        self.assertWithinBudget('get', 'add_to_cart', args=[self.accessories[20].pk], status=302)
+        self.assertWithinBudget('get', 'add_to_cart', args=[self.accessories[0].pk], data={'qty': 2}, status=302)
+        item = CartItem.objects.filter(cart__user=self.user).first()
+        self.assertWithinBudget('get', 'remove_from_cart', args=[item.pk], status=302)
+        self.assertWithinBudget('get', 'wishlist')
+        self.assertWithinBudget('get', 'wishlist_add_all_to_cart', status=302)
+        self.assertWithinBudget('get', 'checkout')
+        self.assertWithinBudget('post', 'process_checkout', data={'idempotency_key': 'a' * 32}, status=302)
+        self.assertWithinBudget('get', 'order_success', data={'order_id': Order.objects.latest('pk').pk})
+        self.assertWithinBudget('get', 'car_checkout', args=[self.cars[1].pk])
+
+    def test_accounts(self):
+        self.assertWithinBudget('get', 'dashboard')
+        self.assertWithinBudget('get', 'notifications')
+        self.client.force_login(self.staff)
+        self.assertWithinBudget('get', 'admin_dashboard')
+
+    def test_a_view_over_budget_raises(self):
+        with mock.patch.dict('car_stor.query_budgets.QUERY_BUDGETS', {'index': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('index'))
+
+
+class QueryRecorderTests(TestCase):
+    def test_transaction_control_is_not_counted(self):
+        with QueryRecorder() as recorder:
+            with transaction.atomic():
+                User.objects.count()
+        self.assertEqual(recorder.query_count, 1)
+        self.assertGreater(len(recorder), 1)
@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.models import Car
+from car_stor.search import SEARCH_ORDERING, search_cars
+
+from .utils import ViewTestCase, make_car, make_category, make_user
+
+
+def search(query):
+    return list(search_cars(Car.objects.all(), query).order_by(*SEARCH_ORDERING))
+
+
+class SearchCarsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seller = make_user('seller')
+        cls.suv = make_category('SUV')
+        cls.camry = make_car(seller, title='Toyota Camry', description='Family sedan.')
+        cls.rav4 = make_car(seller, cls.suv, title='Toyota RAV4', description='Compact crossover.')
+        cls.mention = make_car(seller, title='Honda Accord', description='Cheaper than a Toyota.')
+
+    def test_matches_word_prefixes(self):
+        self.assertCountEqual(search('toyo'), [self.camry, self.rav4, self.mention])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(search('toyota cam'), [self.camry])
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(search('toyota')[-1], self.mention)
+
+    def test_category_names_are_searchable_and_follow_renames(self):
+        self.assertEqual(search('suv'), [self.rav4])
+        self.suv.name = 'Crossover SUV'
+        self.suv.save()
+        self.assertEqual(search('crossover'), [self.rav4])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search('"toyota OR honda'), [])
+        self.assertEqual(search('camry)*^:'), [self.camry])
+        self.assertEqual(search('  '), [])
+
+    def test_deleted_cars_leave_the_index(self):
+        self.camry.delete()
+        self.assertEqual(search('camry'), [])
+
+    def test_match_runs_once_per_query(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 MATCH is SQLite syntax')
+        with CaptureQueriesContext(connection) as queries:
+            search('toyota')
+        self.assertEqual([query['sql'].count('MATCH') for query in queries], [1])
+
+
+class SearchViewTests(ViewTestCase):
+    def test_ranked_results_page_without_repeats(self):
+        seller = make_user('seller')
+        for i in range(5):
+            make_car(seller, title=f'Toyota Corolla {i}')
+        seen, params = [], {'q': 'corolla', 'page_size': 2}
+        while True:
+            response = self.client.get(reverse('search'), params)
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page']
+            seen.extend(car.pk for car in page)
+            if not page.has_next:
+                break
+            params['after'] = page.next_cursor
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+        self.assertEqual(response.context['results_count'], 5)
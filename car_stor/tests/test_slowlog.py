@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.models import Car
+from car_stor.slowlog import SlowQueryLogger, _explain, install
+
+from .utils import ViewTestCase, make_car, make_user
+
+
+class SlowQueryLogTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.log = os.path.join(directory, 'logs', 'slow.jsonl')
+        # Every statement counts as slow
+        settings = override_settings(SLOW_QUERY_THRESHOLD_MS=1e-9, SLOW_QUERY_LOG=self.log)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        make_car(make_user('seller'))
+
+    def records(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_logs_sql_params_and_call_site(self):
+        with connection.execute_wrapper(SlowQueryLogger(connection)):
+            Car.objects.filter(model_year=2020).count()
+        [record] = self.records()
+        self.assertIn('COUNT(*)', record['sql'])
+        self.assertEqual(record['params'], [2020])
+        self.assertIsNone(record['view'])
+        self.assertTrue(record['call_site'].startswith('car_stor/tests/test_slowlog.py:'))
+        self.assertNotIn('plan', record)
+
+    def test_explains_selects_without_logging_the_explain(self):
+        with override_settings(SLOW_QUERY_EXPLAIN=True):
+            with connection.execute_wrapper(SlowQueryLogger(connection)):
+                list(Car.objects.filter(model_year=2020))
+        [record] = self.records()
+        self.assertTrue(any('car_stor_car' in line for line in record['plan']))
+
+    def test_locking_reads_are_not_explained(self):
+        for sql in ('SELECT 1 FROM car_stor_car FOR UPDATE', 'SELECT 1 FROM car_stor_car for no key update',
+                    'SELECT 1 FROM car_stor_car FOR SHARE SKIP LOCKED'):
+            with self.subTest(sql=sql):
+                self.assertIsNone(_explain(connection, sql, ()))
+
+    def test_failed_explain_rolls_back_only_a_savepoint(self):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                plan = _explain(connection, 'SELECT missing FROM car_stor_car', ())
+            self.assertTrue(plan[0].startswith('EXPLAIN failed: '))
+            self.assertTrue(any(q['sql'].startswith('ROLLBACK TO SAVEPOINT') for q in queries.captured_queries))
+            self.assertFalse(connection.needs_rollback)
+            self.assertEqual(Car.objects.count(), 1)
+
+    def test_attributes_queries_to_the_view(self):
+        with connection.execute_wrapper(SlowQueryLogger(connection)):
+            self.client.get(reverse('car_inventory'))
+        views = {record['view'] for record in self.records()}
+        self.assertEqual(views, {'car_inventory'})
+        self.assertEqual({record['path'] for record in self.records()}, {'/inventory/'})
+
+    def test_install_is_idempotent(self):
+        wrappers = list(connection.execute_wrappers)
+        self.addCleanup(setattr, connection, 'execute_wrappers', wrappers)
+        install(None, connection)
+        install(None, connection)
+        self.assertEqual(sum(isinstance(w, SlowQueryLogger) for w in connection.execute_wrappers), 1)
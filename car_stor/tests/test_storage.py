@@ -0,0 +1,106 @@
+import hashlib
+import io
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from car_stor import images
+from car_stor.models import Car
+from car_stor.storage import ContentAddressedStorage, is_addressed
+
+from .test_images import FieldFile, image_bytes
+from .utils import make_car, make_user
+
+
+def addressed(content, extension):
+    digest = hashlib.sha256(content).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = ContentAddressedStorage(location=location, base_url='/media/')
+
+    def test_named_after_the_content_with_a_lowercased_extension(self):
+        name = self.storage.save('cars/IMG_1234.JPG', ContentFile(b'photo'))
+        self.assertEqual(name, addressed(b'photo', '.jpg'))
+        self.assertTrue(is_addressed(name))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.storage.save('cars/a.jpg', ContentFile(b'photo'))
+        second = self.storage.save('accessories/b.jpg', ContentFile(b'photo'))
+        self.assertEqual(first, second)
+        self.assertEqual(self.storage.listdir(first.rsplit('/', 1)[0])[1], [first.rsplit('/', 1)[1]])
+        self.assertNotEqual(self.storage.save('cars/a.jpg', ContentFile(b'other')), first)
+
+    def test_is_addressed(self):
+        name = addressed(b'photo', '.jpg')
+        self.assertTrue(is_addressed(name))
+        self.assertTrue(is_addressed(name.replace('.jpg', '.card.webp')))
+        self.assertTrue(is_addressed(name[:-len('.jpg')]))
+        self.assertFalse(is_addressed('cars/photo.jpg'))
+        self.assertFalse(is_addressed('ff/ff/' + name.rsplit('/', 1)[1]))
+        self.assertFalse(is_addressed(name.replace('.jpg', 'a.jpg')))
+
+    def test_save_derived_keeps_the_name(self):
+        name = addressed(b'photo', '.card.jpg')
+        self.assertEqual(self.storage.save_derived(name, ContentFile(b'old')), name)
+        self.assertEqual(self.storage.save_derived(name, ContentFile(b'new')), name)
+        with self.storage.open(name) as handle:
+            self.assertEqual(handle.read(), b'new')
+
+    def test_variants_are_named_after_the_original(self):
+        name = self.storage.save('cars/photo.jpg', ContentFile(image_bytes((800, 400))))
+        field_file = FieldFile(self.storage, name)
+        self.assertEqual(images.generate_variants(field_file), images.variant_names(name))
+        self.assertTrue(images.has_variants(field_file))
+
+
+class AddressMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = FileSystemStorage(location=media_root)
+        self.content = image_bytes((800, 400))
+        self.storage.save('cars/legacy.jpg', ContentFile(self.content))
+        seller = make_user('seller')
+        self.cars = [make_car(seller, image='cars/legacy.jpg'), make_car(seller, image='cars/legacy.jpg')]
+
+    def address_media(self, **options):
+        out = io.StringIO()
+        call_command('address_media', stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_legacy_names_with_their_variants(self):
+        output = self.address_media()
+        self.assertIn('[SUCCESS] Moved 1 file(s) (2 row(s) updated); 0 missing.', output)
+        name = addressed(self.content, '.jpg')
+        for car in self.cars:
+            car.refresh_from_db()
+            self.assertEqual(car.image.name, name)
+            self.assertEqual(car.image_status, Car.READY)
+        self.assertTrue(images.has_variants(self.cars[0].image))
+        # The old file stays until collect_orphaned_media removes it
+        self.assertTrue(self.storage.exists('cars/legacy.jpg'))
+        self.assertIn('Moved 0 file(s)', self.address_media())
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('Would move 1 file(s)', self.address_media(dry_run=True))
+        self.cars[0].refresh_from_db()
+        self.assertEqual(self.cars[0].image.name, 'cars/legacy.jpg')
+
+    def test_missing_files_are_reported(self):
+        self.storage.delete('cars/legacy.jpg')
+        output = self.address_media()
+        self.assertIn('[!] cars/legacy.jpg: file not found', output)
+        self.assertIn('1 missing', output)
+
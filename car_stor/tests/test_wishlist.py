@@ -0,0 +1,76 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from car_stor.models import Cart, CartItem, Wishlist
+
+from .utils import ViewTestCase, make_accessory, make_car, make_user
+
+
+class ToggleWishlistTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.car = make_car(make_user('seller'))
+        self.accessory = make_accessory()
+
+    def test_toggling_a_car_adds_then_removes_it(self):
+        self.client.get(reverse('toggle_wishlist', args=[self.car.pk]))
+        self.assertEqual(Wishlist.car_ids_for(self.user), {self.car.pk})
+        self.client.get(reverse('toggle_wishlist', args=[self.car.pk]))
+        self.assertEqual(Wishlist.car_ids_for(self.user), set())
+
+    def test_toggling_an_accessory_adds_then_removes_it(self):
+        self.client.get(reverse('toggle_wishlist_accessory', args=[self.accessory.pk]))
+        self.assertEqual(Wishlist.accessory_ids_for(self.user), {self.accessory.pk})
+        self.client.get(reverse('toggle_wishlist_accessory', args=[self.accessory.pk]))
+        self.assertEqual(Wishlist.accessory_ids_for(self.user), set())
+
+    def test_uses_a_single_wishlist(self):
+        self.client.get(reverse('toggle_wishlist', args=[self.car.pk]))
+        self.client.get(reverse('toggle_wishlist_accessory', args=[self.accessory.pk]))
+        self.assertEqual(Wishlist.objects.filter(user=self.user).count(), 1)
+
+    def test_unknown_car_is_404(self):
+        response = self.client.get(reverse('toggle_wishlist', args=[self.car.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class WishlistAddAllToCartTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.client.force_login(self.user)
+
+    def wishlist(self, count):
+        accessories = [make_accessory(title=f'Part {i}', price=Decimal('1.10') + i) for i in range(count)]
+        Wishlist.for_user(self.user).accessories.add(*accessories)
+        return accessories
+
+    def add_all(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('wishlist_add_all_to_cart'))
+        return len(queries)
+
+    def test_adds_one_of_each_and_bumps_existing_lines(self):
+        first, second = self.wishlist(2)
+        self.client.get(reverse('add_to_cart', args=[first.pk]), {'qty': 3})
+        self.add_all()
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual(dict(cart.items.values_list('accessory_id', 'quantity')), {first.pk: 4, second.pk: 1})
+        self.assertEqual((cart.item_count, cart.subtotal), (5, Decimal('6.50')))
+
+    def test_empty_wishlist_changes_nothing(self):
+        self.add_all()
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_wishlist(self):
+        Cart.objects.create(user=self.user)
+        self.wishlist(1)
+        small = self.add_all()
+        CartItem.objects.all().delete()
+        self.wishlist(10)
+        self.assertEqual(self.add_all(), small)
@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from car_stor.models import Accessory, Car, Category
+
+
+def make_user(username='buyer', **kwargs):
+    return User.objects.create_user(username, password='pw', **kwargs)
+
+
+def make_car(seller, category=None, **kwargs):
+    fields = {
+        'title': 'Toyota Camry',
+        'price': Decimal('15000.00'),
+        'description': 'Well maintained with full service history.',
+        'model_year': 2020,
+        'mileage': 30000,
+        'fuel_type': 'Petrol',
+        'transmission': 'Automatic',
+        'engine': '2.5L 4-Cylinder',
+        'status': 'Used',
+        'image': 'cars/p1.jpg',
+        'image_status': Car.READY,
+    }
+    fields.update(kwargs)
+    return Car.objects.create(seller=seller, category=category, **fields)
+
+
+def make_accessory(seller=None, category=None, **kwargs):
+    fields = {
+        'title': 'Floor Mats',
+        'price': Decimal('25.00'),
+        'description': 'Genuine part with a one-year warranty.',
+        'image': 'accessories/p31.jpg',
+        'image_status': Accessory.READY,
+    }
+    fields.update(kwargs)
+    return Accessory.objects.create(seller=seller, category=category, **fields)
+
+
+def make_category(name='Sedan'):
+    return Category.objects.create(name=name)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, QUERY_BUDGET_MODE='raise')
+class ViewTestCase(TestCase):
+    """
+    Requests go over plain HTTP, pages are never served from an earlier test's
+    cache and a view over its query budget raises QueryBudgetExceeded.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
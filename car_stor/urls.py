@@ -40,6 +40,7 @@ urlpatterns = [
     path('wishlist/add_all/', views.wishlist_add_all_to_cart, name='wishlist_add_all_to_cart'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('admin/', views.admin_dashboard, name='admin_dashboard'),
+    path('metrics/', views.metrics_endpoint, name='metrics'),
     path('profile/edit/', views.edit_profile, name='edit_profile'),
     path('multiple_addresses/', views.multiple_addresses, name='multiple_addresses'),
     path('contact-us/', views.contact_us, name='contact_us'),
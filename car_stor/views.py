@@ -1,5 +1,8 @@
+import re
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.decorators import login_required
@@ -8,7 +11,15 @@ from django.contrib.auth.models import User
 from .models import Car, Category, BlogPost, Accessory, ContactMessage, CarOrder, Order, CarInquiry, Notification, Wishlist, Profile
 from django.contrib import messages
 from .forms import CarForm, AccessoryForm, CarInquiryForm, CarReviewForm, UserUpdateForm, AdminUserUpdateForm, AdminUserCreationForm
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.crypto import constant_time_compare
+from . import metrics
+from .pagecache import cache_anonymous_page
+from .pagination import DEFAULT_ORDERING, keyset_paginate
+from .search import SEARCH_ORDERING, search_cars
+from .facets import FACETS, facet_counts, facet_rows, filter_cars
+from .checkout import EmptyCartError, clean_idempotency_key, new_idempotency_key, place_order
 
 from django.shortcuts import render
 from django.middleware.csrf import get_token
@@ -26,22 +37,24 @@ def myview(request):
     from django.http import HttpResponse
     return HttpResponse("CSRF Exempt View for Testing")
 
+@cache_anonymous_page(Car, Category)
 def index(request):
     # Retrieve and print the CSRF token for debugging/security monitoring
     token = get_token(request)
     print(f"CSRF Token: {token}")
     
-    cars = Car.objects.all().order_by('-created_at')
+    page = keyset_paginate(request, Car.objects.all())
     
     # Get all categories for filter
     categories = Category.objects.all()
     
-    # Get model years for filter (distinct)
-    model_years = Car.objects.order_by('-model_year').values_list('model_year', flat=True).distinct()
+    # Model years for the search form, with their counts
+    model_years = facet_counts(facet_rows(names=('model_year',)), request.GET, names=('model_year',))[0]['options']
 
     context = {
-        'cars': cars,
-        'deals': cars.filter(status='Used')[:5],
+        'cars': page,
+        'page': page,
+        'deals': Car.objects.filter(status='Used').order_by('-created_at')[:5],
         'categories': categories,
         'model_years': model_years,
         'STATUS_CHOICES': Car.STATUS_CHOICES,
@@ -50,41 +63,33 @@ def index(request):
 
 def search(request):
     query = request.GET.get('q')
-    category_id = request.GET.get('category')
-    status = request.GET.get('status')
-    model_year = request.GET.get('model_year')
     
-    cars = Car.objects.all().order_by('-created_at')
+    cars = Car.objects.all()
     categories = Category.objects.all()
-    selected_category = None
+    ordering = DEFAULT_ORDERING
 
     if query:
-        cars = cars.filter(Q(title__icontains=query) | Q(description__icontains=query))
-    
-    if category_id and category_id.strip():
-        try:
-            selected_category = Category.objects.get(id=category_id)
-            cars = cars.filter(category=selected_category)
-        except (Category.DoesNotExist, ValueError):
-            pass
-        
-    if status and status.strip():
-        # status should match STATUS_CHOICES exactly ('New' or 'Used')
-        cars = cars.filter(status__iexact=status.strip())
-        
-    if model_year and model_year.strip():
-        try:
-            cars = cars.filter(model_year=int(model_year.strip()))
-        except ValueError:
-            pass
+        cars = search_cars(cars, query)
+        ordering = SEARCH_ORDERING
+    # Facets count the text matches, or without a query every car, before the filters
+    rows = facet_rows(cars if query else None)
+
+    # category, status, model_year, fuel_type, transmission, price and mileage
+    cars, selected = filter_cars(cars, request.GET)
+    selected_category = None
+    if 'category' in selected:
+        selected_category = Category.objects.filter(id=selected['category']).first()
 
+    page = keyset_paginate(request, cars, ordering=ordering)
     context = {
-        'cars': cars,
+        'cars': page,
+        'page': page,
         'categories': categories,
         'selected_category': selected_category,
         'query': query,
-        'selected_status': status,
-        'selected_year': model_year,
+        'selected_status': selected.get('status'),
+        'selected_year': selected.get('model_year'),
+        'facets': facet_counts(rows, request.GET, selected),
         'active_page': 'all_cars',
         'is_search': True,
         'results_count': cars.count()
@@ -94,7 +99,7 @@ def search(request):
 
 def car_detail(request, car_id):
     car = get_object_or_404(Car, pk=car_id)
-    reviews = car.reviews.all().order_by('-created_at')
+    reviews = car.reviews.select_related('user').order_by('-created_at')
     
     inquiry_form = CarInquiryForm()
     review_form = CarReviewForm()
@@ -241,8 +246,8 @@ def admin_dashboard(request):
     total_orders = Order.objects.count() + CarOrder.objects.count()
     
     # Recent items
-    recent_cars = Car.objects.all().order_by('-created_at')[:10]
-    recent_accessories = Accessory.objects.all().order_by('-created_at')[:10]
+    recent_cars = Car.objects.select_related('seller').order_by('-created_at')[:10]
+    recent_accessories = Accessory.objects.select_related('seller').order_by('-created_at')[:10]
     recent_users = User.objects.all().order_by('-date_joined')[:10]
     
     # Full lists for management
@@ -250,10 +255,10 @@ def admin_dashboard(request):
     all_posts = BlogPost.objects.all().order_by('-created_at')
     
     # Extra admin lists
-    all_car_orders = CarOrder.objects.all().order_by('-created_at')
-    all_accessory_orders = Order.objects.all().order_by('-created_at')
-    all_inquiries = CarInquiry.objects.all().order_by('-created_at')
-    all_reviews = CarReview.objects.all().order_by('-created_at')
+    all_car_orders = CarOrder.objects.select_related('user', 'car').order_by('-created_at')
+    all_accessory_orders = Order.objects.select_related('user').order_by('-created_at')
+    all_inquiries = CarInquiry.objects.select_related('car').order_by('-created_at')
+    all_reviews = CarReview.objects.select_related('car', 'user').order_by('-created_at')
     all_messages = ContactMessage.objects.all().order_by('-created_at')
     
     context = {
@@ -274,6 +279,17 @@ def admin_dashboard(request):
     }
     return render(request, 'admin_dashboard.html', context)
 
+def metrics_endpoint(request):
+    """Prometheus scrape endpoint, for staff users or a bearer METRICS_TOKEN"""
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if not authorized and settings.METRICS_TOKEN:
+        authorized = constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'
+        )
+    if not authorized:
+        raise Http404("Page not found")
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def register(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
@@ -303,13 +319,13 @@ def dashboard(request):
     accessories = Accessory.objects.filter(seller=request.user).order_by('-created_at')
     
     # Orders RECEIVED for the user's cars
-    received_car_orders = CarOrder.objects.filter(car__seller=request.user).order_by('-created_at')
+    received_car_orders = CarOrder.objects.filter(car__seller=request.user).select_related('car').order_by('-created_at')
     
     # Orders RECEIVED for the user's accessories
     received_accessory_orders = Order.objects.filter(items__accessory__seller=request.user).distinct().order_by('-created_at')
     
     # Inquiries RECEIVED for the user's cars
-    received_inquiries = CarInquiry.objects.filter(car__seller=request.user).order_by('-created_at')
+    received_inquiries = CarInquiry.objects.filter(car__seller=request.user).select_related('car').order_by('-created_at')
     
     # Orders PLACED by the user (as a customer)
     my_orders = Order.objects.filter(user=request.user).order_by('-created_at')
@@ -488,6 +504,7 @@ def approve_car_order(request, order_id):
         user=order.user,
         message=f"Your order for '{order.car.title}' has been approved! Please contact the seller to proceed."
     )
+    metrics.inc('car_stor_order_decisions_total', kind='car', decision='approved')
     return redirect('dashboard')
 
 @login_required
@@ -499,6 +516,7 @@ def decline_car_order(request, order_id):
         user=order.user,
         message=f"We're sorry, your order for '{order.car.title}' has been declined."
     )
+    metrics.inc('car_stor_order_decisions_total', kind='car', decision='declined')
     return redirect('dashboard')
 
 @login_required
@@ -517,6 +535,7 @@ def approve_accessory_order(request, order_id):
         user=order.user,
         message=f"Your accessory order #{order.id} has been approved by the seller!"
     )
+    metrics.inc('car_stor_order_decisions_total', kind='accessory', decision='approved')
     return redirect('dashboard')
 
 @login_required
@@ -532,6 +551,7 @@ def decline_accessory_order(request, order_id):
         user=order.user,
         message=f"Your accessory order #{order.id} has been declined."
     )
+    metrics.inc('car_stor_order_decisions_total', kind='accessory', decision='declined')
     return redirect('dashboard')
 
 @login_required
@@ -561,6 +581,7 @@ def edit_profile(request):
     
     return render(request, 'edit_profile.html', {'form': user_form})
 
+@cache_anonymous_page()
 def about_us(request):
     return render(request, 'about-us.html')
 
@@ -581,14 +602,17 @@ def contact_us(request):
         return redirect('contact_us')
     return render(request, 'contact-us.html')
 
+@cache_anonymous_page(BlogPost)
 def blog(request):
-    posts = BlogPost.objects.all().order_by('-created_at')
+    posts = BlogPost.objects.select_related('author').order_by('-created_at')
     return render(request, 'blog.html', {'posts': posts})
 
+@cache_anonymous_page(BlogPost)
 def blog_detail(request, post_id):
-    post = get_object_or_404(BlogPost, id=post_id)
+    post = get_object_or_404(BlogPost.objects.select_related('author'), id=post_id)
     return render(request, 'blog_detail.html', {'post': post})
 
+@cache_anonymous_page(Accessory, Category)
 def grid(request, category_id=None):
     accessories = Accessory.objects.all().order_by('-created_at')
     # Exclude Cars category from accessories sidebar
@@ -599,8 +623,10 @@ def grid(request, category_id=None):
         selected_category = get_object_or_404(Category, id=category_id)
         accessories = accessories.filter(category=selected_category)
         
+    page = keyset_paginate(request, accessories)
     return render(request, 'grid.html', {
-        'accessories': accessories,
+        'accessories': page,
+        'page': page,
         'categories': categories,
         'selected_category': selected_category,
         'active_page': 'accessories'
@@ -621,6 +647,7 @@ def accessory_detail(request, accessory_id):
         'related_accessories': related_accessories
     })
 
+@cache_anonymous_page(Car, Category)
 def car_inventory(request, category_id=None):
     cars = Car.objects.all().order_by('-created_at')
     # Only show Cars category (or empty since cars have single category)
@@ -630,11 +657,22 @@ def car_inventory(request, category_id=None):
     if category_id:
         selected_category = get_object_or_404(Category, id=category_id)
         cars = cars.filter(category=selected_category)
+
+    cars, selected = filter_cars(cars, request.GET)
+    if selected_category:
+        selected['category'] = selected_category.id
+    # The category comes from the URL path here, so it is not offered as a facet
+    facets = facet_counts(
+        facet_rows(), request.GET, selected, names=[name for name in FACETS if name != 'category'],
+    )
     
+    page = keyset_paginate(request, cars)
     return render(request, 'car-inventory.html', {
-        'cars': cars,
+        'cars': page,
+        'page': page,
         'categories': categories,
         'selected_category': selected_category,
+        'facets': facets,
         'active_page': 'all_cars'
     })
 
@@ -646,11 +684,13 @@ def user_logout(request):
 def error_404(request, exception=None):
     return render(request, '404error.html', status=404)
 
+@cache_anonymous_page(Car, Category)
 def list_cars(request):
-    cars = Car.objects.all().order_by('-created_at')
+    page = keyset_paginate(request, Car.objects.all())
     categories = Category.objects.all()
     return render(request, 'list.html', {
-        'cars': cars,
+        'cars': page,
+        'page': page,
         'categories': categories,
         'active_page': 'list_cars'
     })
@@ -665,13 +705,61 @@ def list_accessories(request, category_id=None):
         selected_category = get_object_or_404(Category, id=category_id)
         accessories = accessories.filter(category=selected_category)
         
+    page = keyset_paginate(request, accessories)
     return render(request, 'list1.html', {
-        'accessories': accessories,
+        'accessories': page,
+        'page': page,
         'categories': categories,
         'selected_category': selected_category,
         'active_page': 'list_accessories'
     })
 
+# Quantity inputs of the cart form are named like "cart[123][qty]"
+CART_QTY_KEY = re.compile(r'^cart\[(\d+)\]\[qty\]$')
+
+def parse_cart_quantities(post):
+    """Map cart item id -> requested quantity for every well-formed quantity input"""
+    quantities = {}
+    for key, value in post.items():
+        match = CART_QTY_KEY.match(key)
+        if match:
+            try:
+                quantities[int(match.group(1))] = int(value)
+            except ValueError:
+                continue
+    return quantities
+
+def update_cart_quantities(cart, quantities):
+    """
+    Apply the quantity form to a cart in one transaction: one SELECT for the
+    affected lines, one bulk UPDATE, one DELETE for zeroed lines and one update
+    of the cart totals. Returns the (updated, removed) cart items.
+    """
+    with transaction.atomic():
+        items = list(
+            CartItem.objects.select_for_update()
+            .select_related('accessory')
+            .filter(cart=cart, pk__in=quantities)
+        )
+        updated, removed = [], []
+        qty_delta, amount_delta = 0, 0
+        for item in items:
+            new_qty = max(quantities[item.pk], 0)
+            if new_qty == item.quantity:
+                continue
+            qty_delta += new_qty - item.quantity
+            amount_delta += (new_qty - item.quantity) * item.accessory.price
+            item.quantity = new_qty
+            (updated if new_qty else removed).append(item)
+
+        if updated:
+            CartItem.objects.bulk_update(updated, ['quantity'])
+        if removed:
+            CartItem.objects.filter(pk__in=[item.pk for item in removed]).delete()
+        if updated or removed:
+            cart.adjust_totals(qty_delta, amount_delta)
+    return updated, removed
+
 def shopping_cart(request):
     if not request.user.is_authenticated:
         return render(request, 'shopping-cart.html', {'active_page': 'cart'})
@@ -682,32 +770,27 @@ def shopping_cart(request):
         action = request.POST.get('update_cart_action')
         
         if action == 'empty_cart':
-            cart.items.all().delete()
+            with transaction.atomic():
+                cart.items.all().delete()
+                cart.reset_totals()
             messages.success(request, "Shopping cart emptied.")
             
         elif action == 'update_qty':
-            for key, value in request.POST.items():
-                if key.startswith('cart['):
-                    # Extract item ID from key like "cart[123][qty]"
-                    try:
-                        import re
-                        match = re.search(r'cart\[(\d+)\]\[qty\]', key)
-                        if match:
-                            item_id = match.group(1)
-                            qty = int(value)
-                            if qty > 0:
-                                cart_item = CartItem.objects.get(pk=item_id, cart=cart)
-                                cart_item.quantity = qty
-                                cart_item.save()
-                            else:
-                                CartItem.objects.get(pk=item_id, cart=cart).delete()
-                    except (ValueError, CartItem.DoesNotExist):
-                        continue
-            messages.success(request, "Shopping cart updated.")
+            updated, removed = update_cart_quantities(cart, parse_cart_quantities(request.POST))
+            changes = [f"{item.accessory.title} x {item.quantity}" for item in updated]
+            changes += [f"{item.accessory.title} removed" for item in removed]
+            if changes:
+                messages.success(request, f"Shopping cart updated: {', '.join(changes)}.")
+            else:
+                messages.info(request, "Shopping cart unchanged.")
             
         return redirect('shopping_cart')
 
-    return render(request, 'shopping-cart.html', {'active_page': 'cart', 'cart': cart})
+    return render(request, 'shopping-cart.html', {
+        'active_page': 'cart',
+        'cart': cart,
+        'cart_items': cart.items.select_related('accessory').order_by('pk'),
+    })
 
 @login_required
 def add_to_cart(request, accessory_id):
@@ -721,24 +804,28 @@ def add_to_cart(request, accessory_id):
     except (TypeError, ValueError):
         qty = 1
         
-    cart_item, item_created = CartItem.objects.get_or_create(cart=cart, accessory=accessory)
-    if not item_created:
-        cart_item.quantity += qty
-    else:
-        cart_item.quantity = qty
-    cart_item.save()
+    with transaction.atomic():
+        cart_item, item_created = CartItem.objects.get_or_create(cart=cart, accessory=accessory)
+        if not item_created:
+            cart_item.quantity += qty
+        else:
+            cart_item.quantity = qty
+        cart_item.save()
+        cart.adjust_totals(qty, qty * accessory.price)
         
     messages.success(request, f"{qty} x {accessory.title} added to cart.")
     return redirect('shopping_cart')
 
 @login_required
 def remove_from_cart(request, item_id):
-    cart_item = get_object_or_404(CartItem, pk=item_id, cart__user=request.user)
-    cart_item.delete()
+    cart_item = get_object_or_404(CartItem.objects.select_related('cart', 'accessory'), pk=item_id, cart__user=request.user)
+    with transaction.atomic():
+        cart_item.cart.adjust_totals(-cart_item.quantity, -cart_item.quantity * cart_item.accessory.price)
+        cart_item.delete()
     messages.success(request, "Item removed from cart.")
     return redirect('shopping_cart')
 
-from .models import Car, Category, BlogPost, Accessory, Cart, CartItem, Wishlist, CarInquiry, CarReview, CarOrder, Order, OrderItem
+from .models import Car, Category, BlogPost, Accessory, Cart, CartItem, Wishlist, CarInquiry, CarReview, CarOrder, Order
 
 def wishlist(request):
     if not request.user.is_authenticated:
@@ -755,14 +842,12 @@ def wishlist(request):
 @login_required
 def toggle_wishlist(request, car_id):
     car = get_object_or_404(Car, pk=car_id)
-    wishlist_obj, created = Wishlist.objects.get_or_create(user=request.user)
+    wishlist_obj = Wishlist.for_user(request.user)
     
-    if car in wishlist_obj.cars.all():
-        wishlist_obj.cars.remove(car)
-        messages.info(request, f"{car.title} removed from wishlist.")
-    else:
-        wishlist_obj.cars.add(car)
+    if wishlist_obj.toggle_car(car.id):
         messages.success(request, f"{car.title} added to wishlist.")
+    else:
+        messages.info(request, f"{car.title} removed from wishlist.")
         
     # Redirect back to the previous page
     return redirect(request.META.get('HTTP_REFERER', 'index'))
@@ -770,14 +855,12 @@ def toggle_wishlist(request, car_id):
 @login_required
 def toggle_wishlist_accessory(request, accessory_id):
     accessory = get_object_or_404(Accessory, pk=accessory_id)
-    wishlist_obj, created = Wishlist.objects.get_or_create(user=request.user)
+    wishlist_obj = Wishlist.for_user(request.user)
     
-    if accessory in wishlist_obj.accessories.all():
-        wishlist_obj.accessories.remove(accessory)
-        messages.info(request, f"{accessory.title} removed from wishlist.")
-    else:
-        wishlist_obj.accessories.add(accessory)
+    if wishlist_obj.toggle_accessory(accessory.id):
         messages.success(request, f"{accessory.title} added to wishlist.")
+    else:
+        messages.info(request, f"{accessory.title} removed from wishlist.")
         
     # Redirect back to the previous page
     return redirect(request.META.get('HTTP_REFERER', 'grid'))
@@ -787,18 +870,27 @@ def toggle_wishlist_accessory(request, accessory_id):
 
 @login_required
 def wishlist_add_all_to_cart(request):
-    widthlist_obj, created = Wishlist.objects.get_or_create(user=request.user)
+    widthlist_obj = Wishlist.for_user(request.user)
     cart, created = Cart.objects.get_or_create(user=request.user)
     
-    accessories = widthlist_obj.accessories.all()
-    count_added = 0
-    
-    for accessory in accessories:
-        cart_item, item_created = CartItem.objects.get_or_create(cart=cart, accessory=accessory)
-        if not item_created:
-            cart_item.quantity += 1
-            cart_item.save()
-        count_added += 1
+    # One of each wishlisted accessory: new lines are bulk inserted and existing
+    # lines are bumped by a single UPDATE, whatever the size of the wishlist.
+    with transaction.atomic():
+        prices = dict(widthlist_obj.accessories.values_list('id', 'price'))
+        existing = set(
+            CartItem.objects.select_for_update()
+            .filter(cart=cart, accessory_id__in=prices)
+            .values_list('accessory_id', flat=True)
+        )
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, accessory_id=accessory_id, quantity=1)
+            for accessory_id in prices if accessory_id not in existing
+        ])
+        if existing:
+            CartItem.objects.filter(cart=cart, accessory_id__in=existing).update(quantity=F('quantity') + 1)
+        count_added = len(prices)
+        if count_added:
+            cart.adjust_totals(count_added, sum(prices.values()))
         
     if count_added > 0:
         messages.success(request, f"Added {count_added} items from wishlist to cart.")
@@ -812,15 +904,25 @@ def checkout(request):
     cart, created = Cart.objects.get_or_create(user=request.user)
     return render(request, 'checkout.html', {
         'cart': cart,
-        'cart_items': cart.items.all(),
-        'active_page': 'checkout'
+        'cart_items': cart.items.select_related('accessory').order_by('pk'),
+        'active_page': 'checkout',
+        'idempotency_key': new_idempotency_key(),
     })
 
 @login_required
 def process_checkout(request):
     if request.method == 'POST':
+        # A resubmitted form (double click, client retry) returns the order it already placed
+        idempotency_key = clean_idempotency_key(request.POST.get('idempotency_key'))
+        placed = idempotency_key and Order.objects.filter(user=request.user, idempotency_key=idempotency_key).first()
+        if placed:
+            metrics.inc('car_stor_checkouts_total', kind='accessory', result='replayed')
+            messages.info(request, f"Order #{placed.id} has already been placed.")
+            return redirect(f'/car/order/success/?order_id={placed.id}')
+
         cart = get_object_or_404(Cart, user=request.user)
         if not cart.items.exists():
+             metrics.inc('car_stor_checkouts_total', kind='accessory', result='empty')
              messages.error(request, "Your cart is empty.")
              return redirect('shopping_cart')
 
@@ -848,45 +950,35 @@ def process_checkout(request):
         address = address or "Not provided" 
         city = city or "Not provided"
         
-        # Calculate total
-        total_price = cart.total_price()
-        
-        # Create Order
-        order = Order.objects.create(
-            user=request.user,
-            full_name=full_name,
-            email=email,
-            phone=phone,
-            address=address,
-            city=city,
-            total_price=total_price,
-            status='Pending'
-        )
-        
-        # Create Order Items and notify sellers
-        sellers_accessories = {}
-        for item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                accessory=item.accessory,
-                quantity=item.quantity,
-                price=item.accessory.price
-            )
-            if item.accessory.seller:
-                if item.accessory.seller not in sellers_accessories:
-                    sellers_accessories[item.accessory.seller] = []
-                sellers_accessories[item.accessory.seller].append(item.accessory.title)
-        
-        # Notify sellers
-        for seller, titles in sellers_accessories.items():
-            accessory_titles_joined = ", ".join(titles)
-            Notification.objects.create(
-                user=seller,
-                message=f"You have received a new order for accessories {accessory_titles_joined}!"
-            )
-        
-        # Clear the cart
-        cart.items.all().delete()
+        # Create the order, its items and seller notifications, and empty the cart
+        try:
+            result = place_order(request.user, cart, {
+                'full_name': full_name,
+                'email': email,
+                'phone': phone,
+                'address': address,
+                'city': city,
+            }, idempotency_key=idempotency_key)
+        except EmptyCartError:
+            # A concurrent submission of the same form may have emptied the cart first
+            placed = idempotency_key and Order.objects.filter(user=request.user, idempotency_key=idempotency_key).first()
+            if placed:
+                metrics.inc('car_stor_checkouts_total', kind='accessory', result='replayed')
+                messages.info(request, f"Order #{placed.id} has already been placed.")
+                return redirect(f'/car/order/success/?order_id={placed.id}')
+            metrics.inc('car_stor_checkouts_total', kind='accessory', result='empty')
+            messages.error(request, "Your cart is empty.")
+            return redirect('shopping_cart')
+        except IntegrityError:
+            # Only a concurrent submission taking the idempotency key is expected here
+            placed = idempotency_key and Order.objects.filter(user=request.user, idempotency_key=idempotency_key).first()
+            if not placed:
+                raise
+            metrics.inc('car_stor_checkouts_total', kind='accessory', result='replayed')
+            messages.info(request, f"Order #{placed.id} has already been placed.")
+            return redirect(f'/car/order/success/?order_id={placed.id}')
+        order = result.order
+        metrics.inc('car_stor_checkouts_total', kind='accessory', result='placed')
         
         messages.success(request, f"Order #{order.id} placed successfully!")
         return redirect(f'/car/order/success/?order_id={order.id}')
@@ -913,29 +1005,47 @@ def car_checkout(request, car_id):
         phone = request.POST.get('phone')
         address = request.POST.get('address')
         city = request.POST.get('city')
+
+        # A resubmitted form (double click, client retry) does not place a second order
+        idempotency_key = clean_idempotency_key(request.POST.get('idempotency_key'))
+        if idempotency_key and CarOrder.objects.filter(user=request.user, idempotency_key=idempotency_key).exists():
+            metrics.inc('car_stor_checkouts_total', kind='car', result='replayed')
+            messages.info(request, "Your order has already been placed.")
+            return redirect('order_success')
         
-        order = CarOrder.objects.create(
-            user=request.user,
-            car=car,
-            full_name=full_name,
-            email=email,
-            phone=phone,
-            address=address,
-            city=city,
-            total_price=car.price or 0,
-            status='Pending'
-        )
-        # Notify the seller
-        if car.seller:
-            Notification.objects.create(
-                user=car.seller,
-                message=f"You have received a new purchase order for your car: {car.title}"
-            )
+        try:
+            with transaction.atomic():
+                order = CarOrder.objects.create(
+                    user=request.user,
+                    car=car,
+                    full_name=full_name,
+                    email=email,
+                    phone=phone,
+                    address=address,
+                    city=city,
+                    total_price=car.price or 0,
+                    status='Pending',
+                    idempotency_key=idempotency_key
+                )
+                # Notify the seller
+                if car.seller:
+                    Notification.objects.create(
+                        user=car.seller,
+                        message=f"You have received a new purchase order for your car: {car.title}"
+                    )
+        except IntegrityError:
+            # Only a concurrent submission taking the idempotency key is expected here
+            if not (idempotency_key and CarOrder.objects.filter(user=request.user, idempotency_key=idempotency_key).exists()):
+                raise
+            metrics.inc('car_stor_checkouts_total', kind='car', result='replayed')
+            messages.info(request, "Your order has already been placed.")
+            return redirect('order_success')
             
+        metrics.inc('car_stor_checkouts_total', kind='car', result='placed')
         messages.success(request, "Your order has been placed successfully!")
         return redirect('order_success')
         
-    return render(request, 'car_checkout.html', {'car': car})
+    return render(request, 'car_checkout.html', {'car': car, 'idempotency_key': new_idempotency_key()})
 
 def order_success(request):
     order_id = request.GET.get('order_id')
@@ -943,7 +1053,7 @@ def order_success(request):
     if order_id:
         try:
             # Try to get accessory order first
-            order = Order.objects.get(id=order_id, user=request.user)
+            order = Order.objects.prefetch_related('items__accessory').get(id=order_id, user=request.user)
         except Order.DoesNotExist:
              # Fallback to car order if we unify the view, or simply pass null
              pass